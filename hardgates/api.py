@@ -7,12 +7,16 @@ FastAPI-based REST API for analyzing GitHub repositories and returning JSON resu
 
 import os
 import asyncio
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Request
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
 from pydantic import BaseModel, HttpUrl
 from typing import Optional, Dict, Any
 import uvicorn
 from datetime import datetime
 import uuid
+import json
+import hashlib
 
 # Load environment variables from .env file if it exists
 try:
@@ -21,10 +25,22 @@ try:
 except ImportError:
     pass  # python-dotenv not installed, skip
 
-from core.flow import Flow
-from nodes.fetch_repo import FetchRepo
-from nodes.analyze_code import AnalyzeCode
-from nodes.format_output import FormatOutput
+from nodes.analyze_gates import ANALYSIS_MODES
+from utils.llm_client import close_llm_clients, get_prompt_cache_stats
+from utils.llm_cache import get_llm_cache_stats
+from utils.job_queue import get_job_queue, generate_secret_key, JOB_SECRET_KEY_VARIABLE
+from utils.github_client import resolve_commit_sha
+from worker import create_assessment_flow, start_workers, stop_workers
+
+# Worker processes started with the server; set to 0 when running `python worker.py` separately
+API_WORKERS = int(os.getenv("HARDGATES_API_WORKERS", "1"))
+
+# Synchronous assessments run in the web process: at most this many at once, each given this long
+SYNC_MAX_CONCURRENT = int(os.getenv("HARDGATES_SYNC_MAX_CONCURRENT", "2"))
+SYNC_TIMEOUT_SECONDS = float(os.getenv("HARDGATES_SYNC_TIMEOUT", "600"))
+
+# How often a running synchronous assessment checks whether its client is still connected
+DISCONNECT_POLL_SECONDS = 1.0
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -38,6 +54,8 @@ class AssessmentRequest(BaseModel):
     repo_url: HttpUrl
     branch: Optional[str] = "main"
     github_token: Optional[str] = None
+    use_cache: Optional[bool] = True
+    analysis_mode: Optional[str] = os.getenv("HARDGATES_ANALYSIS_MODE", "monolithic")
 
 class AssessmentResponse(BaseModel):
     assessment_id: str
@@ -51,63 +69,141 @@ class ErrorResponse(BaseModel):
     message: str
     assessment_id: Optional[str] = None
 
-# In-memory storage for async assessment tracking
-assessment_store = {}
+# Worker processes started by this server
+worker_processes = []
+
+# Blocking steps (clone, scan) of synchronous assessments run here, off the event loop and
+# apart from the default pool used by the rest of the API
+sync_executor = ThreadPoolExecutor(max_workers=max(1, SYNC_MAX_CONCURRENT), thread_name_prefix="sync-assessment")
+sync_slots = asyncio.Semaphore(max(1, SYNC_MAX_CONCURRENT))
 
-def create_assessment_flow():
+class _TrackedExecutor(Executor):
     """
-    Create and return the hard gate assessment flow.
+    Submit to a shared executor while keeping track of the futures still running.
     """
-    # Create nodes with shorter retry times for API responsiveness
-    fetch_repo = FetchRepo(max_retries=2, wait=3)
-    analyze_code = AnalyzeCode(max_retries=2, wait=5)
-    format_output = FormatOutput()
     
-    # Connect nodes in sequence
-    fetch_repo >> analyze_code >> format_output
+    def __init__(self, executor):
+        self.executor = executor
+        self.futures = set()
+        self.lock = threading.Lock()
+    
+    def submit(self, fn, *args, **kwargs):
+        future = self.executor.submit(fn, *args, **kwargs)
+        with self.lock:
+            self.futures.add(future)
+        future.add_done_callback(self._discard)
+        return future
+    
+    def _discard(self, future):
+        with self.lock:
+            self.futures.discard(future)
+    
+    def pending(self):
+        with self.lock:
+            return [future for future in self.futures if not future.done()]
+
+@app.on_event("startup")
+async def start_worker_processes():
+    """
+    Start the in-process worker pool that runs queued assessments.
+    """
+    # Tokens are queued encrypted. Without a configured key, this server and the workers it
+    # spawns (which inherit the environment) share a key that lasts until the server stops.
+    if not os.getenv(JOB_SECRET_KEY_VARIABLE):
+        try:
+            os.environ[JOB_SECRET_KEY_VARIABLE] = generate_secret_key()
+            print(f"Warning: {JOB_SECRET_KEY_VARIABLE} is not set, queued GitHub tokens are only readable by "
+                  "this server's workers until it restarts")
+        except RuntimeError as e:
+            print(f"Warning: {str(e)}, assessments with a GitHub token cannot be queued")
     
-    # Create the flow
-    return Flow(start=fetch_repo)
+    # Create the queue before the workers open it
+    get_job_queue()
+    if API_WORKERS > 0:
+        worker_processes.extend(start_workers(API_WORKERS))
+        print(f"Started {API_WORKERS} assessment worker processes")
+
+@app.on_event("shutdown")
+async def close_clients():
+    """
+    Stop the worker pool and close pooled LLM connections when the server stops.
+    """
+    await asyncio.to_thread(stop_workers, worker_processes)
+    worker_processes.clear()
+    sync_executor.shutdown(wait=False, cancel_futures=True)
+    await close_llm_clients()
+
+def _timestamp(value):
+    return datetime.fromtimestamp(value).isoformat() if value else None
 
-def run_assessment_sync(assessment_id: str, repo_url: str, branch: str, github_token: Optional[str]):
+def _dedup_key(payload: Dict[str, Any], commit_sha: str) -> str:
     """
-    Run the assessment synchronously and store results.
+    Identify an assessment by what determines its result: repository, branch, commit,
+    analysis mode and cache preference. The token is left out so requests from
+    different clients share the job.
     """
+    key_data = json.dumps([
+        payload["repo_url"].rstrip('/').lower().removesuffix('.git'),
+        payload["branch"],
+        commit_sha,
+        payload["analysis_mode"],
+        payload["use_cache"]
+    ])
+    return hashlib.sha256(key_data.encode()).hexdigest()
+
+def _release_slot_when_idle(executor: _TrackedExecutor):
+    """
+    Release a sync slot once the blocking steps a request submitted have finished.
+    
+    A step already running in the executor cannot be interrupted, so after a timeout or a
+    disconnect the slot stays taken until it returns. New requests are refused meanwhile
+    instead of queuing behind it in the executor.
+    """
+    pending = executor.pending()
+    if not pending:
+        sync_slots.release()
+        return
+    
+    print(f"Keeping a synchronous assessment slot until {len(pending)} running step(s) finish")
+    loop = asyncio.get_running_loop()
+    remaining = len(pending)
+    
+    def step_finished():
+        nonlocal remaining
+        remaining -= 1
+        if remaining == 0:
+            sync_slots.release()
+    
+    for future in pending:
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(step_finished))
+
+async def _run_until_disconnected(http_request: Request, coroutine, timeout: float) -> bool:
+    """
+    Run a coroutine, cancelling it if the client disconnects or it runs longer than timeout.
+    
+    Returns False if the client disconnected. A blocking step already running in the executor
+    cannot be interrupted, but the flow stops there instead of moving on to the next node.
+    """
+    task = asyncio.ensure_future(coroutine)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    
     try:
-        # Initialize shared state
-        shared = {
-            "repo_url": str(repo_url),
-            "branch": branch,
-            "github_token": github_token,
-            "output_format": "json"
-        }
-        
-        # Create and run the assessment flow
-        assessment_flow = create_assessment_flow()
-        assessment_flow.run(shared)
-        
-        # Get the formatted JSON output
-        formatted_output = shared.get("formatted_output")
-        
-        if not formatted_output or not isinstance(formatted_output, dict):
-            raise ValueError("No valid assessment results generated")
-        
-        # Store successful result
-        assessment_store[assessment_id] = {
-            "status": "completed",
-            "result": formatted_output,
-            "error": None,
-            "completed_at": datetime.now().isoformat()
-        }
-        
-    except Exception as e:
-        # Store error result
-        assessment_store[assessment_id] = {
-            "status": "failed",
-            "result": None,
-            "error": str(e),
-            "completed_at": datetime.now().isoformat()
-        }
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            done, _ = await asyncio.wait({task}, timeout=min(DISCONNECT_POLL_SECONDS, remaining))
+            if done:
+                task.result()
+                return True
+            if await http_request.is_disconnected():
+                print("Client disconnected, cancelling synchronous assessment")
+                return False
+    finally:
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
 
 @app.get("/")
 async def root():
@@ -140,11 +236,15 @@ async def health_check():
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
         "llm_configured": llm_configured,
-        "active_assessments": len([a for a in assessment_store.values() if a["status"] == "running"])
+        "active_assessments": await asyncio.to_thread(get_job_queue().count, ["running"]),
+        "queued_assessments": await asyncio.to_thread(get_job_queue().count, ["queued"]),
+        "workers": sum(1 for process in worker_processes if process.is_alive()),
+        "prompt_cache": get_prompt_cache_stats(),
+        "llm_response_cache": await asyncio.to_thread(get_llm_cache_stats)
     }
 
 @app.post("/analyze", response_model=Dict[str, str])
-async def start_assessment(request: AssessmentRequest, background_tasks: BackgroundTasks):
+async def start_assessment(request: AssessmentRequest):
     """
     Start a new hard gate assessment (async).
     """
@@ -155,25 +255,45 @@ async def start_assessment(request: AssessmentRequest, background_tasks: Backgro
             detail="No LLM API key configured. Set OPENAI_API_KEY, ANTHROPIC_API_KEY, or GOOGLE_API_KEY environment variable."
         )
     
-    # Generate assessment ID
-    assessment_id = str(uuid.uuid4())
+    if request.analysis_mode not in ANALYSIS_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported analysis_mode. Choose one of: {', '.join(ANALYSIS_MODES)}"
+        )
     
-    # Initialize assessment tracking
-    assessment_store[assessment_id] = {
-        "status": "running",
-        "result": None,
-        "error": None,
-        "started_at": datetime.now().isoformat()
+    # Queue the assessment for the worker processes
+    payload = {
+        "repo_url": str(request.repo_url),
+        "branch": request.branch,
+        "github_token": request.github_token,
+        "use_cache": request.use_cache,
+        "analysis_mode": request.analysis_mode
     }
     
-    # Start background assessment
-    background_tasks.add_task(
-        run_assessment_sync,
-        assessment_id,
-        request.repo_url,
-        request.branch,
-        request.github_token
-    )
+    # Identical requests for the same commit attach to the job already in flight. The commit
+    # is resolved with the caller's token, so only callers who can read the repository attach.
+    commit_sha = await asyncio.to_thread(resolve_commit_sha, payload["repo_url"], request.branch, request.github_token)
+    try:
+        if commit_sha:
+            assessment_id, created = await asyncio.to_thread(
+                get_job_queue().enqueue_unique, payload, _dedup_key(payload, commit_sha)
+            )
+        else:
+            # Let the worker report why the repository cannot be read
+            assessment_id = await asyncio.to_thread(get_job_queue().enqueue, payload)
+            created = True
+    except RuntimeError as e:
+        # The token cannot be stored encrypted (see HARDGATES_JOB_SECRET_KEY)
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    if not created:
+        print(f"Attached request for {request.repo_url}@{commit_sha[:12]} to assessment {assessment_id}")
+        return {
+            "assessment_id": assessment_id,
+            "status": "attached",
+            "message": f"An identical assessment of {request.repo_url} is already in progress",
+            "check_status_url": f"/analyze/{assessment_id}"
+        }
     
     return {
         "assessment_id": assessment_id,
@@ -183,9 +303,12 @@ async def start_assessment(request: AssessmentRequest, background_tasks: Backgro
     }
 
 @app.post("/analyze/sync", response_model=AssessmentResponse)
-async def analyze_sync(request: AssessmentRequest):
+async def analyze_sync(request: AssessmentRequest, http_request: Request):
     """
     Perform synchronous hard gate assessment (may be slow for large repositories).
+    
+    The assessment runs off the event loop on a bounded executor, is cancelled when the
+    client disconnects and fails with 504 after HARDGATES_SYNC_TIMEOUT seconds.
     """
     # Validate LLM configuration
     if not any([os.getenv("OPENAI_API_KEY"), os.getenv("ANTHROPIC_API_KEY"), os.getenv("GOOGLE_API_KEY")]):
@@ -194,6 +317,20 @@ async def analyze_sync(request: AssessmentRequest):
             detail="No LLM API key configured. Set OPENAI_API_KEY, ANTHROPIC_API_KEY, or GOOGLE_API_KEY environment variable."
         )
     
+    if request.analysis_mode not in ANALYSIS_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported analysis_mode. Choose one of: {', '.join(ANALYSIS_MODES)}"
+        )
+    
+    # Refuse rather than queue up work in the web process when every slot is busy
+    if sync_slots.locked():
+        raise HTTPException(
+            status_code=503,
+            detail="Too many synchronous assessments in progress. Retry later or use POST /analyze.",
+            headers={"Retry-After": "30"}
+        )
+    
     assessment_id = str(uuid.uuid4())
     
     try:
@@ -202,12 +339,25 @@ async def analyze_sync(request: AssessmentRequest):
             "repo_url": str(request.repo_url),
             "branch": request.branch,
             "github_token": request.github_token,
-            "output_format": "json"
+            "output_format": "json",
+            "use_result_cache": request.use_cache,
+            "analysis_mode": request.analysis_mode
         }
         
-        # Create and run the assessment flow
-        assessment_flow = create_assessment_flow()
-        assessment_flow.run(shared)
+        # Create and run the assessment flow. Its slot is held until the blocking steps it
+        # started have finished, which can be after a timeout or disconnect.
+        executor = _TrackedExecutor(sync_executor)
+        assessment_flow = create_assessment_flow(request.analysis_mode, executor=executor)
+        await sync_slots.acquire()
+        try:
+            finished = await _run_until_disconnected(
+                http_request, assessment_flow.run_async(shared), SYNC_TIMEOUT_SECONDS
+            )
+        finally:
+            _release_slot_when_idle(executor)
+        if not finished:
+            # 499 Client Closed Request, nobody is left to read the response
+            raise HTTPException(status_code=499, detail="Client disconnected")
         
         # Get the formatted JSON output
         formatted_output = shared.get("formatted_output")
@@ -222,7 +372,14 @@ async def analyze_sync(request: AssessmentRequest):
             assessment_type=formatted_output.get("assessment_type", "hard_gate_assessment"),
             results=formatted_output.get("results", {})
         )
-        
+    
+    except HTTPException:
+        raise
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=504,
+            detail=f"Assessment did not finish within {SYNC_TIMEOUT_SECONDS:.0f} seconds. Use POST /analyze for large repositories."
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Assessment failed: {str(e)}")
 
@@ -231,17 +388,21 @@ async def get_assessment_result(assessment_id: str):
     """
     Get the result of a specific assessment.
     """
-    if assessment_id not in assessment_store:
+    assessment = await asyncio.to_thread(get_job_queue().get, assessment_id)
+    if assessment is None:
         raise HTTPException(status_code=404, detail="Assessment not found")
     
-    assessment = assessment_store[assessment_id]
-    
-    if assessment["status"] == "running":
+    if assessment["status"] in ("queued", "running"):
+        # Queued assessments are reported as running so clients keep polling
         return {
             "assessment_id": assessment_id,
             "status": "running",
-            "message": "Assessment is still in progress",
-            "started_at": assessment.get("started_at")
+            "queued": assessment["status"] == "queued",
+            "message": "Assessment is waiting for a worker" if assessment["status"] == "queued"
+                       else "Assessment is still in progress",
+            "started_at": _timestamp(assessment["started_at"]),
+            "attempts": assessment["attempts"],
+            "progress": assessment["progress"]
         }
     elif assessment["status"] == "failed":
         return ErrorResponse(
@@ -255,7 +416,7 @@ async def get_assessment_result(assessment_id: str):
         return AssessmentResponse(
             assessment_id=assessment_id,
             project_name=result.get("project_name", "Unknown"),
-            assessment_date=result.get("assessment_date", assessment.get("completed_at")),
+            assessment_date=result.get("assessment_date", _timestamp(assessment["completed_at"])),
             assessment_type=result.get("assessment_type", "hard_gate_assessment"),
             results=result.get("results", {})
         )
@@ -263,12 +424,11 @@ async def get_assessment_result(assessment_id: str):
 @app.delete("/analyze/{assessment_id}")
 async def delete_assessment(assessment_id: str):
     """
-    Delete assessment results from memory.
+    Delete an assessment and its results from the queue.
     """
-    if assessment_id not in assessment_store:
+    if not await asyncio.to_thread(get_job_queue().delete, assessment_id):
         raise HTTPException(status_code=404, detail="Assessment not found")
     
-    del assessment_store[assessment_id]
     return {"message": f"Assessment {assessment_id} deleted"}
 
 @app.get("/analyze")
@@ -277,12 +437,13 @@ async def list_assessments():
     List all assessments with their status.
     """
     assessments = []
-    for assessment_id, data in assessment_store.items():
+    for job in await asyncio.to_thread(get_job_queue().list_jobs):
         assessments.append({
-            "assessment_id": assessment_id,
-            "status": data["status"],
-            "started_at": data.get("started_at"),
-            "completed_at": data.get("completed_at")
+            "assessment_id": job["id"],
+            "status": job["status"],
+            "created_at": _timestamp(job["created_at"]),
+            "started_at": _timestamp(job["started_at"]),
+            "completed_at": _timestamp(job["completed_at"])
         })
     
     return {
@@ -1,12 +1,81 @@
 # 100-line PocketFlow implementation for Hard Gate Assessment
-class Node:
-    def __init__(self, max_retries=1, wait=0):
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+class RetryPolicy:
+    """
+    Decides whether and when a failed exec() is retried.
+    
+    The base policy waits a fixed time between attempts. Errors are fatal when they are
+    one of fatal_errors or carry retryable=False; an error's retry_after attribute (seconds,
+    e.g. from a Retry-After header) is the minimum wait. deadline bounds the total time spent
+    on one exec() including retries, after which the node falls back.
+    """
+    fatal_errors = (TypeError, AttributeError, NameError, NotImplementedError, ImportError)
+    
+    def __init__(self, max_retries=1, wait=0, deadline=None, max_retry_after=120):
         self.max_retries = max_retries
         self.wait = wait
+        self.deadline = deadline
+        self.max_retry_after = max_retry_after
+    
+    def is_retryable(self, exc):
+        if isinstance(exc, self.fatal_errors):
+            return False
+        return getattr(exc, "retryable", True) is not False
+    
+    def delay(self, attempt, exc):
+        return self.wait
+    
+    def next_delay(self, attempt, exc, elapsed):
+        """
+        Return the seconds to wait before the next attempt, or None to stop retrying.
+        """
+        if attempt >= self.max_retries or not self.is_retryable(exc):
+            return None
+        
+        delay = self.delay(attempt, exc)
+        retry_after = getattr(exc, "retry_after", None)
+        if retry_after:
+            delay = max(delay, min(retry_after, self.max_retry_after))
+        
+        if self.deadline is not None and elapsed + delay >= self.deadline:
+            return None
+        return delay
+
+class ExponentialBackoff(RetryPolicy):
+    """
+    Doubles the wait after every attempt, up to max_delay, with random jitter so
+    concurrent callers that failed together do not retry together.
+    """
+    
+    def __init__(self, max_retries=3, base_delay=1.0, max_delay=30.0, jitter=True, deadline=None, max_retry_after=120):
+        super().__init__(max_retries, base_delay, deadline, max_retry_after)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+    
+    def delay(self, attempt, exc):
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        if self.jitter:
+            delay = random.uniform(delay / 2, delay)
+        return delay
+
+class Node:
+    def __init__(self, max_retries=1, wait=0, retry_policy=None):
+        # max_retries and wait describe the default fixed-wait policy; the delays that apply
+        # come from retry_policy, so wait is not kept on the node
+        self.retry_policy = retry_policy or RetryPolicy(max_retries, wait)
         self.cur_retry = 0
         self.successors = {}
         self.params = {}
     
+    @property
+    def max_retries(self):
+        return self.retry_policy.max_retries
+    
     def prep(self, shared):
         return None
     
@@ -22,24 +91,32 @@ class Node:
     def set_params(self, params):
         self.params = params
     
-    def run(self, shared):
-        import time
-        
-        self.cur_retry = 0
-        prep_res = self.prep(shared)
+    def _retry_delay(self, attempt, exc, started):
+        delay = self.retry_policy.next_delay(attempt, exc, time.monotonic() - started)
+        if delay is not None:
+            print(f"{type(self).__name__} attempt {attempt} failed, retrying in {delay:.1f}s: {exc}")
+        return delay
+    
+    def _exec(self, prep_res):
+        # Retry state is local so concurrent items never share a counter
+        cur_retry = 0
+        started = time.monotonic()
         
-        while self.cur_retry < self.max_retries:
+        while True:
             try:
-                exec_res = self.exec(prep_res)
-                break
+                return self.exec(prep_res)
             except Exception as e:
-                self.cur_retry += 1
-                if self.cur_retry >= self.max_retries:
-                    exec_res = self.exec_fallback(prep_res, e)
-                    break
-                if self.wait > 0:
-                    time.sleep(self.wait)
-        
+                cur_retry += 1
+                self.cur_retry = cur_retry
+                delay = self._retry_delay(cur_retry, e, started)
+                if delay is None:
+                    return self.exec_fallback(prep_res, e)
+                if delay > 0:
+                    time.sleep(delay)
+    
+    def run(self, shared):
+        prep_res = self.prep(shared)
+        exec_res = self._exec(prep_res)
         return self.post(shared, prep_res, exec_res)
     
     def __rshift__(self, other):
@@ -63,43 +140,130 @@ class Flow(Node):
         super().__init__()
         self.start = start
     
+    def get_next_node(self, current, action):
+        if action and action in current.successors:
+            return current.successors[action]
+        return None
+    
     def run(self, shared):
         current = self.start
         
         while current:
             action = current.run(shared)
-            if action and action in current.successors:
-                current = current.successors[action]
-            else:
-                break
+            current = self.get_next_node(current, action)
         
         return self.post(shared, None, None)
 
 class BatchNode(Node):
     def run(self, shared):
-        import time
-        
-        self.cur_retry = 0
         prep_res = self.prep(shared)
         
         if not hasattr(prep_res, '__iter__'):
             raise ValueError("BatchNode prep() must return an iterable")
         
-        exec_res_list = []
-        for item in prep_res:
-            while self.cur_retry < self.max_retries:
-                try:
-                    exec_res = self.exec(item)
-                    exec_res_list.append(exec_res)
-                    break
-                except Exception as e:
-                    self.cur_retry += 1
-                    if self.cur_retry >= self.max_retries:
-                        exec_res = self.exec_fallback(item, e)
-                        exec_res_list.append(exec_res)
-                        break
-                    if self.wait > 0:
-                        time.sleep(self.wait)
-            self.cur_retry = 0
-        
-        return self.post(shared, prep_res, exec_res_list) 
\ No newline at end of file
+        exec_res_list = [self._exec(item) for item in prep_res]
+        
+        return self.post(shared, prep_res, exec_res_list)
+
+class ParallelBatchNode(BatchNode):
+    def __init__(self, max_retries=1, wait=0, max_concurrency=8, retry_policy=None):
+        super().__init__(max_retries, wait, retry_policy=retry_policy)
+        self.max_concurrency = max_concurrency
+    
+    def run(self, shared):
+        prep_res = self.prep(shared)
+        
+        if not hasattr(prep_res, '__iter__'):
+            raise ValueError("ParallelBatchNode prep() must return an iterable")
+        
+        items = list(prep_res)
+        if not items:
+            return self.post(shared, prep_res, [])
+        
+        # map() keeps results in item order regardless of completion order
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_concurrency, len(items)))) as executor:
+            exec_res_list = list(executor.map(self._exec, items))
+        
+        return self.post(shared, prep_res, exec_res_list)
+
+class AsyncNode(Node):
+    async def prep_async(self, shared):
+        return None
+    
+    async def exec_async(self, prep_res):
+        return None
+    
+    async def exec_fallback_async(self, prep_res, exc):
+        raise exc
+    
+    async def post_async(self, shared, prep_res, exec_res):
+        return "default"
+    
+    async def _exec_async(self, prep_res):
+        cur_retry = 0
+        started = time.monotonic()
+        
+        while True:
+            try:
+                return await self.exec_async(prep_res)
+            except Exception as e:
+                cur_retry += 1
+                self.cur_retry = cur_retry
+                delay = self._retry_delay(cur_retry, e, started)
+                if delay is None:
+                    return await self.exec_fallback_async(prep_res, e)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+    
+    async def run_async(self, shared):
+        prep_res = await self.prep_async(shared)
+        exec_res = await self._exec_async(prep_res)
+        return await self.post_async(shared, prep_res, exec_res)
+    
+    def run(self, shared):
+        raise RuntimeError(f"{type(self).__name__} is async, use run_async()")
+
+class AsyncFlow(Flow, AsyncNode):
+    def __init__(self, start, executor=None):
+        super().__init__(start)
+        # Executor for synchronous nodes (None uses the event loop's default thread pool)
+        self.executor = executor
+    
+    def run(self, shared):
+        raise RuntimeError(f"{type(self).__name__} is async, use run_async()")
+    
+    async def run_async(self, shared):
+        current = self.start
+        loop = asyncio.get_running_loop()
+        
+        while current:
+            if isinstance(current, AsyncNode):
+                action = await current.run_async(shared)
+            else:
+                # Run blocking nodes off the event loop
+                action = await loop.run_in_executor(self.executor, current.run, shared)
+            current = self.get_next_node(current, action)
+        
+        return await self.post_async(shared, None, None)
+
+class AsyncParallelBatchNode(AsyncNode):
+    def __init__(self, max_retries=1, wait=0, max_concurrency=8, retry_policy=None):
+        super().__init__(max_retries, wait, retry_policy=retry_policy)
+        self.max_concurrency = max_concurrency
+    
+    async def run_async(self, shared):
+        prep_res = await self.prep_async(shared)
+        
+        if not hasattr(prep_res, '__iter__'):
+            raise ValueError("AsyncParallelBatchNode prep_async() must return an iterable")
+        
+        semaphore = asyncio.Semaphore(max(1, self.max_concurrency))
+        
+        async def run_item(item):
+            async with semaphore:
+                return await self._exec_async(item)
+        
+        # gather() keeps results in item order regardless of completion order
+        exec_res_list = list(await asyncio.gather(*(run_item(item) for item in prep_res)))
+        
+        return await self.post_async(shared, prep_res, exec_res_list)
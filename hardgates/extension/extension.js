@@ -136,7 +136,10 @@ async function pollForResults(apiUrl, assessmentId) {
 
             if (data.status === 'running') {
                 if (polls < maxPolls) {
-                    vscode.window.showInformationMessage(`Assessment in progress... (${polls * 5}s)`);
+                    const progress = data.progress;
+                    const progressText = progress ? `, ${progress.completed}/${progress.total} ${progress.stage === 'analyze_chunks' ? 'chunks' : 'gates'}` : '';
+                    const state = data.queued ? 'queued, waiting for a worker' : 'in progress';
+                    vscode.window.showInformationMessage(`Assessment ${state}... (${polls * 5}s${progressText})`);
                     setTimeout(poll, 5000); // Poll every 5 seconds
                 } else {
                     vscode.window.showWarningMessage('Assessment is taking longer than expected. Check API status.');
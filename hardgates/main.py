@@ -8,10 +8,14 @@ This tool analyzes GitHub repositories for hard gate compliance and generates HT
 import argparse
 import os
 import sys
-from core.flow import Flow
+from core.flow import Flow, ExponentialBackoff
+from nodes.resolve_commit import ResolveCommit
 from nodes.fetch_repo import FetchRepo
-from nodes.analyze_code import AnalyzeCode
+from nodes.static_scan import StaticScan
+from nodes.analyze_gates import create_analysis_node, ANALYSIS_MODES
 from nodes.generate_report import GenerateReport
+from utils.llm_client import get_prompt_cache_stats
+from utils.llm_cache import get_llm_cache_stats
 
 # Load environment variables from .env file if it exists
 try:
@@ -20,20 +24,28 @@ try:
 except ImportError:
     pass  # python-dotenv not installed, skip
 
-def create_assessment_flow():
+def create_assessment_flow(analysis_mode="monolithic"):
     """
     Create and return the hard gate assessment flow.
     """
     # Create nodes
+    resolve_commit = ResolveCommit()
     fetch_repo = FetchRepo(max_retries=2, wait=5)
-    analyze_code = AnalyzeCode(max_retries=3, wait=10)
+    static_scan = StaticScan()
+    # Back off on rate limits and transient errors, fail fast on fatal ones
+    analyze_code = create_analysis_node(
+        analysis_mode, ExponentialBackoff(max_retries=3, base_delay=2, max_delay=30, deadline=600)
+    )
     generate_report = GenerateReport()
     
     # Connect nodes in sequence
-    fetch_repo >> analyze_code >> generate_report
+    resolve_commit >> fetch_repo >> static_scan >> analyze_code >> generate_report
+    
+    # Unchanged commits skip straight to the output with the cached assessment
+    resolve_commit - "cached" >> generate_report
     
     # Create the flow
-    return Flow(start=fetch_repo)
+    return Flow(start=resolve_commit)
 
 def main():
     parser = argparse.ArgumentParser(
@@ -61,6 +73,12 @@ Environment Variables:
                        help="GitHub authentication token (can also use GITHUB_TOKEN env var)")
     parser.add_argument("--output", default="./hard_gate_assessment.html",
                        help="Output HTML file path (default: ./hard_gate_assessment.html)")
+    parser.add_argument("--analysis-mode", choices=ANALYSIS_MODES,
+                       default=os.getenv("HARDGATES_ANALYSIS_MODE", "monolithic"),
+                       help="One LLM call for all gates, parallel calls per gate category or per gate, "
+                            "or map_reduce over the whole repository (default: monolithic)")
+    parser.add_argument("--no-cache", action="store_true",
+                       help="Re-run the analysis even if this commit was already assessed")
     parser.add_argument("--verbose", "-v", action="store_true",
                        help="Enable verbose output")
     
@@ -89,6 +107,8 @@ Environment Variables:
         "github_token": github_token,
         "output_format": "html",
         "output_path": args.output,
+        "use_result_cache": not args.no_cache,
+        "analysis_mode": args.analysis_mode,
         "project_name": args.repo.split("/")[-1].replace(".git", "")
     }
     
@@ -102,7 +122,7 @@ Environment Variables:
     try:
         # Create and run the assessment flow
         print("Starting hard gate assessment...")
-        assessment_flow = create_assessment_flow()
+        assessment_flow = create_assessment_flow(args.analysis_mode)
         assessment_flow.run(shared)
         
         # Get the report path
@@ -129,6 +149,16 @@ Environment Variables:
         if findings_count > 0:
             print(f"🔍 Code Findings: {findings_count} issues identified")
         
+        prompt_cache = get_prompt_cache_stats()
+        if args.verbose and prompt_cache["requests"]:
+            print(f"🗄️  Prompt cache: {prompt_cache['cached_tokens']}/{prompt_cache['input_tokens']} input tokens "
+                  f"cached ({prompt_cache['hit_rate']:.0%}) over {prompt_cache['requests']} LLM calls")
+        
+        response_cache = get_llm_cache_stats()
+        if args.verbose and response_cache["enabled"]:
+            print(f"🗄️  LLM response cache: {response_cache['hits']} hits, {response_cache['misses']} misses, "
+                  f"{response_cache['entries']} entries ({response_cache['size_bytes'] / 1024 / 1024:.1f} MB)")
+        
         return 0
         
     except KeyboardInterrupt:
@@ -0,0 +1,301 @@
+import asyncio
+import threading
+from core.flow import ParallelBatchNode, AsyncParallelBatchNode
+from utils.llm_client import call_llm, acall_llm, get_llm_model_name, is_fallback_result
+from utils.gates import PRIMARY_HARD_GATES, GATES_BY_KEY, format_gate_list, format_requested_gates, gate_response_schema
+from utils.context_builder import shard_files, get_context_budget
+from nodes.analyze_code import record_analysis_results, merge_technology_stack
+
+# Verdicts a chunk can return; "not_applicable" means the chunk holds no code related to the gate
+CHUNK_VERDICTS = ("yes", "partial", "no", "not_applicable")
+
+MAX_EVIDENCE_ITEMS = 5
+
+class AnalyzeChunks(ParallelBatchNode, AsyncParallelBatchNode):
+    """
+    Assess the primary hard gates over the whole repository with a map-reduce pass.
+    
+    All files are sharded into token-sized chunks that are analyzed concurrently (map),
+    then the per-chunk verdicts, evidence and findings are merged into one result (reduce).
+    In an AsyncFlow the chunks run as coroutines with the async LLM client.
+    Progress and the partial verdict are reported through shared["progress_callback"]
+    as chunks complete.
+    """
+    
+    def __init__(self, max_retries=1, wait=0, max_concurrency=8, chunk_tokens=None, retry_policy=None):
+        super().__init__(max_retries, wait, max_concurrency, retry_policy=retry_policy)
+        # Defaults to the model's context budget
+        self.chunk_tokens = chunk_tokens
+    
+    def prep(self, shared):
+        """
+        Shard the repository into chunks and build a prompt for each.
+        """
+        files_data = shared.get("files_data", {})
+        project_name = shared.get("project_name", "Unknown Project")
+        static_gate_results = shared.get("static_gate_results", {})
+        
+        if not files_data:
+            raise ValueError("No files data found. Repository fetch may have failed.")
+        
+        # Only ask the LLM about gates the static pre-scan could not resolve
+        pending_gates = [gate for gate in PRIMARY_HARD_GATES if gate["key"] not in static_gate_results]
+        if not pending_gates:
+            print("All hard gates resolved by static analysis, skipping LLM analysis")
+            return []
+        
+        chunk_tokens = self.chunk_tokens or get_context_budget(get_llm_model_name())
+        chunks = shard_files(files_data, chunk_tokens)
+        
+        print(f"Analyzing {len(files_data)} files in {len(chunks)} chunks of up to {chunk_tokens} tokens...")
+        
+        gate_keys = [gate["key"] for gate in pending_gates]
+        progress = ChunkProgress(len(chunks), gate_keys, shared.get("progress_callback"))
+        
+        # Every chunk (and every repository) shares the same instructions, so providers can cache them
+        system_prompt = self._build_system_prompt()
+        response_schema = gate_response_schema(gate_keys, CHUNK_VERDICTS)
+        
+        work_items = []
+        for index, chunk in enumerate(chunks):
+            request = {
+                "prompt": self._build_prompt(project_name, len(files_data), index, len(chunks), pending_gates, chunk),
+                "system_prompt": system_prompt,
+                "response_schema": response_schema,
+                "use_cache": shared.get("use_result_cache", True)
+            }
+            work_items.append((index, gate_keys, request, progress))
+        
+        return work_items
+    
+    def _build_system_prompt(self):
+        """
+        Build the instructions shared by every chunk, covering all primary hard gates.
+        """
+        gate_entries = ",\n".join(
+            f'    "{gate["key"]}": {{"implemented": "yes|partial|no|not_applicable", "evidence": "...", "recommendation": "..."}}'
+            for gate in PRIMARY_HARD_GATES
+        )
+        
+        return f"""You assess one chunk of a codebase at a time. The other chunks are analyzed separately,
+so judge each gate ONLY from the code in the chunk you are given.
+Use "not_applicable" for a gate when the chunk contains no code related to it.
+
+THE PRIMARY HARD GATES:
+
+{format_gate_list(PRIMARY_HARD_GATES)}
+
+Each request lists the gates to assess. ANALYZE ONLY THOSE GATES.
+
+Return ONLY valid JSON with this structure, with an entry for each requested gate only:
+
+{{
+  "technology_stack": {{"languages": [], "frameworks": [], "databases": []}},
+  "findings": [
+    {{"category": "...", "severity": "high|medium|low", "description": "...", "location": "file:line", "recommendation": "..."}}
+  ],
+  "primary_hard_gates": {{
+{gate_entries}
+  }}
+}}
+
+Cite file paths and line numbers from the chunk in the evidence."""
+
+    def _build_prompt(self, project_name, file_count, index, chunk_count, gates, chunk):
+        """
+        Build the chunk-specific part of the prompt.
+        """
+        return f"""This is chunk {index + 1} of {chunk_count} of the {project_name} codebase ({file_count} files).
+
+Assess ONLY these gates:
+{format_requested_gates(gates)}
+
+CODE:
+{chunk}"""
+
+    def exec(self, work_item):
+        """
+        Assess the gates for one chunk.
+        """
+        index, gate_keys, request, progress = work_item
+        return self._chunk_result(work_item, call_llm(**request))
+    
+    async def exec_async(self, work_item):
+        """
+        Assess the gates for one chunk with the async LLM client.
+        """
+        index, gate_keys, request, progress = work_item
+        return self._chunk_result(work_item, await acall_llm(**request))
+    
+    def _chunk_result(self, work_item, result):
+        """
+        Keep the verdicts for the pending gates and record progress, failing if none were returned
+        or the reply could not be parsed.
+        """
+        index, gate_keys, request, progress = work_item
+        
+        # Verdicts guessed from an unparseable reply are retried, then left to exec_fallback
+        if is_fallback_result(result):
+            raise ValueError(f"Unparseable reply for chunk {index + 1}")
+        
+        gates = result.get("primary_hard_gates", {})
+        if not any(key in gates for key in gate_keys):
+            raise ValueError(f"No verdicts returned for chunk {index + 1}")
+        
+        chunk_result = {
+            "primary_hard_gates": {key: gates[key] for key in gate_keys if key in gates},
+            "technology_stack": result.get("technology_stack", {}),
+            "findings": result.get("findings", [])
+        }
+        progress.record(chunk_result)
+        return chunk_result
+    
+    def exec_fallback(self, work_item, exc):
+        """
+        Leave the chunk out of the verdict instead of failing the whole analysis.
+        """
+        index, gate_keys, request, progress = work_item
+        print(f"Error analyzing chunk {index + 1}: {str(exc)}")
+        
+        chunk_result = {"error": str(exc), "primary_hard_gates": {}}
+        progress.record(chunk_result)
+        return chunk_result
+    
+    async def prep_async(self, shared):
+        # Sharding is CPU-bound, keep it off the event loop
+        return await asyncio.to_thread(self.prep, shared)
+    
+    async def exec_fallback_async(self, work_item, exc):
+        return self.exec_fallback(work_item, exc)
+    
+    async def post_async(self, shared, prep_res, exec_res_list):
+        return await asyncio.to_thread(self.post, shared, prep_res, exec_res_list)
+    
+    def post(self, shared, prep_res, exec_res_list):
+        """
+        Reduce the chunk results into one assessment and store it like AnalyzeCode does.
+        """
+        project_name = shared.get("project_name", "Unknown Project")
+        gate_keys = prep_res[0][1] if prep_res else []
+        
+        technology_stack = {"languages": [], "frameworks": [], "databases": []}
+        findings = []
+        seen_findings = set()
+        errors = []
+        
+        for result in exec_res_list:
+            if result.get("error"):
+                errors.append(result["error"])
+            merge_technology_stack(technology_stack, result.get("technology_stack", {}))
+            
+            for finding in result.get("findings", []):
+                if not isinstance(finding, dict):
+                    continue
+                finding_key = (finding.get("location"), finding.get("description"))
+                if finding_key not in seen_findings:
+                    seen_findings.add(finding_key)
+                    findings.append(finding)
+        
+        analysis_results = {
+            "technology_stack": technology_stack,
+            "findings": findings,
+            "component_analysis": {},
+            "primary_hard_gates": reduce_gate_verdicts(exec_res_list, gate_keys)
+        }
+        if errors:
+            # Incomplete coverage, so the result is reported but not cached
+            analysis_results["error"] = f"{len(errors)} of {len(exec_res_list)} chunks failed: {errors[0]}"
+        
+        record_analysis_results(shared, analysis_results)
+        
+        print(f"Hard gate assessment completed for {project_name}")
+        return "default"
+
+class ChunkProgress:
+    """
+    Thread-safe record of completed chunks that reports progress and the partial verdict.
+    """
+    
+    def __init__(self, total, gate_keys, callback=None):
+        self.total = total
+        self.gate_keys = gate_keys
+        self.callback = callback
+        self.results = []
+        self.lock = threading.Lock()
+    
+    def record(self, chunk_result):
+        """
+        Record a finished chunk and notify the progress callback.
+        """
+        with self.lock:
+            self.results.append(chunk_result)
+            completed = len(self.results)
+            failed = sum(1 for result in self.results if result.get("error"))
+            partial_gates = reduce_gate_verdicts(self.results, self.gate_keys, assessed_only=True) if self.callback else None
+        
+        print(f"Chunk progress: {completed}/{self.total} analyzed ({failed} failed)")
+        
+        if self.callback:
+            try:
+                self.callback({
+                    "stage": "analyze_chunks",
+                    "completed": completed,
+                    "failed": failed,
+                    "total": self.total,
+                    "partial_gates": partial_gates
+                })
+            except Exception as e:
+                print(f"Warning: Progress callback failed: {str(e)}")
+
+def reduce_gate_verdicts(chunk_results, gate_keys, assessed_only=False):
+    """
+    Merge per-chunk gate verdicts into one verdict per gate.
+    
+    A gate is "yes" if every chunk with related code implements it, "no" if none does,
+    and "partial" otherwise. Chunks without related code are ignored.
+    
+    Args:
+        chunk_results: Chunk results with a primary_hard_gates entry
+        gate_keys: Gates to reduce
+        assessed_only: Leave out gates no chunk has assessed yet, for partial results
+    
+    Returns:
+        primary_hard_gates dictionary
+    """
+    reduced = {}
+    for key in gate_keys:
+        verdicts = []
+        for result in chunk_results:
+            verdict = result.get("primary_hard_gates", {}).get(key)
+            if isinstance(verdict, dict) and verdict.get("implemented") in CHUNK_VERDICTS[:3]:
+                verdicts.append(verdict)
+        
+        if not verdicts:
+            if not assessed_only:
+                reduced[key] = {
+                    "implemented": "no",
+                    "evidence": "No related code found in any chunk",
+                    "recommendation": GATES_BY_KEY[key]["recommendation"]
+                }
+            continue
+        
+        statuses = {verdict["implemented"] for verdict in verdicts}
+        if statuses == {"yes"}:
+            implemented = "yes"
+        elif statuses == {"no"}:
+            implemented = "no"
+        else:
+            implemented = "partial"
+        
+        # Supporting evidence first, then the gaps
+        ordered = sorted(verdicts, key=lambda verdict: CHUNK_VERDICTS.index(verdict["implemented"]))
+        evidence = list(dict.fromkeys(str(verdict.get("evidence", "")) for verdict in ordered if verdict.get("evidence")))
+        # The recommendation comes from the weakest chunk
+        recommendation = ordered[-1].get("recommendation") or GATES_BY_KEY[key]["recommendation"]
+        
+        reduced[key] = {
+            "implemented": implemented,
+            "evidence": "; ".join(evidence[:MAX_EVIDENCE_ITEMS]),
+            "recommendation": recommendation
+        }
+    return reduced
@@ -1,7 +1,13 @@
-import os
 import json
 from core.flow import Node
-from utils.llm_client import call_llm
+from utils.llm_client import call_llm, get_llm_model_name, is_fallback_result
+from utils.context_builder import build_context, get_context_budget
+from utils.result_cache import store_cached_result
+from utils.gates import (PRIMARY_HARD_GATES, PRIMARY_GATE_KEYS, format_gate_list, format_gate_examples,
+                         format_requested_gates, gate_response_schema, calculate_compliance_metrics)
+
+# Bump whenever the analysis prompt changes so cached results are not reused
+PROMPT_VERSION = "6"
 
 class AnalyzeCode(Node):
     def prep(self, shared):
@@ -10,90 +16,103 @@ class AnalyzeCode(Node):
         """
         files_data = shared.get("files_data", {})
         project_name = shared.get("project_name", "Unknown Project")
+        static_gate_results = shared.get("static_gate_results", {})
         
         if not files_data:
             raise ValueError("No files data found. Repository fetch may have failed.")
         
-        # Create context for LLM analysis
-        context = self._create_llm_context(files_data)
+        # Only ask the LLM about gates the static pre-scan could not resolve
+        pending_gates = [gate for gate in PRIMARY_HARD_GATES if gate["key"] not in static_gate_results]
+        
+        # Create context for LLM analysis, ranked by relevance to the pending gates
+        context_pack = self._create_llm_context(files_data, pending_gates)
         file_count = len(files_data)
         
-        return context, file_count, project_name
+        # Report each verdict as it streams in
+        on_gate = gate_progress_reporter(shared.get("progress_callback"), static_gate_results, len(pending_gates))
+        
+        # --no-cache also skips stored LLM responses
+        use_cache = shared.get("use_result_cache", True)
+        
+        return context_pack, file_count, project_name, pending_gates, on_gate, use_cache
     
-    def _create_llm_context(self, files_data):
+    def _create_llm_context(self, files_data, gates):
         """
-        Create formatted context from files data for LLM analysis.
+        Pack the most gate-relevant files into the model's context token budget.
         """
-        context_parts = []
-        
-        # Sort files by extension to group similar files together
-        sorted_files = sorted(files_data.items(), key=lambda x: os.path.splitext(x[0])[1])
-        
-        # Add file snippets to provide context (limit to first 20 files)
-        file_count = 0
-        for file_path, file_content in sorted_files:
-            if file_count >= 20:
-                break
-                
-            # Skip very large files for context
-            if len(file_content) > 5000:
-                continue
-                
-            # Truncate very large files
-            if len(file_content) > 3000:
-                file_content = file_content[:1500] + "\n...\n" + file_content[-1500:]
-                
-            context_parts.append(f"File: {file_path}\n```\n{file_content}\n```\n")
-            file_count += 1
-            
-        # Add a summary of file extensions
-        extensions = {}
-        for file_path in files_data.keys():
-            _, ext = os.path.splitext(file_path)
-            if ext:
-                extensions[ext] = extensions.get(ext, 0) + 1
-                
-        ext_summary = "\nFile Extension Summary:\n"
-        for ext, count in extensions.items():
-            ext_summary += f"- {ext}: {count} files\n"
-            
-        context_parts.append(ext_summary)
-        
-        return "\n".join(context_parts)
+        token_budget = get_context_budget(get_llm_model_name())
+        context_pack = build_context(files_data, token_budget, gates)
+        
+        print(f"Packed {len(context_pack['included'])} of {len(files_data)} files into "
+              f"~{context_pack['tokens']}/{context_pack['token_budget']} context tokens "
+              f"({len(context_pack['excerpted'])} excerpted, {len(context_pack['omitted'])} omitted)")
+        
+        return context_pack
     
     def exec(self, prep_res):
         """
         Perform hard gate assessment using LLM analysis.
         """
-        context, file_count, project_name = prep_res
+        context_pack, file_count, project_name, pending_gates, on_gate, use_cache = prep_res
+        
+        if not pending_gates:
+            print("All hard gates resolved by static analysis, skipping LLM analysis")
+            return {
+                "technology_stack": {},
+                "findings": [],
+                "component_analysis": {},
+                "primary_hard_gates": {}
+            }
         
-        print(f"Analyzing {file_count} files for hard gate assessment...")
+        print(f"Analyzing {file_count} files for {len(pending_gates)} hard gates...")
         
-        # Create focused hard gate assessment prompt for the specific 15 items
-        prompt = f"""Analyze this {project_name} codebase ({file_count} files) for the following 15 PRIMARY HARD GATES ONLY.
+        # The gate instructions are identical on every call, so they form a cacheable prefix;
+        # which gates are still pending depends on the repository and goes in the prompt
+        system_prompt = self._build_system_prompt()
+        prompt = f"""Analyze this {project_name} codebase ({file_count} files). Assess ONLY these {len(pending_gates)} primary hard gates and include only their keys in "primary_hard_gates":
 
-CODE SAMPLES:
-{context[:4000]}...
+{format_requested_gates(pending_gates)}
 
-ANALYZE ONLY THESE 15 PRIMARY HARD GATES WITH COMPREHENSIVE ASSESSMENT:
+CODE SAMPLES (most relevant files first, long files reduced to numbered excerpts):
+{context_pack["text"]}"""
 
-1. **Logs are searchable and available** - Check for logging frameworks (SLF4J, Logback, Log4j), log configuration files, log levels setup
-2. **Avoid logging confidential data** - Scan for patterns like password, token, secret, api_key, credential in log statements
-3. **Create audit trail logs** - Look for audit logging, business event logging, user action tracking
-4. **Implement tracking ID for log messages** - Search for correlation IDs, trace IDs, MDC usage, request tracking
-5. **Log REST API calls** - Check for HTTP request/response logging, API interceptors, middleware logging
-6. **Log application messages** - Verify general application logging practices and structured logging
-7. **Client UI errors are logged** - Look for frontend error handling, error reporting mechanisms to backend
-8. **Retry Logic** - Search for retry patterns, @Retryable annotations, retry libraries (Resilience4j, Spring Retry)
-9. **Set timeouts on IO operation** - Check HTTP client timeouts, database connection timeouts, external service timeouts
-10. **Throttling, drop request** - Look for rate limiting, request throttling, circuit breaker patterns
-11. **Set circuit breakers on outgoing requests** - Search for circuit breaker implementations (Hystrix, Resilience4j)
-12. **Log system errors** - Verify exception logging in catch blocks, error handling patterns
-13. **Use HTTP standard error codes** - Check REST controller response codes, error response patterns
-14. **Include Client error tracking** - Look for client-side error tracking, error headers, frontend monitoring
-15. **Automated Regression Testing** - Check for test files, test frameworks (JUnit, TestNG), CI/CD test automation
+        gate_keys = [gate["key"] for gate in pending_gates]
+        result = call_llm(prompt, on_gate=on_gate, expected_gates=gate_keys,
+                          response_schema=gate_response_schema(gate_keys, include_components=True),
+                          system_prompt=system_prompt, use_cache=use_cache)
+        print("LLM analysis completed successfully")
+        return result
+    
+    def exec_fallback(self, prep_res, exc):
+        """
+        Return an empty result once the retry policy gives up, so the report still renders.
+        """
+        print(f"Error during LLM analysis: {str(exc)}")
+        return {
+            "technology_stack": {},
+            "findings": [],
+            "component_analysis": {},
+            "primary_hard_gates": {},
+            "error": str(exc)
+        }
+    
+    def _build_system_prompt(self):
+        """
+        Build the instructions and response structure for all primary hard gates. They do not
+        depend on the repository or on which gates the static pre-scan resolved.
+        """
+        gate_count = len(PRIMARY_HARD_GATES)
+        gate_list = format_gate_list(PRIMARY_HARD_GATES)
+        gate_examples = format_gate_examples(PRIMARY_HARD_GATES)
+        
+        return f"""You assess codebases for the following {gate_count} PRIMARY HARD GATES ONLY.
+
+THE {gate_count} PRIMARY HARD GATES:
+
+{gate_list}
 
-PROVIDE DETAILED EVIDENCE AND SPECIFIC RECOMMENDATIONS FOR EACH GATE.
+Each request lists the gates to assess. ANALYZE ONLY THOSE GATES WITH COMPREHENSIVE ASSESSMENT,
+PROVIDE DETAILED EVIDENCE AND SPECIFIC RECOMMENDATIONS FOR EACH OF THEM.
 
 Return ONLY valid JSON with this exact structure:
 
@@ -126,77 +145,109 @@ Return ONLY valid JSON with this exact structure:
     "circuit_breaker": {{"detected": "no", "evidence": "No circuit breaker implementation"}}
   }},
   "primary_hard_gates": {{
-    "logs_searchable_available": {{"implemented": "yes", "evidence": "SLF4J logging configured with proper log levels", "recommendation": "Ensure log aggregation is setup for searchability"}},
-    "avoid_logging_confidential_data": {{"implemented": "partial", "evidence": "Some logging patterns found but need review", "recommendation": "Audit all log statements to ensure no sensitive data like passwords, tokens, or API keys are logged"}},
-    "create_audit_trail_logs": {{"implemented": "no", "evidence": "No dedicated audit logging found", "recommendation": "Implement audit trail logging for important business operations and user actions"}},
-    "tracking_id_for_log_messages": {{"implemented": "no", "evidence": "No correlation IDs or MDC usage found", "recommendation": "Add MDC (Mapped Diagnostic Context) or similar for request tracking across logs"}},
-    "log_rest_api_calls": {{"implemented": "partial", "evidence": "Some controller logging detected", "recommendation": "Add comprehensive API request/response logging using interceptors or filters"}},
-    "log_application_messages": {{"implemented": "yes", "evidence": "Application logging present throughout codebase", "recommendation": "Standardize log levels and ensure consistent logging format"}},
-    "client_ui_errors_logged": {{"implemented": "no", "evidence": "No client-side error logging mechanism found", "recommendation": "Implement frontend error reporting mechanism to send client errors to backend logging"}},
-    "retry_logic": {{"implemented": "no", "evidence": "No retry patterns or libraries found", "recommendation": "Implement retry logic for external service calls using Spring Retry or Resilience4j"}},
-    "set_timeouts_io_operations": {{"implemented": "partial", "evidence": "Some timeout configurations found", "recommendation": "Ensure all IO operations (HTTP clients, DB connections) have appropriate timeout settings"}},
-    "throttling_drop_request": {{"implemented": "no", "evidence": "No rate limiting or throttling mechanisms found", "recommendation": "Implement request throttling and rate limiting to protect against abuse"}},
-    "circuit_breakers_outgoing_requests": {{"implemented": "no", "evidence": "No circuit breaker patterns found", "recommendation": "Implement circuit breakers for external service calls to prevent cascade failures"}},
-    "log_system_errors": {{"implemented": "yes", "evidence": "Exception logging found in catch blocks", "recommendation": "Ensure all exceptions are properly logged with sufficient context"}},
-    "use_http_standard_error_codes": {{"implemented": "yes", "evidence": "Standard HTTP status codes used in REST controllers", "recommendation": "Continue using appropriate HTTP status codes for all API responses"}},
-    "include_client_error_tracking": {{"implemented": "no", "evidence": "No client error tracking mechanism detected", "recommendation": "Add mechanism to track and log client-side errors with proper correlation to server logs"}},
-    "automated_regression_testing": {{"implemented": "partial", "evidence": "Unit tests found but limited coverage", "recommendation": "Expand automated test suite to include comprehensive regression and integration tests"}}
+{gate_examples}
   }}
 }}
 
-Analyze the ACTUAL CODE PATTERNS and provide SPECIFIC EVIDENCE with file paths and line numbers where possible. Give ACTIONABLE RECOMMENDATIONS for each of the 15 primary hard gates."""
+Analyze the ACTUAL CODE PATTERNS and provide SPECIFIC EVIDENCE with file paths and line numbers where possible. Give ACTIONABLE RECOMMENDATIONS for each requested gate, and leave gates that were not requested out of "primary_hard_gates"."""
 
-        try:
-            result = call_llm(prompt)
-            print("LLM analysis completed successfully")
-            return result
-        except Exception as e:
-            print(f"Error during LLM analysis: {str(e)}")
-            # Return a fallback structure
-            return {
-                "technology_stack": {},
-                "findings": [],
-                "component_analysis": {},
-                "primary_hard_gates": {},
-                "error": str(e)
-            }
-    
     def post(self, shared, prep_res, exec_res):
         """
         Store analysis results in shared store.
         """
-        context, file_count, project_name = prep_res
-        analysis_results = exec_res
-        
-        # Store the complete analysis results
-        shared["assessment_results"] = analysis_results
-        
-        # Calculate compliance for the 15 primary hard gates
-        primary_gates = analysis_results.get("primary_hard_gates", {})
-        if primary_gates:
-            total_gates = len(primary_gates)
-            gates_implemented = sum(1 for gate in primary_gates.values() 
-                                  if isinstance(gate, dict) and gate.get("implemented") == "yes")
-            gates_partial = sum(1 for gate in primary_gates.values() 
-                              if isinstance(gate, dict) and gate.get("implemented") == "partial")
-            gates_not_implemented = total_gates - gates_implemented - gates_partial
-            
-            compliance_percentage = ((gates_implemented + 0.5 * gates_partial) / total_gates * 100) if total_gates > 0 else 0
-            
-            print(f"Hard Gates Compliance: {compliance_percentage:.1f}% ({gates_implemented}/{total_gates})")
-            
-            # Store compliance metrics
-            shared["compliance_metrics"] = {
-                "total_gates": total_gates,
-                "gates_implemented": gates_implemented,
-                "gates_partial": gates_partial,
-                "gates_not_implemented": gates_not_implemented,
-                "compliance_percentage": compliance_percentage
-            }
+        context_pack, file_count, project_name, pending_gates, on_gate, use_cache = prep_res
+        
+        # Record what the prompt contained and what was left out
+        shared["context_report"] = {key: value for key, value in context_pack.items() if key != "text"}
+        
+        record_analysis_results(shared, exec_res)
         
         print(f"Hard gate assessment completed for {project_name}")
         return "default"
 
+def record_analysis_results(shared, analysis_results):
+    """
+    Store analysis results and compliance metrics in the shared store and cache them by commit.
+    """
+    # Gates resolved by the static pre-scan were not sent to the LLM
+    static_gate_results = shared.get("static_gate_results", {})
+    if static_gate_results:
+        llm_gates = analysis_results.get("primary_hard_gates", {})
+        merged_gates = {**llm_gates, **static_gate_results}
+        # Keep report order, followed by anything extra the LLM returned
+        ordered_keys = [key for key in PRIMARY_GATE_KEYS if key in merged_gates]
+        ordered_keys += [key for key in merged_gates if key not in ordered_keys]
+        analysis_results["primary_hard_gates"] = {key: merged_gates[key] for key in ordered_keys}
+    
+    # Store the complete analysis results
+    shared["assessment_results"] = analysis_results
+    
+    # Calculate compliance for the 15 primary hard gates
+    primary_gates = analysis_results.get("primary_hard_gates", {})
+    if primary_gates:
+        compliance_metrics = calculate_compliance_metrics(primary_gates)
+        
+        print(f"Hard Gates Compliance: {compliance_metrics['compliance_percentage']:.1f}% "
+              f"({compliance_metrics['gates_implemented']}/{compliance_metrics['total_gates']})")
+        
+        # Store compliance metrics
+        shared["compliance_metrics"] = compliance_metrics
+    
+    # Cache successful analyses by commit so unchanged branches skip the LLM next time.
+    # The cache has no expiry, so verdicts guessed from an unparseable reply never go in.
+    cache_key = shared.get("result_cache_key")
+    if cache_key and primary_gates and "error" not in analysis_results and not is_fallback_result(analysis_results):
+        store_cached_result(cache_key, {
+            "repo_url": shared.get("repo_url"),
+            "commit_sha": shared.get("commit_sha"),
+            "prompt_version": PROMPT_VERSION,
+            "assessment_results": analysis_results,
+            "compliance_metrics": shared.get("compliance_metrics"),
+            "file_summary": shared.get("file_summary", {})
+        })
+
+def gate_progress_reporter(progress_callback, static_gate_results, total):
+    """
+    Return an on_gate callback that reports streamed verdicts through progress_callback.
+    
+    Each report carries the verdicts received so far, including the statically resolved gates.
+    """
+    if not progress_callback:
+        return None
+    
+    partial_gates = dict(static_gate_results)
+    received = []
+    
+    def on_gate(gate_key, verdict):
+        partial_gates[gate_key] = verdict
+        received.append(gate_key)
+        try:
+            progress_callback({
+                "stage": "analyze_code",
+                "completed": len(received),
+                "total": total,
+                "partial_gates": dict(partial_gates)
+            })
+        except Exception as e:
+            print(f"Warning: Progress callback failed: {str(e)}")
+    
+    return on_gate
+
+def merge_technology_stack(technology_stack, other):
+    """
+    Merge another technology_stack result into technology_stack, keeping the first entry per name.
+    """
+    for section, entries in other.items():
+        if not isinstance(entries, list):
+            continue
+        known = {entry.get("name") if isinstance(entry, dict) else entry
+                 for entry in technology_stack.setdefault(section, [])}
+        for entry in entries:
+            name = entry.get("name") if isinstance(entry, dict) else entry
+            if name not in known:
+                technology_stack[section].append(entry)
+                known.add(name)
+
 if __name__ == "__main__":
     # Test the node with sample data
     sample_assessment = {
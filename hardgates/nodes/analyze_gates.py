@@ -0,0 +1,242 @@
+import os
+import asyncio
+from core.flow import ParallelBatchNode, AsyncParallelBatchNode
+from utils.llm_client import call_llm, acall_llm, get_llm_model_name, is_fallback_result
+from utils.gates import PRIMARY_HARD_GATES, gates_by_category, format_gate_list, format_requested_gates, gate_response_schema
+from utils.context_builder import build_context, find_gate_keywords, get_context_budget
+from nodes.analyze_code import AnalyzeCode, record_analysis_results, merge_technology_stack
+from nodes.analyze_chunks import AnalyzeChunks
+
+# Analysis modes: one prompt for all gates, one prompt per gate category, one prompt per gate,
+# or one prompt per token-sized chunk of the whole repository
+ANALYSIS_MODES = ("monolithic", "per_category", "per_gate", "map_reduce")
+
+class AnalyzeGates(ParallelBatchNode, AsyncParallelBatchNode):
+    """
+    Assess the primary hard gates with one focused LLM call per gate or per gate category.
+    
+    Each call gets evidence selected for its own gates and the calls run concurrently,
+    on a thread pool in a Flow or as coroutines with the async LLM client in an AsyncFlow.
+    The results are merged into the same structure AnalyzeCode produces.
+    """
+    
+    def __init__(self, max_retries=1, wait=0, max_concurrency=8, evidence_tokens=None, retry_policy=None):
+        super().__init__(max_retries, wait, max_concurrency, retry_policy=retry_policy)
+        # Defaults to half of the model's context budget, as each group covers fewer gates
+        self.evidence_tokens = evidence_tokens
+    
+    def prep(self, shared):
+        """
+        Split the gates into groups and build a prompt with relevant evidence for each.
+        """
+        files_data = shared.get("files_data", {})
+        project_name = shared.get("project_name", "Unknown Project")
+        analysis_mode = shared.get("analysis_mode", "per_category")
+        static_gate_results = shared.get("static_gate_results", {})
+        
+        if not files_data:
+            raise ValueError("No files data found. Repository fetch may have failed.")
+        
+        if analysis_mode == "per_gate":
+            groups = [(gate["title"], [gate]) for gate in PRIMARY_HARD_GATES]
+        else:
+            groups = list(gates_by_category().items())
+        
+        # Only ask the LLM about gates the static pre-scan could not resolve
+        groups = [(group_name, [gate for gate in gates if gate["key"] not in static_gate_results])
+                  for group_name, gates in groups]
+        groups = [(group_name, gates) for group_name, gates in groups if gates]
+        
+        print(f"Analyzing {len(files_data)} files in {len(groups)} parallel gate groups...")
+        
+        # One set of instructions for every group and repository, so providers can cache it
+        system_prompt = self._build_system_prompt()
+        
+        # Scan the repository once for every group's keywords, each group's context is packed from the hits
+        keyword_hits = find_gate_keywords(files_data, [gate for _, gates in groups for gate in gates])
+        
+        work_items = []
+        for group_name, gates in groups:
+            gate_keys = [gate["key"] for gate in gates]
+            evidence = self._collect_evidence(files_data, gates, keyword_hits)
+            request = {
+                "prompt": self._build_prompt(project_name, len(files_data), gates, evidence),
+                "system_prompt": system_prompt,
+                "response_schema": gate_response_schema(gate_keys),
+                "use_cache": shared.get("use_result_cache", True)
+            }
+            work_items.append((group_name, gate_keys, request))
+        
+        return work_items
+    
+    def _collect_evidence(self, files_data, gates, keyword_hits):
+        """
+        Select excerpts around lines that mention the gates' keywords, most relevant files first.
+        """
+        token_budget = self.evidence_tokens or get_context_budget(get_llm_model_name()) // 2
+        context_pack = build_context(files_data, token_budget, gates, require_match=True, include_summary=False,
+                                     keyword_hits=keyword_hits)
+        
+        if not context_pack["included"]:
+            return "No files mention these practices."
+        return context_pack["text"]
+    
+    def _build_system_prompt(self):
+        """
+        Build the instructions for all primary hard gates, shared by every group and repository.
+        """
+        gate_entries = ",\n".join(
+            f'    "{gate["key"]}": {{"implemented": "yes|partial|no", "evidence": "...", "recommendation": "..."}}'
+            for gate in PRIMARY_HARD_GATES
+        )
+        
+        return f"""You assess codebases for the following PRIMARY HARD GATES ONLY.
+
+THE PRIMARY HARD GATES:
+
+{format_gate_list(PRIMARY_HARD_GATES)}
+
+Each request lists the gates to assess. ANALYZE ONLY THOSE GATES.
+
+Return ONLY valid JSON with this structure, with an entry for each requested gate only:
+
+{{
+  "technology_stack": {{"languages": [], "frameworks": [], "databases": []}},
+  "findings": [
+    {{"category": "...", "severity": "high|medium|low", "description": "...", "location": "file:line", "recommendation": "..."}}
+  ],
+  "primary_hard_gates": {{
+{gate_entries}
+  }}
+}}
+
+Base every verdict on the code excerpts you are given and cite file paths and line numbers in the evidence."""
+
+    def _build_prompt(self, project_name, file_count, gates, evidence):
+        """
+        Build the repository-specific part of the prompt for a group of gates.
+        """
+        return f"""Analyze this {project_name} codebase ({file_count} files). Assess ONLY these gates:
+{format_requested_gates(gates)}
+
+RELEVANT CODE EXCERPTS (line numbers prefixed):
+{evidence}"""
+
+    def exec(self, work_item):
+        """
+        Assess one group of gates.
+        """
+        group_name, gate_keys, request = work_item
+        return self._group_result(work_item, call_llm(**request))
+    
+    async def exec_async(self, work_item):
+        """
+        Assess one group of gates with the async LLM client.
+        """
+        group_name, gate_keys, request = work_item
+        return self._group_result(work_item, await acall_llm(**request))
+    
+    def _group_result(self, work_item, result):
+        """
+        Keep the verdicts for the group's gates, failing if none were returned or the reply could
+        not be parsed.
+        """
+        group_name, gate_keys, request = work_item
+        
+        # Verdicts guessed from an unparseable reply are retried, then left to exec_fallback
+        if is_fallback_result(result):
+            raise ValueError(f"Unparseable reply for {group_name}")
+        
+        gates = result.get("primary_hard_gates", {})
+        missing = [key for key in gate_keys if key not in gates]
+        if len(missing) == len(gate_keys):
+            raise ValueError(f"No verdicts returned for {group_name}")
+        
+        print(f"Gate group '{group_name}' analyzed")
+        return {
+            "primary_hard_gates": {key: gates[key] for key in gate_keys if key in gates},
+            "technology_stack": result.get("technology_stack", {}),
+            "findings": result.get("findings", []),
+            "component_analysis": result.get("component_analysis", {})
+        }
+    
+    def exec_fallback(self, work_item, exc):
+        """
+        Mark the group's gates as unassessed instead of failing the whole analysis.
+        """
+        group_name, gate_keys, request = work_item
+        print(f"Error analyzing gate group '{group_name}': {str(exc)}")
+        return {"error": str(exc), "primary_hard_gates": {}}
+    
+    async def prep_async(self, shared):
+        # Evidence selection is CPU-bound, keep it off the event loop
+        return await asyncio.to_thread(self.prep, shared)
+    
+    async def exec_fallback_async(self, work_item, exc):
+        return self.exec_fallback(work_item, exc)
+    
+    async def post_async(self, shared, prep_res, exec_res_list):
+        return await asyncio.to_thread(self.post, shared, prep_res, exec_res_list)
+    
+    def post(self, shared, prep_res, exec_res_list):
+        """
+        Merge the group results and store them like AnalyzeCode does.
+        """
+        project_name = shared.get("project_name", "Unknown Project")
+        
+        merged_gates = {}
+        technology_stack = {"languages": [], "frameworks": [], "databases": []}
+        findings = []
+        component_analysis = {}
+        errors = []
+        
+        for result in exec_res_list:
+            if result.get("error"):
+                errors.append(result["error"])
+            merged_gates.update(result.get("primary_hard_gates", {}))
+            findings.extend(result.get("findings", []))
+            component_analysis.update(result.get("component_analysis", {}))
+            
+            merge_technology_stack(technology_stack, result.get("technology_stack", {}))
+        
+        # Gates whose group failed are reported as not verified
+        static_gate_results = shared.get("static_gate_results", {})
+        for gate in PRIMARY_HARD_GATES:
+            if gate["key"] not in merged_gates and gate["key"] not in static_gate_results:
+                merged_gates[gate["key"]] = {
+                    "implemented": "no",
+                    "evidence": "Gate could not be assessed",
+                    "recommendation": gate["recommendation"]
+                }
+        
+        analysis_results = {
+            "technology_stack": technology_stack,
+            "findings": findings,
+            "component_analysis": component_analysis,
+            "primary_hard_gates": merged_gates
+        }
+        if errors:
+            analysis_results["error"] = "; ".join(errors)
+        
+        record_analysis_results(shared, analysis_results)
+        
+        print(f"Hard gate assessment completed for {project_name}")
+        return "default"
+
+def create_analysis_node(analysis_mode, retry_policy):
+    """
+    Create the analysis node for an analysis mode.
+    
+    The retry policy applies to each LLM call (each gate group or chunk in the parallel modes).
+    """
+    if analysis_mode not in ANALYSIS_MODES:
+        raise ValueError(f"Unsupported analysis mode: {analysis_mode}")
+    
+    if analysis_mode == "monolithic":
+        return AnalyzeCode(retry_policy=retry_policy)
+    
+    max_concurrency = int(os.getenv("HARDGATES_LLM_CONCURRENCY", "8"))
+    if analysis_mode == "map_reduce":
+        chunk_tokens = int(os.getenv("HARDGATES_CHUNK_TOKENS", "0")) or None
+        return AnalyzeChunks(max_concurrency=max_concurrency, chunk_tokens=chunk_tokens, retry_policy=retry_policy)
+    return AnalyzeGates(max_concurrency=max_concurrency, retry_policy=retry_policy)
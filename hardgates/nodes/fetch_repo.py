@@ -1,6 +1,7 @@
 import os
 from core.flow import Node
-from utils.github_client import fetch_github_repo
+from utils.github_client import fetch_github_commit
+from nodes.resolve_commit import assessment_cache_key
 
 class FetchRepo(Node):
     def prep(self, shared):
@@ -14,22 +15,22 @@ class FetchRepo(Node):
         if not repo_url:
             raise ValueError("Repository URL is required")
         
-        return repo_url, branch, github_token
+        return repo_url, branch, github_token, shared.get("commit_sha"), shared.get("analysis_mode", "monolithic")
     
     def exec(self, prep_res):
         """
         Fetch repository content using GitHub API.
         """
-        repo_url, branch, github_token = prep_res
+        repo_url, branch, github_token, resolved_sha, analysis_mode = prep_res
         
         print(f"Fetching repository: {repo_url}")
         if branch != "main":
             print(f"Using branch: {branch}")
         
         try:
-            files_data = fetch_github_repo(repo_url, branch, github_token)
+            files_data, commit_sha = fetch_github_commit(repo_url, branch, github_token)
             print(f"Successfully fetched {len(files_data)} files")
-            return files_data
+            return files_data, commit_sha
         except Exception as e:
             print(f"Error fetching repository: {str(e)}")
             raise
@@ -38,12 +39,18 @@ class FetchRepo(Node):
         """
         Store fetched files data in shared store.
         """
-        repo_url, branch, github_token = prep_res
-        files_data = exec_res
+        repo_url, branch, github_token, resolved_sha, analysis_mode = prep_res
+        files_data, commit_sha = exec_res
         
         # Store the files data
         shared["files_data"] = files_data
         
+        # The branch may have moved since ResolveCommit, the result is cached under the commit that was read
+        if resolved_sha and resolved_sha != commit_sha:
+            print(f"Branch moved from {resolved_sha[:12]} to {commit_sha[:12]} while fetching, assessing the new commit")
+        shared["commit_sha"] = commit_sha
+        shared["result_cache_key"] = assessment_cache_key(repo_url, commit_sha, analysis_mode)
+        
         # Extract project name from repo URL
         if repo_url:
             # Extract project name from URL (e.g., https://github.com/user/repo -> repo)
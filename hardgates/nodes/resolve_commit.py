@@ -0,0 +1,79 @@
+from core.flow import Node
+from utils.github_client import resolve_commit_sha
+from utils.llm_client import get_llm_model_name
+from utils.result_cache import result_cache_key, load_cached_result
+from nodes.analyze_code import PROMPT_VERSION
+
+class ResolveCommit(Node):
+    def prep(self, shared):
+        """
+        Read repository URL, branch, token and cache preference from shared store.
+        """
+        repo_url = shared.get("repo_url")
+        branch = shared.get("branch", "main")
+        github_token = shared.get("github_token")
+        use_cache = shared.get("use_result_cache", True)
+        analysis_mode = shared.get("analysis_mode", "monolithic")
+        
+        if not repo_url:
+            raise ValueError("Repository URL is required")
+        
+        return repo_url, branch, github_token, use_cache, analysis_mode
+    
+    def exec(self, prep_res):
+        """
+        Resolve the branch head commit and look up a stored assessment for it.
+        """
+        repo_url, branch, github_token, use_cache, analysis_mode = prep_res
+        
+        commit_sha = resolve_commit_sha(repo_url, branch, github_token)
+        if not commit_sha:
+            # Let FetchRepo report the clone error
+            print("Could not resolve commit SHA, skipping result cache")
+            return None, None, None
+        
+        print(f"Resolved {branch} to commit {commit_sha[:12]}")
+        
+        cache_key = assessment_cache_key(repo_url, commit_sha, analysis_mode)
+        cached_entry = load_cached_result(cache_key) if use_cache else None
+        
+        return commit_sha, cache_key, cached_entry
+    
+    def exec_fallback(self, prep_res, exc):
+        """
+        Continue without the cache if the commit cannot be resolved.
+        """
+        print(f"Warning: Commit resolution failed: {str(exc)}")
+        return None, None, None
+    
+    def post(self, shared, prep_res, exec_res):
+        """
+        Store the commit SHA and, on a cache hit, the stored assessment results.
+        """
+        repo_url, branch, github_token, use_cache, analysis_mode = prep_res
+        commit_sha, cache_key, cached_entry = exec_res
+        
+        shared["commit_sha"] = commit_sha
+        shared["result_cache_key"] = cache_key
+        
+        if not cached_entry:
+            return "default"
+        
+        print(f"Using cached assessment for commit {commit_sha[:12]}")
+        
+        # Extract project name from URL (e.g., https://github.com/user/repo -> repo)
+        shared["project_name"] = repo_url.rstrip('/').split('/')[-1]
+        shared["assessment_results"] = cached_entry["assessment_results"]
+        shared["file_summary"] = cached_entry.get("file_summary", {})
+        if cached_entry.get("compliance_metrics"):
+            shared["compliance_metrics"] = cached_entry["compliance_metrics"]
+        
+        return "cached"
+
+def assessment_cache_key(repo_url, commit_sha, analysis_mode):
+    """
+    Return the result cache key for an assessment of a commit.
+    """
+    # Each analysis mode uses different prompts, so results are cached separately
+    prompt_version = f"{PROMPT_VERSION}/{analysis_mode}"
+    return result_cache_key(repo_url, commit_sha, prompt_version, get_llm_model_name())
@@ -0,0 +1,39 @@
+import os
+from core.flow import Node
+from utils.static_scanner import scan_repository
+
+class StaticScan(Node):
+    def prep(self, shared):
+        """
+        Read files data from shared store.
+        """
+        files_data = shared.get("files_data", {})
+        enabled = os.getenv("HARDGATES_STATIC_SCAN", "1").lower() not in ("0", "false", "no")
+        
+        return files_data, enabled
+    
+    def exec(self, prep_res):
+        """
+        Resolve the gates that can be decided from manifests and annotations.
+        """
+        files_data, enabled = prep_res
+        
+        if not enabled or not files_data:
+            return {"resolved_gates": {}, "evidence": {}}
+        
+        print(f"Running static pre-scan on {len(files_data)} files...")
+        return scan_repository(files_data)
+    
+    def post(self, shared, prep_res, exec_res):
+        """
+        Store the statically resolved gates and evidence in shared store.
+        """
+        shared["static_gate_results"] = exec_res["resolved_gates"]
+        shared["static_evidence"] = exec_res["evidence"]
+        
+        resolved = exec_res["resolved_gates"]
+        if resolved:
+            print(f"Static pre-scan resolved {len(resolved)} gates: {', '.join(resolved)}")
+        else:
+            print("Static pre-scan resolved no gates")
+        return "default"
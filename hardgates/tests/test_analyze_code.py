@@ -0,0 +1,36 @@
+import pytest
+
+from nodes import analyze_code
+
+@pytest.fixture
+def stored(monkeypatch):
+    entries = []
+    monkeypatch.setattr(analyze_code, "store_cached_result", lambda key, entry: entries.append(key))
+    return entries
+
+def verdicts():
+    return {"primary_hard_gates": {"structured_logs": {"status": "PASS", "evidence": ["logback.xml"]}}}
+
+def test_parsed_results_are_cached_by_commit(stored):
+    shared = {"result_cache_key": "abc123"}
+    
+    analyze_code.record_analysis_results(shared, verdicts())
+    
+    assert stored == ["abc123"]
+    assert shared["compliance_metrics"]["total_gates"] > 0
+
+def test_fallback_results_are_reported_but_not_cached(stored):
+    shared = {"result_cache_key": "abc123"}
+    results = {**verdicts(), "fallback": True}
+    
+    analyze_code.record_analysis_results(shared, results)
+    
+    assert stored == []
+    assert shared["assessment_results"] is results
+
+def test_failed_analysis_is_not_cached(stored):
+    shared = {"result_cache_key": "abc123"}
+    
+    analyze_code.record_analysis_results(shared, {**verdicts(), "error": "timeout"})
+    
+    assert stored == []
@@ -0,0 +1,21 @@
+from nodes import analyze_gates
+from nodes.analyze_gates import AnalyzeGates
+
+def test_unparseable_group_reply_is_retried_then_left_to_exec_fallback(monkeypatch):
+    guessed = {"primary_hard_gates": {"retry_logic": {"implemented": "yes"}}, "fallback": True}
+    calls = []
+    monkeypatch.setattr(analyze_gates, "call_llm", lambda **request: calls.append(request) or guessed)
+    
+    result = AnalyzeGates(max_retries=2)._exec(("Resilience", ["retry_logic"], {"prompt": "group"}))
+    
+    assert len(calls) == 2
+    assert result["primary_hard_gates"] == {}
+    assert "Unparseable reply" in result["error"]
+
+def test_parsed_group_reply_keeps_requested_gates(monkeypatch):
+    reply = {"primary_hard_gates": {"retry_logic": {"implemented": "yes"}, "circuit_breakers": {"implemented": "no"}}}
+    monkeypatch.setattr(analyze_gates, "call_llm", lambda **request: reply)
+    
+    result = AnalyzeGates()._exec(("Resilience", ["retry_logic"], {"prompt": "group"}))
+    
+    assert result["primary_hard_gates"] == {"retry_logic": {"implemented": "yes"}}
@@ -0,0 +1,117 @@
+import time
+
+import pytest
+from cryptography.fernet import Fernet
+
+from utils.job_queue import SQLiteJobQueue, JOB_SECRET_KEY_VARIABLE
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    monkeypatch.setenv(JOB_SECRET_KEY_VARIABLE, Fernet.generate_key().decode("ascii"))
+    return SQLiteJobQueue(str(tmp_path / "jobs.sqlite3"), max_attempts=2)
+
+def raw_row(queue, job_id):
+    return queue._connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+def test_claim_runs_jobs_in_order_and_once(queue):
+    first = queue.enqueue({"repo_url": "https://github.com/a/one"})
+    second = queue.enqueue({"repo_url": "https://github.com/a/two"})
+    
+    assert queue.claim("w1")["id"] == first
+    assert queue.claim("w2")["id"] == second
+    assert queue.claim("w3") is None
+
+def test_expired_lease_is_reclaimed_by_another_worker(queue):
+    job_id = queue.enqueue({"repo_url": "https://github.com/a/b"})
+    queue.claim("w1", lease_seconds=0.05)
+    assert queue.claim("w2") is None
+    
+    time.sleep(0.1)
+    job = queue.claim("w2")
+    
+    assert job["id"] == job_id
+    assert job["attempts"] == 2
+    # The first worker lost the job and can no longer renew or finish it
+    assert not queue.heartbeat(job_id, "w1")
+    assert not queue.complete(job_id, "w1", {"ok": True})
+    assert queue.complete(job_id, "w2", {"ok": True})
+    assert queue.get(job_id)["result"] == {"ok": True}
+
+def test_heartbeat_keeps_the_lease(queue):
+    job_id = queue.enqueue({"repo_url": "https://github.com/a/b"})
+    queue.claim("w1", lease_seconds=0.1)
+    
+    time.sleep(0.06)
+    assert queue.heartbeat(job_id, "w1", lease_seconds=0.1)
+    time.sleep(0.06)
+    assert queue.claim("w2") is None
+
+def test_job_fails_after_max_attempts(queue):
+    job_id = queue.enqueue({"repo_url": "https://github.com/a/b", "github_token": "ghp_secret"})
+    queue.claim("w1", lease_seconds=0.01)
+    time.sleep(0.02)
+    queue.claim("w2", lease_seconds=0.01)
+    time.sleep(0.02)
+    
+    assert queue.claim("w3") is None
+    job = queue.get(job_id)
+    assert job["status"] == "failed"
+    assert "lease expired" in job["error"]
+    assert raw_row(queue, job_id)["secrets"] is None
+
+def test_enqueue_unique_attaches_to_in_flight_job(queue):
+    job_id, created = queue.enqueue_unique({"repo_url": "https://github.com/a/b"}, "key")
+    assert created
+    
+    assert queue.enqueue_unique({"repo_url": "https://github.com/a/b"}, "key") == (job_id, False)
+    queue.claim("w1")
+    assert queue.enqueue_unique({"repo_url": "https://github.com/a/b"}, "key") == (job_id, False)
+    
+    other_id, created = queue.enqueue_unique({"repo_url": "https://github.com/a/b"}, "other")
+    assert created and other_id != job_id
+
+def test_enqueue_unique_creates_new_job_once_finished(queue):
+    job_id, _ = queue.enqueue_unique({"repo_url": "https://github.com/a/b"}, "key")
+    queue.claim("w1")
+    queue.complete(job_id, "w1", {})
+    
+    new_id, created = queue.enqueue_unique({"repo_url": "https://github.com/a/b"}, "key")
+    assert created and new_id != job_id
+
+@pytest.mark.parametrize("finish", ["complete", "fail"])
+def test_token_is_encrypted_at_rest_and_dropped_when_finished(queue, finish):
+    job_id = queue.enqueue({"repo_url": "https://github.com/a/b", "github_token": "ghp_secret"})
+    row = raw_row(queue, job_id)
+    assert "ghp_secret" not in row["payload"]
+    assert "ghp_secret" not in row["secrets"]
+    
+    job = queue.claim("w1")
+    assert job["payload"]["github_token"] == "ghp_secret"
+    
+    if finish == "complete":
+        queue.complete(job_id, "w1", {})
+    else:
+        queue.fail(job_id, "w1", "boom")
+    assert raw_row(queue, job_id)["secrets"] is None
+    assert "github_token" not in queue.get(job_id, include_payload=True)["payload"]
+
+def test_job_with_undecryptable_token_is_failed(queue, monkeypatch):
+    job_id = queue.enqueue({"repo_url": "https://github.com/a/b", "github_token": "ghp_secret"})
+    monkeypatch.setenv(JOB_SECRET_KEY_VARIABLE, Fernet.generate_key().decode("ascii"))
+    
+    assert queue.claim("w1") is None
+    job = queue.get(job_id)
+    assert job["status"] == "failed"
+    assert JOB_SECRET_KEY_VARIABLE in job["error"]
+
+def test_plain_text_tokens_of_older_queues_are_encrypted(queue):
+    connection = queue._connection()
+    connection.execute(
+        "INSERT INTO jobs (id, status, payload, created_at) VALUES ('old', 'queued', ?, ?)",
+        ('{"repo_url": "https://github.com/a/b", "github_token": "ghp_secret"}', time.time())
+    )
+    
+    reopened = SQLiteJobQueue(queue.path)
+    
+    assert "ghp_secret" not in raw_row(reopened, "old")["payload"]
+    assert reopened.claim("w1")["payload"]["github_token"] == "ghp_secret"
@@ -0,0 +1,100 @@
+import json
+
+import pytest
+
+from utils.json_stream import GateStreamParser, iter_json_objects, repair_json, loads_tolerant
+
+FENCED_REPLY = """Here's the assessment you asked for:
+
+```json
+{
+  "technology_stack": {"languages": [{"name": "Java"}]},
+  "primary_hard_gates": {
+    "retry_logic": {"implemented": "yes", "evidence": "Uses \\"@Retryable\\" in Client.java {line 12}", "recommendation": "Keep it"},
+    "log_system_errors": {"implemented": "no", "evidence": "No catch blocks log", "recommendation": "Log errors"}
+  }
+}
+```
+
+Let me know if you'd like more detail."""
+
+def test_iter_json_objects_skips_prose_and_fences():
+    objects = list(iter_json_objects(FENCED_REPLY))
+    
+    assert len(objects) == 1
+    assert json.loads(objects[0])["primary_hard_gates"]["retry_logic"]["implemented"] == "yes"
+
+def test_iter_json_objects_ignores_braces_and_escaped_quotes_in_strings():
+    text = 'a {"x": "} \\" {"} b {"y": 1}'
+    
+    assert list(iter_json_objects(text)) == ['{"x": "} \\" {"}', '{"y": 1}']
+
+def test_iter_json_objects_yields_truncated_object():
+    assert list(iter_json_objects('prose {"a": {"b": 1}')) == ['{"a": {"b": 1}']
+
+@pytest.mark.parametrize("broken, expected", [
+    ('{"a": 1, "b": [1, 2,],}', {"a": 1, "b": [1, 2]}),
+    ("{'a': 'it\\'s'}", {"a": "it's"}),
+    ('{a: 1, b_c: "x"}', {"a": 1, "b_c": "x"}),
+    ('{"a": True, "b": None, "c": False}', {"a": True, "b": None, "c": False}),
+    ('{"a": 1, // the count\n "b": "http://x"}', {"a": 1, "b": "http://x"}),
+    ('{"a": "line \\"quoted\\"", "b": "back\\\\slash"}', {"a": 'line "quoted"', "b": "back\\slash"}),
+])
+def test_repair_json(broken, expected):
+    assert json.loads(repair_json(broken)) == expected
+
+@pytest.mark.parametrize("truncated, expected", [
+    ('{"a": {"b": [1, 2', {"a": {"b": [1, 2]}}),
+    ('{"a": "unterminated', {"a": "unterminated"}),
+    ('{"a": 1, ', {"a": 1}),
+])
+def test_repair_json_closes_truncated_input(truncated, expected):
+    assert json.loads(repair_json(truncated)) == expected
+
+def test_loads_tolerant():
+    assert loads_tolerant('{"a": 1}') == {"a": 1}
+    assert loads_tolerant('{"a": 1,}') == {"a": 1}
+    assert loads_tolerant("no json here") is None
+
+def feed_in_pieces(parser, text, size):
+    emitted = []
+    for i in range(0, len(text), size):
+        emitted.extend(parser.feed(text[i:i + size]))
+    return emitted
+
+@pytest.mark.parametrize("size", [1, 7, 10000])
+def test_gate_stream_parser_emits_gates_as_they_close(size):
+    received = []
+    parser = GateStreamParser(["retry_logic", "log_system_errors"], on_gate=lambda key, gate: received.append(key))
+    
+    emitted = feed_in_pieces(parser, FENCED_REPLY, size)
+    
+    assert [key for key, _ in emitted] == ["retry_logic", "log_system_errors"]
+    assert received == ["retry_logic", "log_system_errors"]
+    assert emitted[0][1]["evidence"] == 'Uses "@Retryable" in Client.java {line 12}'
+    assert parser.complete
+    assert parser.result()["technology_stack"] == {"languages": [{"name": "Java"}]}
+
+def test_gate_stream_parser_ignores_nested_objects_outside_gates():
+    parser = GateStreamParser()
+    
+    emitted = parser.feed('{"component_analysis": {"retry_library": {"detected": "no"}}, "primary_hard_gates": {}}')
+    
+    assert emitted == []
+    assert parser.result()["component_analysis"]["retry_library"] == {"detected": "no"}
+
+def test_gate_stream_parser_recovers_closed_gates_from_truncated_stream():
+    cut = FENCED_REPLY.index('"log_system_errors"') + len('"log_system_errors": {"implemented": "n')
+    parser = GateStreamParser(["retry_logic", "log_system_errors"])
+    
+    emitted = parser.feed(FENCED_REPLY[:cut])
+    
+    assert [key for key, _ in emitted] == ["retry_logic"]
+    assert not parser.complete
+    assert list(parser.result()["primary_hard_gates"]) == ["retry_logic"]
+
+def test_gate_stream_parser_without_json():
+    parser = GateStreamParser()
+    parser.feed("I cannot assess this repository.")
+    
+    assert parser.result() is None
@@ -0,0 +1,85 @@
+import pytest
+
+from utils import llm_client
+
+class APIError(Exception):
+    def __init__(self, message, status_code, body=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.body = body
+
+@pytest.fixture(autouse=True)
+def reset_unsupported_models():
+    llm_client._structured_output_unsupported.clear()
+    yield
+    llm_client._structured_output_unsupported.clear()
+
+def test_unrelated_bad_request_propagates_and_keeps_structured_output():
+    error = APIError("Error code: 400", 400, {"error": {"message": "maximum context length is 8192 tokens"}})
+    
+    def create(**kwargs):
+        raise error
+    
+    with pytest.raises(APIError):
+        llm_client._with_schema_fallback(create, {"response_format": {"type": "json_schema"}})
+    assert llm_client._structured_output_unsupported == set()
+
+def test_schema_rejection_falls_back_to_plain_request():
+    error = APIError("Error code: 400", 400, {"error": {"message": "Invalid parameter: 'response_format' of type 'json_schema' is not supported"}})
+    
+    def create(**kwargs):
+        if kwargs:
+            raise error
+        return "plain"
+    
+    assert llm_client._with_schema_fallback(create, {"response_format": {"type": "json_schema"}}) == "plain"
+    assert llm_client.get_llm_model_name() in llm_client._structured_output_unsupported
+
+@pytest.mark.parametrize("message, status, expected", [
+    ("tool_choice: Extra inputs are not permitted", 400, True),
+    ("Unknown name \"response_schema\" at 'generation_config'", 400, True),
+    ("messages: text content blocks must be non-empty", 400, False),
+    ("response_format is not supported", 500, False),
+    ("Incorrect API key provided", 401, False),
+])
+def test_is_schema_rejection(message, status, expected):
+    assert llm_client._is_schema_rejection(APIError(message, status)) is expected
+
+PROSE_REPLY = "The service retries failed calls with Resilience4j and logs with logback."
+
+@pytest.fixture
+def response_cache(monkeypatch):
+    stored = {}
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(llm_client, "load_cached_response", lambda key: stored.get(key))
+    monkeypatch.setattr(llm_client, "store_cached_response", lambda key, response: stored.__setitem__(key, response))
+    return stored
+
+def test_unparseable_reply_is_marked_and_not_cached(response_cache, monkeypatch):
+    monkeypatch.setattr(llm_client, "_call_openai",
+                        lambda prompt, schema, system_prompt: llm_client._parse_json_response(PROSE_REPLY))
+    
+    result = llm_client.call_llm("prompt")
+    
+    assert llm_client.is_fallback_result(result)
+    assert result["primary_hard_gates"]
+    assert response_cache == {}
+
+def test_parsed_reply_is_cached(response_cache, monkeypatch):
+    reply = '{"primary_hard_gates": {"retry_logic": {"implemented": "yes", "evidence": "x", "recommendation": "y"}}}'
+    monkeypatch.setattr(llm_client, "_call_openai",
+                        lambda prompt, schema, system_prompt: llm_client._parse_json_response(reply))
+    
+    result = llm_client.call_llm("prompt")
+    
+    assert not llm_client.is_fallback_result(result)
+    assert list(response_cache.values()) == [result]
+
+def test_unparseable_streamed_reply_is_marked():
+    result = llm_client._collect_stream(iter_pieces(PROSE_REPLY), None, ["retry_logic"])
+    
+    assert llm_client.is_fallback_result(result)
+
+def iter_pieces(text):
+    for i in range(0, len(text), 5):
+        yield text[i:i + 5]
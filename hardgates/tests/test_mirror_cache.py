@@ -0,0 +1,53 @@
+import os
+import subprocess
+
+import pytest
+
+from utils import github_client
+
+def make_repository(path, files):
+    os.makedirs(path)
+    git = ["git", "-C", str(path), "-c", "user.name=test", "-c", "user.email=test@example.com"]
+    subprocess.run(git + ["init", "--quiet", "--initial-branch", "main"], check=True)
+    for name, content in files.items():
+        with open(os.path.join(path, name), "w") as f:
+            f.write(content)
+    subprocess.run(git + ["add", "--all"], check=True)
+    subprocess.run(git + ["commit", "--quiet", "--message", "init"], check=True)
+    return f"file://{path}"
+
+@pytest.fixture
+def mirror_cache(tmp_path, monkeypatch):
+    cache_dir = tmp_path / "mirrors"
+    monkeypatch.setattr(github_client, "MIRROR_CACHE_DIR", str(cache_dir))
+    monkeypatch.setattr(github_client, "MIRROR_CACHE_ENABLED", True)
+    return cache_dir
+
+def read(repo_url):
+    with github_client._repository_mirror(repo_url, "main", None) as (mirror_dir, commit_sha):
+        return github_client._read_repository_files(mirror_dir, commit_sha, None), mirror_dir
+
+def test_fetch_records_the_mirror_size(tmp_path, mirror_cache):
+    repo_url = make_repository(tmp_path / "app", {"app.py": "print('hello')\n" * 100})
+    
+    files, mirror_dir = read(repo_url)
+    
+    assert files["app.py"].startswith("print")
+    assert github_client._stored_mirror_size(mirror_dir) > 0
+    with open(os.path.join(mirror_dir, github_client.MIRROR_SIZE_FILE)) as f:
+        assert int(f.read()) == github_client._stored_mirror_size(mirror_dir)
+
+def test_eviction_uses_stored_sizes_and_removes_the_lock_file(tmp_path, mirror_cache, monkeypatch):
+    first_url = make_repository(tmp_path / "first", {"first.py": "x = 1\n"})
+    second_url = make_repository(tmp_path / "second", {"second.py": "y = 2\n"})
+    _, first_mirror = read(first_url)
+    # Older than the second mirror
+    os.utime(first_mirror, (0, 0))
+    
+    monkeypatch.setattr(github_client, "MIRROR_CACHE_MAX_BYTES", 1)
+    monkeypatch.setattr(github_client, "_directory_size", lambda path: pytest.fail("mirror walked"))
+    _, second_mirror = read(second_url)
+    
+    assert not os.path.exists(first_mirror)
+    assert not os.path.exists(first_mirror + ".lock")
+    assert os.path.isdir(second_mirror)
@@ -0,0 +1,114 @@
+import pytest
+
+from utils.path_filter import PathFilter, load_repo_config
+
+def walk(path_filter, paths):
+    """
+    Return the files a tree walk keeps: directories are pruned before their files are seen.
+    """
+    kept = []
+    for path in paths:
+        parts = path.split("/")
+        directories = ["/".join(parts[:i]) for i in range(1, len(parts))]
+        if all(path_filter.includes_directory(directory) for directory in directories) and path_filter.includes_file(path):
+            kept.append(path)
+    return kept
+
+def test_defaults():
+    path_filter = PathFilter()
+    
+    assert path_filter.includes_file("src/App.java")
+    assert path_filter.includes_file("Dockerfile")
+    assert path_filter.includes_file("docs/README")
+    assert path_filter.includes_file("SRC/MAIN.PY")
+    assert not path_filter.includes_file("image.png")
+    assert not path_filter.includes_file("web/package-lock.json")
+    assert not path_filter.includes_file("static/app.min.js")
+    assert not path_filter.includes_directory("node_modules")
+    assert not path_filter.includes_directory("web/node_modules")
+    assert path_filter.includes_directory("src")
+
+def test_unanchored_pattern_matches_at_any_depth():
+    path_filter = PathFilter(include=["*.py"], exclude=["generated_*.py"])
+    
+    assert not path_filter.includes_file("generated_api.py")
+    assert not path_filter.includes_file("pkg/sub/generated_api.py")
+    assert path_filter.includes_file("pkg/api.py")
+
+def test_pattern_with_slash_is_anchored_at_root():
+    path_filter = PathFilter(include=["*"], exclude=["tests/fixtures/", "/build.py"])
+    
+    assert not path_filter.includes_directory("tests/fixtures")
+    assert path_filter.includes_directory("pkg/tests/fixtures")
+    assert not path_filter.includes_file("build.py")
+    assert path_filter.includes_file("tools/build.py")
+
+def test_directory_only_pattern_does_not_match_files():
+    path_filter = PathFilter(include=["*"], exclude=["logs/"])
+    
+    assert not path_filter.includes_directory("logs")
+    assert not path_filter.includes_directory("app/logs")
+    assert path_filter.includes_file("logs")
+
+def test_double_star():
+    path_filter = PathFilter(include=["src/**/*.java"], exclude=["**/internal/**", "docs/**"])
+    
+    assert path_filter.includes_file("src/A.java")
+    assert path_filter.includes_file("src/a/b/A.java")
+    assert not path_filter.includes_file("lib/A.java")
+    assert not path_filter.includes_file("src/a/internal/A.java")
+    assert not path_filter.includes_file("docs/api/A.java")
+    # "docs/**" matches everything inside docs, not docs itself
+    assert path_filter.includes_directory("docs")
+    assert not path_filter.includes_directory("docs/api")
+
+def test_single_character_and_bracket_globs():
+    path_filter = PathFilter(include=["*"], exclude=["v?.txt", "[!a]*.log"])
+    
+    assert not path_filter.includes_file("v1.txt")
+    assert path_filter.includes_file("v10.txt")
+    assert not path_filter.includes_file("b.log")
+    assert path_filter.includes_file("a.log")
+
+def test_negation_re_includes_and_last_match_wins():
+    path_filter = PathFilter(include=["*"], exclude=["*.log", "!important.log", "old/important.log"])
+    
+    assert not path_filter.includes_file("debug.log")
+    assert path_filter.includes_file("important.log")
+    assert path_filter.includes_file("new/important.log")
+    assert not path_filter.includes_file("old/important.log")
+
+def test_negated_directory_is_walked_again():
+    path_filter = PathFilter.from_config({"exclude": ["!vendor/"]})
+    
+    assert path_filter.includes_directory("vendor")
+    assert not path_filter.includes_directory("node_modules")
+
+def test_files_below_an_excluded_directory_cannot_be_re_included():
+    path_filter = PathFilter(include=["*.py"], exclude=["build/", "!build/keep.py"])
+    paths = ["build/keep.py", "build/other.py", "src/app.py"]
+    
+    assert walk(path_filter, paths) == ["src/app.py"]
+
+def test_from_config_adds_to_defaults():
+    path_filter = PathFilter.from_config({"include": "*.tf", "exclude": ["tests/fixtures/"]})
+    
+    assert path_filter.includes_file("infra/main.tf")
+    assert path_filter.includes_file("app.py")
+    assert not path_filter.includes_directory("tests/fixtures")
+    assert not path_filter.includes_directory("node_modules")
+
+def test_from_config_without_defaults():
+    path_filter = PathFilter.from_config({"defaults": False, "include": ["*.tf"]})
+    
+    assert path_filter.includes_file("main.tf")
+    assert not path_filter.includes_file("app.py")
+    assert path_filter.includes_directory("node_modules")
+
+def test_load_repo_config():
+    pytest.importorskip("yaml")
+    
+    assert load_repo_config("include:\n  - '*.tf'\n") == {"include": ["*.tf"]}
+    assert load_repo_config("") == {}
+    assert load_repo_config("- just\n- a list\n") is None
+    assert load_repo_config("include: [unclosed\n") is None
@@ -0,0 +1,83 @@
+import os
+import time
+import asyncio
+import multiprocessing
+
+import pytest
+
+from utils import rate_limiter
+from utils.rate_limiter import RateLimiter
+
+@pytest.fixture(autouse=True)
+def shared_database(tmp_path, monkeypatch):
+    monkeypatch.setattr(rate_limiter, "RATE_LIMIT_PATH", str(tmp_path / "rate_limits.sqlite3"))
+    monkeypatch.setattr(rate_limiter, "LEASE_POLL_SECONDS", 0.01)
+
+def reserve_request(path):
+    rate_limiter.RATE_LIMIT_PATH = path
+    return RateLimiter(rpm=60, shared_name="openai:gpt-4o").requests.reserve(1)
+
+def test_request_budget_is_shared_between_processes():
+    # Two "processes" with a one-request-per-second budget: the second has to wait
+    first = RateLimiter(rpm=60, shared_name="openai:gpt-4o")
+    second = RateLimiter(rpm=60, shared_name="openai:gpt-4o")
+    first.requests.reserve(60)
+    
+    assert second.requests.reserve(1) == pytest.approx(1.0, abs=0.1)
+
+def test_request_budget_is_shared_with_a_spawned_process():
+    limiter = RateLimiter(rpm=60, shared_name="openai:gpt-4o")
+    limiter.requests.reserve(60)
+    
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        delay = pool.apply(reserve_request, (rate_limiter.RATE_LIMIT_PATH,))
+    
+    assert delay > 0.5
+
+def test_unshared_limiters_have_separate_budgets():
+    first = RateLimiter(rpm=60)
+    second = RateLimiter(rpm=60)
+    first.requests.reserve(60)
+    
+    assert second.requests.reserve(1) == 0.0
+
+def test_concurrency_slots_are_shared_and_released():
+    first = RateLimiter(max_concurrency=1, shared_name="anthropic")
+    second = RateLimiter(max_concurrency=1, shared_name="anthropic")
+    
+    with first.limit(10):
+        assert second.concurrency._lease() == ""
+    
+    lease = second.concurrency.acquire()
+    assert lease
+    second.concurrency.release(lease)
+
+def test_lease_of_a_dead_process_is_reclaimed():
+    limiter = RateLimiter(max_concurrency=1, shared_name="anthropic")
+    process = multiprocessing.get_context("spawn").Process(target=time.sleep, args=(0,))
+    process.start()
+    process.join()
+    rate_limiter._connection().execute(
+        "INSERT INTO leases (id, name, host, pid, acquired) VALUES ('stale', 'anthropic', ?, ?, ?)",
+        (rate_limiter.socket.gethostname(), process.pid, time.time())
+    )
+    
+    assert limiter.concurrency._lease()
+
+def test_async_limit_waits_for_a_slot_held_elsewhere():
+    holder = RateLimiter(max_concurrency=1, shared_name="anthropic")
+    waiter = RateLimiter(max_concurrency=1, shared_name="anthropic")
+    lease = holder.concurrency.acquire()
+    
+    async def call():
+        async with waiter.limit_async(10):
+            pass
+    
+    async def main():
+        task = asyncio.ensure_future(call())
+        await asyncio.sleep(0.05)
+        assert not task.done()
+        holder.concurrency.release(lease)
+        await asyncio.wait_for(task, 1)
+    
+    asyncio.run(main())
@@ -0,0 +1,78 @@
+from nodes import analyze_chunks
+from nodes.analyze_chunks import AnalyzeChunks, ChunkProgress, reduce_gate_verdicts, MAX_EVIDENCE_ITEMS
+from utils.gates import GATES_BY_KEY
+
+def chunk(**verdicts):
+    return {"primary_hard_gates": {key: {"implemented": implemented, "evidence": f"{key} {implemented}",
+                                         "recommendation": f"fix {implemented}"}
+                                   for key, implemented in verdicts.items()}}
+
+def test_all_chunks_implementing_gives_yes():
+    reduced = reduce_gate_verdicts([chunk(retry_logic="yes"), chunk(retry_logic="yes")], ["retry_logic"])
+    
+    assert reduced["retry_logic"]["implemented"] == "yes"
+    # Identical evidence is merged
+    assert reduced["retry_logic"]["evidence"] == "retry_logic yes"
+
+def test_not_applicable_chunks_are_ignored():
+    results = [chunk(retry_logic="not_applicable"), chunk(retry_logic="no"), chunk(retry_logic="not_applicable")]
+    
+    assert reduce_gate_verdicts(results, ["retry_logic"])["retry_logic"]["implemented"] == "no"
+
+def test_mixed_verdicts_give_partial_with_supporting_evidence_first():
+    results = [
+        {"primary_hard_gates": {"retry_logic": {"implemented": "no", "evidence": "Client.java has none", "recommendation": "Add retries to Client"}}},
+        {"primary_hard_gates": {"retry_logic": {"implemented": "yes", "evidence": "Retry in Api.java", "recommendation": "Keep"}}},
+    ]
+    
+    reduced = reduce_gate_verdicts(results, ["retry_logic"])["retry_logic"]
+    
+    assert reduced["implemented"] == "partial"
+    assert reduced["evidence"] == "Retry in Api.java; Client.java has none"
+    assert reduced["recommendation"] == "Add retries to Client"
+
+def test_gate_without_related_code_is_not_implemented():
+    reduced = reduce_gate_verdicts([chunk(retry_logic="not_applicable"), {}], ["retry_logic"])
+    
+    assert reduced["retry_logic"] == {
+        "implemented": "no",
+        "evidence": "No related code found in any chunk",
+        "recommendation": GATES_BY_KEY["retry_logic"]["recommendation"]
+    }
+
+def test_assessed_only_leaves_out_unassessed_gates():
+    results = [chunk(retry_logic="yes", log_system_errors="not_applicable")]
+    
+    reduced = reduce_gate_verdicts(results, ["retry_logic", "log_system_errors"], assessed_only=True)
+    
+    assert list(reduced) == ["retry_logic"]
+
+def test_invalid_verdicts_are_ignored():
+    results = [
+        {"primary_hard_gates": {"retry_logic": "yes"}},
+        {"primary_hard_gates": {"retry_logic": {"implemented": "maybe"}}},
+        chunk(retry_logic="yes"),
+    ]
+    
+    assert reduce_gate_verdicts(results, ["retry_logic"])["retry_logic"]["implemented"] == "yes"
+
+def test_evidence_is_capped():
+    results = [{"primary_hard_gates": {"retry_logic": {"implemented": "yes", "evidence": f"file{i}.py"}}}
+               for i in range(MAX_EVIDENCE_ITEMS + 3)]
+    
+    evidence = reduce_gate_verdicts(results, ["retry_logic"])["retry_logic"]["evidence"]
+    
+    assert evidence.split("; ") == [f"file{i}.py" for i in range(MAX_EVIDENCE_ITEMS)]
+
+def test_unparseable_chunk_reply_goes_to_exec_fallback(monkeypatch):
+    guessed = {**chunk(retry_logic="yes"), "fallback": True}
+    calls = []
+    monkeypatch.setattr(analyze_chunks, "call_llm", lambda **request: calls.append(request) or guessed)
+    progress = ChunkProgress(1, ["retry_logic"])
+    
+    result = AnalyzeChunks(max_retries=2)._exec((0, ["retry_logic"], {"prompt": "chunk"}, progress))
+    
+    assert len(calls) == 2
+    assert result["primary_hard_gates"] == {}
+    assert "Unparseable reply" in result["error"]
+    assert progress.results == [result]
@@ -0,0 +1,124 @@
+from utils.static_scanner import scan_repository
+
+FAILSAFE_PLUGIN_POM = """<project>
+  <build>
+    <plugins>
+      <plugin>
+        <groupId>org.apache.maven.plugins</groupId>
+        <artifactId>maven-failsafe-plugin</artifactId>
+        <configuration>
+          <connect-timeout>5000</connect-timeout>
+        </configuration>
+      </plugin>
+    </plugins>
+  </build>
+</project>
+"""
+
+FAILSAFE_LIBRARY_POM = """<project>
+  <dependencies>
+    <dependency>
+      <groupId>dev.failsafe</groupId>
+      <artifactId>failsafe</artifactId>
+    </dependency>
+  </dependencies>
+</project>
+"""
+
+RETRY_CLIENT = """package com.example;
+
+public class Client {
+    private final RetryPolicy<Object> retryPolicy = RetryPolicy.builder().withMaxRetries(3).build();
+    
+    public String fetch() {
+        return Failsafe.with(retryPolicy).get(this::call);
+    }
+}
+"""
+
+def resolved(files):
+    return scan_repository(files)["resolved_gates"]
+
+def test_failsafe_plugin_is_not_a_retry_library():
+    result = scan_repository({"pom.xml": FAILSAFE_PLUGIN_POM})
+    
+    assert "retry_logic" not in result["evidence"]
+    assert result["resolved_gates"] == {}
+
+def test_polly_substring_is_not_a_retry_library():
+    csproj = '<Project><ItemGroup><PackageReference Include="Pollyfill.Json" /></ItemGroup></Project>'
+    
+    assert "retry_logic" not in scan_repository({"App.csproj": csproj})["evidence"]
+
+def test_qualified_dependency_is_evidence_but_does_not_resolve_alone():
+    result = scan_repository({"pom.xml": FAILSAFE_LIBRARY_POM})
+    
+    assert result["evidence"]["retry_logic"][0] == "Retry library dependency (pom.xml:4)"
+    assert "retry_logic" not in result["resolved_gates"]
+
+def test_dependency_with_usage_resolves_gate():
+    gates = resolved({"pom.xml": FAILSAFE_LIBRARY_POM, "src/main/java/com/example/Client.java": RETRY_CLIENT})
+    
+    assert gates["retry_logic"]["implemented"] == "yes"
+    assert gates["retry_logic"]["source"] == "static_analysis"
+    assert "Client.java:4" in gates["retry_logic"]["evidence"]
+
+def test_polly_package_reference_is_a_retry_library():
+    csproj = '<Project><ItemGroup><PackageReference Include="Polly" Version="8.0.0" /></ItemGroup></Project>'
+    
+    assert scan_repository({"App.csproj": csproj})["evidence"]["retry_logic"] == ["Retry library dependency (App.csproj:1)"]
+
+def test_resilience4j_starter_alone_resolves_nothing():
+    gradle = 'implementation "io.github.resilience4j:resilience4j-spring-boot3:2.1.0"\n'
+    
+    assert resolved({"build.gradle": gradle}) == {}
+
+def test_timeout_configuration_alone_does_not_resolve():
+    config = "http:\n  client:\n    connect-timeout: 2s\n    read-timeout: 5s\n"
+    result = scan_repository({"src/main/resources/application.yml": config})
+    
+    assert len(result["evidence"]["set_timeouts_io_operations"]) == 2
+    assert "set_timeouts_io_operations" not in result["resolved_gates"]
+
+def test_timeout_set_in_source_resolves():
+    source = "factory.setConnectTimeout(2000);\nfactory.setReadTimeout(5000);\n"
+    
+    assert "set_timeouts_io_operations" in resolved({"src/main/java/HttpConfig.java": source})
+
+def test_usage_in_documentation_or_tests_does_not_resolve():
+    files = {
+        "README.md": "Annotate methods with @Retryable to retry them.\n",
+        "src/test/java/ClientTest.java": "@Retryable\nvoid retried() {}\n",
+    }
+    
+    assert "retry_logic" not in resolved(files)
+
+def test_tracking_headers_in_documentation_do_not_resolve():
+    readme = "Every response carries an X-Request-ID header; search logs by traceId.\n"
+    result = scan_repository({"README.md": readme})
+    
+    assert result["evidence"]["tracking_id_for_log_messages"] == ["Correlation ID header (README.md:1)"]
+    assert result["resolved_gates"] == {}
+
+def test_correlation_id_put_in_mdc_resolves():
+    source = 'MDC.put("correlationId", request.getHeader("X-Correlation-ID"));\n'
+    
+    assert "tracking_id_for_log_messages" in resolved({"src/main/java/CorrelationFilter.java": source})
+
+def test_structured_logging_dependency_alone_does_not_resolve():
+    pom = "<dependency>\n  <groupId>net.logstash.logback</groupId>\n  <artifactId>logstash-logback-encoder</artifactId>\n</dependency>\n"
+    result = scan_repository({"pom.xml": pom})
+    
+    assert result["evidence"]["logs_searchable_available"] == ["Structured logging dependency (pom.xml:3)"]
+    assert result["resolved_gates"] == {}
+
+def test_structured_log_encoder_in_source_resolves():
+    source = "LogstashEncoder encoder = new LogstashEncoder();\nappender.setEncoder(encoder);\n"
+    
+    assert "logs_searchable_available" in resolved({"src/main/java/LoggingConfig.java": source})
+
+def test_regression_testing_needs_framework_and_test_files():
+    package_json = '{"devDependencies": {"jest": "^29.0.0"}}'
+    
+    assert "automated_regression_testing" not in resolved({"package.json": package_json})
+    assert "automated_regression_testing" in resolved({"package.json": package_json, "src/app.test.js": "test()"})
@@ -0,0 +1,294 @@
+import os
+import re
+from typing import Dict, Any, List, Mapping, Optional, Tuple
+
+from utils.keyword_matcher import KeywordMatcher, line_starts, line_number
+
+# Prompt context budgets in tokens, matched against the model name from get_llm_model_name()
+# (first match wins). HARDGATES_CONTEXT_TOKENS overrides the budget for every model.
+MODEL_CONTEXT_BUDGETS = [
+    ("@http://localhost", 3000),   # Local OpenAI-compatible servers usually run small context windows
+    ("@http://127.0.0.1", 3000),
+    ("gpt-4o", 16000),
+    ("gpt-4", 6000),
+    ("gpt-3.5", 6000),
+    ("claude", 16000),
+    ("gemini", 12000),
+]
+DEFAULT_CONTEXT_BUDGET = 4000
+
+# Rough characters-per-token ratio for source code
+CHARS_PER_TOKEN = 4
+
+# Lines of context kept around each matching line in an excerpt
+EXCERPT_CONTEXT_LINES = 2
+
+MANIFEST_FILES = re.compile(
+    r'(^|/)(pom\.xml|build\.gradle(\.kts)?|package\.json|requirements[\w.-]*\.txt|pyproject\.toml|'
+    r'setup\.py|go\.mod|gemfile|composer\.json)$',
+    re.IGNORECASE
+)
+CONFIG_FILES = re.compile(
+    r'(^|/)(application[\w-]*\.(ya?ml|properties)|bootstrap\.ya?ml|logback[\w-]*\.xml|log4j2?[\w-]*\.xml|'
+    r'settings\.py|config[\w.-]*\.(js|ts|json|ya?ml)|docker-compose[\w.-]*\.ya?ml|dockerfile)$',
+    re.IGNORECASE
+)
+ENTRYPOINT_FILES = re.compile(r'controller|handler|route|resource|endpoint|middleware|interceptor|filter|api', re.IGNORECASE)
+TEST_FILES = re.compile(r'(^|/)(src/test/|tests?/|__tests__/)|test_[^/]+\.py$|_test\.(py|go)$|\.(test|spec)\.[jt]sx?$|Tests?\.(java|kt|cs)$')
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in a text.
+    """
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def get_context_budget(model_name: str) -> int:
+    """
+    Return the prompt context budget in tokens for a model.
+    """
+    override = os.getenv("HARDGATES_CONTEXT_TOKENS")
+    if override:
+        return int(override)
+    
+    for fragment, budget in MODEL_CONTEXT_BUDGETS:
+        if fragment in model_name:
+            return budget
+    return DEFAULT_CONTEXT_BUDGET
+
+def find_gate_keywords(files_data: Mapping[str, str], gates: List[Dict[str, Any]]) -> Dict[str, Dict[str, List[Tuple[int, str]]]]:
+    """
+    Scan every file once for the keywords of all the given gates.
+    
+    Args:
+        files_data: Mapping of file paths to file contents (a dict or FileStore)
+        gates: Gate definitions whose keywords to look for
+    
+    Returns:
+        Dictionary mapping each file path with at least one match to a dictionary of
+        gate key -> (position, keyword) hits, for build_context(keyword_hits=...)
+    """
+    keywords = {gate["key"]: gate["keywords"] for gate in gates if gate.get("keywords")}
+    if not keywords:
+        return {}
+    
+    matcher = KeywordMatcher(keywords)
+    hits = {}
+    for file_path, content in files_data.items():
+        groups = matcher.match_groups(content)
+        if groups:
+            hits[file_path] = groups
+    return hits
+
+def build_context(files_data: Mapping[str, str], token_budget: int, gates: List[Dict[str, Any]],
+                  require_match: bool = False, include_summary: bool = True,
+                  keyword_hits: Optional[Dict[str, Dict[str, List[Tuple[int, str]]]]] = None) -> Dict[str, Any]:
+    """
+    Pack the most gate-relevant parts of a repository into a token budget.
+    
+    Files are ranked by type (manifests, configuration, entry points such as controllers,
+    tests) and by how often they mention the gates' keywords. Files that do not fit whole
+    are reduced to excerpts around the matching lines.
+    
+    Args:
+        files_data: Mapping of file paths to file contents (a dict or FileStore)
+        token_budget: Maximum number of tokens for the packed context
+        gates: Gate definitions whose keywords decide relevance
+        require_match: Only include files that mention at least one keyword
+        include_summary: Append the file extension summary
+        keyword_hits: find_gate_keywords() output for these gates (or more), to pack several
+            contexts from one scan; by default the files are scanned here
+    
+    Returns:
+        Dictionary with the packed "text", its estimated "tokens", the "token_budget", the "included" paths,
+        the paths reduced to "excerpted" form and the "omitted" paths with a reason
+    """
+    if keyword_hits is None:
+        keyword_hits = find_gate_keywords(files_data, gates)
+    gate_keys = [gate["key"] for gate in gates]
+    
+    summary = _extension_summary(files_data) if include_summary else ""
+    remaining = token_budget - estimate_tokens(summary)
+    # A single file may use at most a quarter of the budget so several files always fit
+    per_file_budget = max(200, token_budget // 4)
+    
+    # Ranking only needs the hits, contents are read for the files that make it into the context
+    ranked = []
+    for file_path in files_data.keys():
+        file_hits = keyword_hits.get(file_path, {})
+        # A keyword shared by several gates counts once
+        matched = {hit for key in gate_keys for hit in file_hits.get(key, ())}
+        positions = [position for position, _ in sorted(matched)]
+        score = _path_score(file_path) + min(len(positions), 50)
+        ranked.append((score, file_path, positions))
+    ranked.sort(key=lambda item: (-item[0], item[1]))
+    
+    parts = []
+    included = []
+    excerpted = []
+    omitted = []
+    
+    for score, file_path, positions in ranked:
+        if require_match and not positions:
+            omitted.append({"path": file_path, "reason": "no relevant keywords"})
+            continue
+        if remaining <= 0:
+            omitted.append({"path": file_path, "reason": "token budget exhausted"})
+            continue
+        
+        content = files_data[file_path]
+        header = f"File: {file_path}\n```\n"
+        file_budget = min(per_file_budget, remaining) - estimate_tokens(header) - 2
+        
+        is_excerpt = estimate_tokens(content) > file_budget
+        body = _excerpt(content, positions, file_budget) if is_excerpt else content
+        
+        part = f"{header}{body}\n```\n"
+        part_tokens = estimate_tokens(part)
+        if not body or part_tokens > remaining:
+            omitted.append({"path": file_path, "reason": "token budget exhausted"})
+            continue
+        
+        parts.append(part)
+        included.append(file_path)
+        if is_excerpt:
+            excerpted.append(file_path)
+        remaining -= part_tokens
+    
+    if summary:
+        parts.append(summary)
+    
+    text = "\n".join(parts)
+    return {
+        "text": text,
+        "tokens": estimate_tokens(text),
+        "token_budget": token_budget,
+        "included": included,
+        "excerpted": excerpted,
+        "omitted": omitted
+    }
+
+def shard_files(files_data: Mapping[str, str], chunk_tokens: int) -> List[str]:
+    """
+    Split a whole repository into formatted chunks of at most chunk_tokens each.
+    
+    Files are taken in path order so files from the same directory share a chunk.
+    Files larger than a chunk are split on line boundaries, with the line range in the header.
+    
+    Args:
+        files_data: Mapping of file paths to file contents (a dict or FileStore)
+        chunk_tokens: Maximum number of tokens per chunk
+    
+    Returns:
+        List of chunk texts
+    """
+    chunks = []
+    current = []
+    used = 0
+    
+    for file_path in sorted(files_data):
+        for part in _split_file(file_path, files_data[file_path], chunk_tokens):
+            part_tokens = estimate_tokens(part)
+            if current and used + part_tokens > chunk_tokens:
+                chunks.append("\n".join(current))
+                current = []
+                used = 0
+            current.append(part)
+            used += part_tokens
+    
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+def _split_file(file_path: str, content: str, max_tokens: int) -> List[str]:
+    """
+    Format a file as one or more parts of at most max_tokens each.
+    """
+    whole = f"File: {file_path}\n```\n{content}\n```\n"
+    if estimate_tokens(whole) <= max_tokens:
+        return [whole]
+    
+    # Leave room for the header with the line range
+    max_chars = max(1, (max_tokens - estimate_tokens(f"File: {file_path} (lines 000000-000000)\n```\n```\n")) * CHARS_PER_TOKEN)
+    
+    parts = []
+    part_lines = []
+    part_chars = 0
+    first_line = 1
+    for i, line in enumerate(content.split("\n"), 1):
+        line = line[:max_chars - 1]
+        if part_lines and part_chars + len(line) + 1 > max_chars:
+            parts.append(f"File: {file_path} (lines {first_line}-{i - 1})\n```\n" + "\n".join(part_lines) + "\n```\n")
+            part_lines = []
+            part_chars = 0
+            first_line = i
+        part_lines.append(line)
+        part_chars += len(line) + 1
+    
+    if part_lines:
+        last_line = first_line + len(part_lines) - 1
+        parts.append(f"File: {file_path} (lines {first_line}-{last_line})\n```\n" + "\n".join(part_lines) + "\n```\n")
+    return parts
+
+def _path_score(file_path: str) -> int:
+    """
+    Score a file by how likely its type is to carry hard gate evidence.
+    """
+    normalized_path = file_path.replace(os.sep, "/")
+    if MANIFEST_FILES.search(normalized_path):
+        return 100
+    if CONFIG_FILES.search(normalized_path):
+        return 80
+    if ENTRYPOINT_FILES.search(normalized_path.rsplit("/", 1)[-1]):
+        return 40
+    if TEST_FILES.search(normalized_path):
+        return 20
+    return 0
+
+def _excerpt(content: str, positions: List[int], token_budget: int) -> str:
+    """
+    Reduce a file to numbered lines around keyword matches, or its first lines if nothing matched.
+    """
+    lines = content.split("\n")
+    max_chars = max(0, token_budget) * CHARS_PER_TOKEN
+    
+    if positions:
+        starts = line_starts(content)
+        matching_lines = sorted({line_number(starts, position) - 1 for position in positions})
+        selected = sorted({j for i in matching_lines
+                           for j in range(max(0, i - EXCERPT_CONTEXT_LINES), min(len(lines), i + EXCERPT_CONTEXT_LINES + 1))})
+    else:
+        selected = range(len(lines))
+    
+    output = []
+    used = 0
+    previous = None
+    for j in selected:
+        line = f"{j + 1}: {lines[j]}"
+        gap = previous is not None and j != previous + 1
+        needed = len(line) + 1 + (4 if gap else 0)
+        if used + needed > max_chars:
+            if output:
+                output.append("...")
+            break
+        if gap:
+            output.append("...")
+        output.append(line)
+        used += needed
+        previous = j
+    
+    return "\n".join(output)
+
+def _extension_summary(files_data: Mapping[str, str]) -> str:
+    """
+    Summarise the repository's files by extension.
+    """
+    extensions = {}
+    for file_path in files_data.keys():
+        _, ext = os.path.splitext(file_path)
+        if ext:
+            extensions[ext] = extensions.get(ext, 0) + 1
+    
+    ext_summary = "\nFile Extension Summary:\n"
+    for ext, count in extensions.items():
+        ext_summary += f"- {ext}: {count} files\n"
+    return ext_summary
@@ -0,0 +1,123 @@
+import os
+import hashlib
+import tempfile
+import threading
+from collections.abc import Mapping
+from typing import Iterable, Iterator, Optional, Tuple
+
+# Where file contents are spooled during an assessment (default: the system temp directory)
+FILE_STORE_DIR = os.getenv("HARDGATES_FILE_STORE_DIR") or None
+
+class FileStore(Mapping):
+    """
+    Read-only mapping of repository paths to file contents that keeps the contents on disk.
+    
+    Contents are appended UTF-8 encoded to an anonymous temporary file and decoded again on
+    each access, so memory use depends on the number of files rather than their size. Only
+    a small index entry is kept in memory per file: offset and length in the spool file,
+    size in characters, extension and SHA-256 digest. The spool file is deleted when the
+    store is closed or garbage collected.
+    
+    Reads and add() are safe from several threads at once. Iteration follows insertion
+    order, which reorder() can change after concurrent writers are done.
+    """
+    
+    def __init__(self, directory: Optional[str] = FILE_STORE_DIR):
+        # Unbuffered, so a write is visible to pread() straight away
+        self._spool = tempfile.TemporaryFile(dir=directory, buffering=0)
+        self._fd = self._spool.fileno()
+        self._end = 0
+        # path -> (offset, length, characters, extension, digest)
+        self._index = {}
+        # Without os.pread (Windows), seek and read must not interleave between threads
+        self._lock = threading.Lock()
+    
+    def add(self, path: str, content: str):
+        """
+        Append a file's contents to the store, replacing any earlier contents for the path.
+        """
+        data = content.encode("utf-8")
+        extension = os.path.splitext(path)[1].lower()
+        digest = hashlib.sha256(data).digest()
+        
+        with self._lock:
+            self._spool.seek(self._end)
+            # Unbuffered writes may be partial
+            view = memoryview(data)
+            while view:
+                view = view[self._spool.write(view):]
+            self._index[path] = (self._end, len(data), len(content), extension, digest)
+            self._end += len(data)
+    
+    def reorder(self, paths: Iterable[str]):
+        """
+        Put the files in the given path order. Paths not in the store are ignored and
+        files missing from paths are dropped.
+        """
+        with self._lock:
+            self._index = {path: self._index[path] for path in paths if path in self._index}
+    
+    def __getitem__(self, path: str) -> str:
+        offset, length, _, _, _ = self._index[path]
+        return self._read(offset, length).decode("utf-8")
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index)
+    
+    def __len__(self) -> int:
+        return len(self._index)
+    
+    def __contains__(self, path) -> bool:
+        return path in self._index
+    
+    def size(self, path: str) -> int:
+        """
+        Return the length in characters of a file's contents without reading them.
+        """
+        return self._index[path][2]
+    
+    def extension(self, path: str) -> str:
+        """
+        Return a file's lowercase extension, e.g. ".py" ("" if it has none).
+        """
+        return self._index[path][3]
+    
+    def digest(self, path: str) -> str:
+        """
+        Return the SHA-256 hex digest of a file's UTF-8 encoded contents.
+        """
+        return self._index[path][4].hex()
+    
+    def metadata(self) -> Iterator[Tuple[str, int, str]]:
+        """
+        Yield (path, size, extension) for every file without reading any contents.
+        """
+        for path, (_, _, characters, extension, _) in self._index.items():
+            yield path, characters, extension
+    
+    @property
+    def total_bytes(self) -> int:
+        """
+        Size of the spooled contents on disk.
+        """
+        return self._end
+    
+    def close(self):
+        """
+        Delete the spool file. The store is empty afterwards.
+        """
+        self._index = {}
+        self._spool.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+    
+    def _read(self, offset: int, length: int) -> bytes:
+        if hasattr(os, "pread"):
+            return os.pread(self._fd, length, offset)
+        with self._lock:
+            self._spool.seek(offset)
+            return self._spool.read(length)
@@ -0,0 +1,276 @@
+import json
+from typing import Dict, Any, List
+
+# The 15 primary hard gates in report order.
+# Each entry lists the prompt description, the category it is grouped under, the
+# keywords used to pick relevant evidence from the repository and the sample verdict
+# shown in the monolithic prompt's JSON structure.
+PRIMARY_HARD_GATES = [
+    {
+        "key": "logs_searchable_available",
+        "title": "Logs are searchable and available",
+        "category": "Auditability",
+        "description": "Check for logging frameworks (SLF4J, Logback, Log4j), log configuration files, log levels setup",
+        "keywords": ["slf4j", "logback", "log4j", "logging", "logger", "logstash", "fluentd", "elasticsearch"],
+        "recommendation": "Implement centralized logging with search capabilities",
+        "example": {"implemented": "yes", "evidence": "SLF4J logging configured with proper log levels", "recommendation": "Ensure log aggregation is setup for searchability"}
+    },
+    {
+        "key": "avoid_logging_confidential_data",
+        "title": "Avoid logging confidential data",
+        "category": "Auditability",
+        "description": "Scan for patterns like password, token, secret, api_key, credential in log statements",
+        "keywords": ["password", "token", "secret", "api_key", "apikey", "credential", "mask"],
+        "recommendation": "Review all log statements to ensure no sensitive data is logged",
+        "example": {"implemented": "partial", "evidence": "Some logging patterns found but need review", "recommendation": "Audit all log statements to ensure no sensitive data like passwords, tokens, or API keys are logged"}
+    },
+    {
+        "key": "create_audit_trail_logs",
+        "title": "Create audit trail logs",
+        "category": "Auditability",
+        "description": "Look for audit logging, business event logging, user action tracking",
+        "keywords": ["audit", "trail", "event", "activity"],
+        "recommendation": "Implement audit trail logging for important business operations",
+        "example": {"implemented": "no", "evidence": "No dedicated audit logging found", "recommendation": "Implement audit trail logging for important business operations and user actions"}
+    },
+    {
+        "key": "tracking_id_for_log_messages",
+        "title": "Implement tracking ID for log messages",
+        "category": "Auditability",
+        "description": "Search for correlation IDs, trace IDs, MDC usage, request tracking",
+        "keywords": ["correlation", "traceid", "trace-id", "trace_id", "request-id", "requestid", "mdc", "tracking"],
+        "recommendation": "Add tracking/correlation IDs to log messages for request tracing",
+        "example": {"implemented": "no", "evidence": "No correlation IDs or MDC usage found", "recommendation": "Add MDC (Mapped Diagnostic Context) or similar for request tracking across logs"}
+    },
+    {
+        "key": "log_rest_api_calls",
+        "title": "Log REST API calls",
+        "category": "Auditability",
+        "description": "Check for HTTP request/response logging, API interceptors, middleware logging",
+        "keywords": ["interceptor", "middleware", "filter", "@restcontroller", "@requestmapping", "requestlogging", "access log"],
+        "recommendation": "Add comprehensive request/response logging for all API calls",
+        "example": {"implemented": "partial", "evidence": "Some controller logging detected", "recommendation": "Add comprehensive API request/response logging using interceptors or filters"}
+    },
+    {
+        "key": "log_application_messages",
+        "title": "Log application messages",
+        "category": "Auditability",
+        "description": "Verify general application logging practices and structured logging",
+        "keywords": ["log.info", "logger.info", "logging.info", "log.debug", "logger.debug", "log.warn", "console.log"],
+        "recommendation": "Standardize application logging levels and messages",
+        "example": {"implemented": "yes", "evidence": "Application logging present throughout codebase", "recommendation": "Standardize log levels and ensure consistent logging format"}
+    },
+    {
+        "key": "client_ui_errors_logged",
+        "title": "Client UI errors are logged",
+        "category": "Auditability",
+        "description": "Look for frontend error handling, error reporting mechanisms to backend",
+        "keywords": ["window.onerror", "unhandledrejection", "errorboundary", "componentdidcatch", "errorhandler", "console.error"],
+        "recommendation": "Implement client-side error logging and reporting mechanism",
+        "example": {"implemented": "no", "evidence": "No client-side error logging mechanism found", "recommendation": "Implement frontend error reporting mechanism to send client errors to backend logging"}
+    },
+    {
+        "key": "retry_logic",
+        "title": "Retry Logic",
+        "category": "Availability",
+        "description": "Search for retry patterns, @Retryable annotations, retry libraries (Resilience4j, Spring Retry)",
+        "keywords": ["retry", "@retryable", "resilience4j", "spring-retry", "tenacity", "backoff"],
+        "recommendation": "Implement retry logic for external service calls",
+        "example": {"implemented": "no", "evidence": "No retry patterns or libraries found", "recommendation": "Implement retry logic for external service calls using Spring Retry or Resilience4j"}
+    },
+    {
+        "key": "set_timeouts_io_operations",
+        "title": "Set timeouts on IO operation",
+        "category": "Availability",
+        "description": "Check HTTP client timeouts, database connection timeouts, external service timeouts",
+        "keywords": ["timeout", "connecttimeout", "readtimeout", "sockettimeout"],
+        "recommendation": "Ensure all IO operations have appropriate timeout configurations",
+        "example": {"implemented": "partial", "evidence": "Some timeout configurations found", "recommendation": "Ensure all IO operations (HTTP clients, DB connections) have appropriate timeout settings"}
+    },
+    {
+        "key": "throttling_drop_request",
+        "title": "Throttling, drop request",
+        "category": "Availability",
+        "description": "Look for rate limiting, request throttling, circuit breaker patterns",
+        "keywords": ["ratelimit", "rate-limit", "rate_limit", "throttl", "bucket4j", "limiter"],
+        "recommendation": "Implement request throttling and rate limiting",
+        "example": {"implemented": "no", "evidence": "No rate limiting or throttling mechanisms found", "recommendation": "Implement request throttling and rate limiting to protect against abuse"}
+    },
+    {
+        "key": "circuit_breakers_outgoing_requests",
+        "title": "Set circuit breakers on outgoing requests",
+        "category": "Availability",
+        "description": "Search for circuit breaker implementations (Hystrix, Resilience4j)",
+        "keywords": ["circuitbreaker", "circuit-breaker", "circuit_breaker", "hystrix", "resilience4j"],
+        "recommendation": "Implement circuit breaker pattern for external service calls",
+        "example": {"implemented": "no", "evidence": "No circuit breaker patterns found", "recommendation": "Implement circuit breakers for external service calls to prevent cascade failures"}
+    },
+    {
+        "key": "log_system_errors",
+        "title": "Log system errors",
+        "category": "Error Handling",
+        "description": "Verify exception logging in catch blocks, error handling patterns",
+        "keywords": ["catch", "except", "log.error", "logger.error", "logging.error", "logging.exception", "@exceptionhandler"],
+        "recommendation": "Ensure all system errors are properly logged with context",
+        "example": {"implemented": "yes", "evidence": "Exception logging found in catch blocks", "recommendation": "Ensure all exceptions are properly logged with sufficient context"}
+    },
+    {
+        "key": "use_http_standard_error_codes",
+        "title": "Use HTTP standard error codes",
+        "category": "Error Handling",
+        "description": "Check REST controller response codes, error response patterns",
+        "keywords": ["httpstatus", "responseentity", "status_code", "@responsestatus", "httpexception", "res.status"],
+        "recommendation": "Verify all endpoints return appropriate HTTP status codes",
+        "example": {"implemented": "yes", "evidence": "Standard HTTP status codes used in REST controllers", "recommendation": "Continue using appropriate HTTP status codes for all API responses"}
+    },
+    {
+        "key": "include_client_error_tracking",
+        "title": "Include Client error tracking",
+        "category": "Error Handling",
+        "description": "Look for client-side error tracking, error headers, frontend monitoring",
+        "keywords": ["sentry", "bugsnag", "rollbar", "newrelic", "datadog", "appinsights", "trackjs"],
+        "recommendation": "Implement client-side error tracking and reporting",
+        "example": {"implemented": "no", "evidence": "No client error tracking mechanism detected", "recommendation": "Add mechanism to track and log client-side errors with proper correlation to server logs"}
+    },
+    {
+        "key": "automated_regression_testing",
+        "title": "Automated Regression Testing",
+        "category": "Testing",
+        "description": "Check for test files, test frameworks (JUnit, TestNG), CI/CD test automation",
+        "keywords": ["junit", "testng", "pytest", "unittest", "jest", "mocha", "@test", "cucumber", "selenium"],
+        "recommendation": "Implement comprehensive automated regression testing",
+        "example": {"implemented": "partial", "evidence": "Unit tests found but limited coverage", "recommendation": "Expand automated test suite to include comprehensive regression and integration tests"}
+    }
+]
+
+PRIMARY_GATE_KEYS = [gate["key"] for gate in PRIMARY_HARD_GATES]
+
+GATES_BY_KEY = {gate["key"]: gate for gate in PRIMARY_HARD_GATES}
+
+def gates_by_category() -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Group the primary hard gates by category, keeping report order.
+    """
+    categories = {}
+    for gate in PRIMARY_HARD_GATES:
+        categories.setdefault(gate["category"], []).append(gate)
+    return categories
+
+def format_gate_list(gates: List[Dict[str, Any]]) -> str:
+    """
+    Format gates as the numbered list used in analysis prompts.
+    """
+    return "\n".join(f"{i}. **{gate['title']}** - {gate['description']}" for i, gate in enumerate(gates, 1))
+
+def format_requested_gates(gates: List[Dict[str, Any]]) -> str:
+    """
+    Format the gates a request asks about. The gate definitions are in the system prompt,
+    so only the keys and titles go into the per-request prompt.
+    """
+    return "\n".join(f"- {gate['key']}: {gate['title']}" for gate in gates)
+
+def format_gate_examples(gates: List[Dict[str, Any]]) -> str:
+    """
+    Format the sample primary_hard_gates entries shown in the monolithic prompt.
+    """
+    return ",\n".join(f'    "{gate["key"]}": {json.dumps(gate["example"])}' for gate in gates)
+
+def calculate_compliance_metrics(primary_gates: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Calculate compliance statistics for a primary_hard_gates result.
+    
+    Partially implemented gates count as half.
+    """
+    total_gates = len(primary_gates)
+    gates_implemented = sum(1 for gate in primary_gates.values()
+                          if isinstance(gate, dict) and gate.get("implemented") == "yes")
+    gates_partial = sum(1 for gate in primary_gates.values()
+                      if isinstance(gate, dict) and gate.get("implemented") == "partial")
+    gates_not_implemented = total_gates - gates_implemented - gates_partial
+    
+    compliance_percentage = ((gates_implemented + 0.5 * gates_partial) / total_gates * 100) if total_gates > 0 else 0
+    
+    return {
+        "total_gates": total_gates,
+        "gates_implemented": gates_implemented,
+        "gates_partial": gates_partial,
+        "gates_not_implemented": gates_not_implemented,
+        "compliance_percentage": compliance_percentage
+    }
+
+# Verdicts a gate can receive in an analysis response
+GATE_VERDICTS = ("yes", "partial", "no")
+
+# Components reported in the monolithic prompt's component_analysis section
+COMPONENT_KEYS = ["logging_framework", "rest_endpoints", "test_framework", "retry_library", "circuit_breaker"]
+
+def gate_response_schema(gate_keys: List[str], verdicts=GATE_VERDICTS, include_components: bool = False) -> Dict[str, Any]:
+    """
+    Build the JSON schema of an analysis response for provider-native structured output.
+    
+    Only keywords supported by OpenAI, Anthropic and Gemini schemas are used.
+    
+    Args:
+        gate_keys: Gates the response must contain a verdict for
+        verdicts: Allowed values of each gate's "implemented" field
+        include_components: Include the component_analysis section
+    
+    Returns:
+        JSON schema dictionary
+    """
+    string = {"type": "string"}
+    technology = {
+        "type": "object",
+        "properties": {"name": string, "version": string, "purpose": string},
+        "required": ["name"]
+    }
+    finding = {
+        "type": "object",
+        "properties": {
+            "category": string,
+            "severity": {"type": "string", "enum": ["high", "medium", "low"]},
+            "description": string,
+            "location": string,
+            "recommendation": string
+        },
+        "required": ["category", "severity", "description", "location", "recommendation"]
+    }
+    verdict = {
+        "type": "object",
+        "properties": {
+            "implemented": {"type": "string", "enum": list(verdicts)},
+            "evidence": string,
+            "recommendation": string
+        },
+        "required": ["implemented", "evidence", "recommendation"]
+    }
+    
+    properties = {
+        "technology_stack": {
+            "type": "object",
+            "properties": {section: {"type": "array", "items": technology}
+                           for section in ("languages", "frameworks", "databases")}
+        },
+        "findings": {"type": "array", "items": finding},
+        "primary_hard_gates": {
+            "type": "object",
+            "properties": {key: verdict for key in gate_keys},
+            "required": list(gate_keys)
+        }
+    }
+    if include_components:
+        component = {
+            "type": "object",
+            "properties": {"detected": {"type": "string", "enum": ["yes", "no"]}, "evidence": string},
+            "required": ["detected", "evidence"]
+        }
+        properties["component_analysis"] = {
+            "type": "object",
+            "properties": {key: component for key in COMPONENT_KEYS}
+        }
+    
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": ["technology_stack", "findings", "primary_hard_gates"]
+    }
@@ -2,165 +2,592 @@ import os
 import subprocess
 import tempfile
 import shutil
-from typing import Dict, Optional
+import base64
+import hashlib
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, List, Tuple, Iterator
 from pathlib import Path
+from utils.file_store import FileStore
+from utils.path_filter import PathFilter, load_repo_config, REPO_CONFIG_FILE
 
-def fetch_github_repo(repo_url: str, branch: str = "main", github_token: Optional[str] = None) -> Dict[str, str]:
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Not available on Windows, fall back to in-process locking only
+
+# Mirror cache configuration (set HARDGATES_MIRROR_CACHE=0 to always clone into a throwaway directory)
+MIRROR_CACHE_ENABLED = os.getenv("HARDGATES_MIRROR_CACHE", "1").lower() not in ("0", "false", "no")
+MIRROR_CACHE_DIR = os.getenv("HARDGATES_MIRROR_CACHE_DIR", os.path.join(Path.home(), ".cache", "hardgates", "mirrors"))
+MIRROR_CACHE_MAX_BYTES = int(os.getenv("HARDGATES_MIRROR_CACHE_MAX_MB", "2048")) * 1024 * 1024
+
+# Size of a mirror in bytes, stored inside it after every fetch
+MIRROR_SIZE_FILE = "hardgates-size"
+
+# Branches tried when the requested branch does not exist
+ALTERNATIVE_BRANCHES = ["master", "develop", "dev"]
+
+MAX_FILE_SIZE = 500000  # 500KB
+
+# Files containing a NUL byte in their first bytes are treated as binary (the same test git uses)
+BINARY_SNIFF_BYTES = 8000
+
+# Parallel `git cat-file` readers, each decoding and filtering its own share of the files
+READ_WORKERS = int(os.getenv("HARDGATES_READ_WORKERS", str(min(8, os.cpu_count() or 1))))
+
+# Files per reader below which starting another reader is not worth it
+MIN_FILES_PER_READER = 64
+
+# Serialises mirror access between threads of the same process (file locks cover other processes)
+_mirror_locks = {}
+_mirror_locks_guard = threading.Lock()
+
+def fetch_github_repo(repo_url: str, branch: str = "main", github_token: Optional[str] = None) -> FileStore:
     """
-    Fetch repository content using git clone.
+    Fetch repository content using a cached git mirror, see fetch_github_commit().
+    
+    Returns:
+        FileStore mapping file paths to file contents, spooled to disk
+    """
+    files_data, _ = fetch_github_commit(repo_url, branch, github_token)
+    return files_data
+
+def fetch_github_commit(repo_url: str, branch: str = "main", github_token: Optional[str] = None) -> Tuple[FileStore, str]:
+    """
+    Fetch repository content using a cached git mirror.
+    
+    A bare mirror per repository URL is kept under HARDGATES_MIRROR_CACHE_DIR and
+    updated with a blobless `git fetch`, so repeat assessments only transfer new commits
+    and trees. Files are read straight from the mirror's object store without a
+    checkout, and only the blobs of files that pass the filtering rules are downloaded.
+    
+    The branch may have moved since resolve_commit_sha() was called, so the SHA of the
+    commit that was actually fetched and read is returned with the files.
     
     Args:
         repo_url: GitHub repository URL (e.g., https://github.com/user/repo)
         branch: Branch name to fetch (defaults to main)
         github_token: GitHub authentication token (optional, used for private repos)
-        
+    
     Returns:
-        Dictionary mapping file paths to file contents
+        Tuple of a FileStore mapping file paths to file contents (spooled to disk) and the commit SHA
     """
     
     # Validate GitHub URL - support custom domains like github.xyz.com
     if not (repo_url.startswith("https://") and "github" in repo_url.split("//")[1].split("/")[0]):
         raise ValueError("Repository URL must be a GitHub URL (supports github.com and GitHub Enterprise domains)")
     
-    # Create a temporary directory for cloning
-    with tempfile.TemporaryDirectory() as temp_dir:
-        clone_dir = os.path.join(temp_dir, "repo")
+    try:
+        with _repository_mirror(repo_url, branch, github_token) as (mirror_dir, commit_sha):
+            files_data = _read_repository_files(mirror_dir, commit_sha, github_token)
         
-        try:
-            # Prepare clone URL with token if provided
-            if github_token:
-                # Insert token into URL for authentication
-                clone_url = repo_url.replace("https://", f"https://{github_token}@")
-            else:
-                clone_url = repo_url
-            
-            # Clone the repository with specific branch and minimal depth
-            cmd = [
-                "git", "clone", 
-                "--depth", "1",  # Shallow clone for speed
-                "--branch", branch,
-                "--single-branch",
-                clone_url, 
-                clone_dir
-            ]
-            
-            print(f"Cloning repository: {repo_url} (branch: {branch})")
-            result = subprocess.run(
-                cmd, 
-                capture_output=True, 
-                text=True, 
-                timeout=300  # 5 minute timeout
-            )
-            
-            if result.returncode != 0:
-                # Try alternative branch names if the specified branch fails
-                for alt_branch in ["master", "develop", "dev"]:
-                    if alt_branch != branch:
-                        try:
-                            alt_cmd = [
-                                "git", "clone", 
-                                "--depth", "1",
-                                "--branch", alt_branch,
-                                "--single-branch",
-                                clone_url, 
-                                clone_dir
-                            ]
-                            print(f"Trying alternative branch: {alt_branch}")
-                            result = subprocess.run(alt_cmd, capture_output=True, text=True, timeout=300)
-                            if result.returncode == 0:
-                                print(f"Successfully cloned using branch: {alt_branch}")
-                                break
-                        except:
-                            continue
-                else:
-                    raise ValueError(f"Failed to clone repository. Error: {result.stderr}")
-            
-            # Read files from cloned repository
-            files_data = {}
-            
-            # File filtering configuration
-            allowed_extensions = {
-                '.py', '.js', '.ts', '.java', '.go', '.rb', '.php', '.cpp', '.h', '.hpp', 
-                '.c', '.cs', '.swift', '.yaml', '.yml', '.json', '.xml', '.html', '.css',
-                '.md', '.rst', '.txt', '.dockerfile', '.sh', '.bash', '.sql', '.scala',
-                '.kt', '.dart', '.rs', '.lua', '.r', '.m', '.mm', '.gradle', '.maven'
-            }
-            
-            excluded_dirs = {
-                '.git', '.github', '.vscode', '.idea', '__pycache__', 'node_modules', 
-                'dist', 'build', 'target', 'bin', 'obj', '.next', '.nuxt', 'vendor',
-                'env', '.env', '.venv', 'venv', 'logs', 'tmp', 'temp', '.cache'
-            }
-            
-            excluded_files = {
-                '.gitignore', '.gitmodules', '.DS_Store', 'Thumbs.db', '.dockerignore',
-                'package-lock.json', 'yarn.lock', 'composer.lock', 'Gemfile.lock'
-            }
+        if not files_data:
+            raise ValueError("No valid files found in repository")
+        
+        print(f"Successfully fetched {len(files_data)} files at commit {commit_sha[:12]}")
+        return files_data, commit_sha
+    
+    except subprocess.TimeoutExpired:
+        raise ValueError("Repository clone timed out. Repository may be too large.")
+    except Exception as e:
+        if "does not exist" in str(e).lower():
+            raise ValueError(f"Repository or branch '{branch}' not found")
+        else:
+            raise ValueError(f"Failed to fetch repository: {str(e)}")
+
+def resolve_commit_sha(repo_url: str, branch: str = "main", github_token: Optional[str] = None) -> Optional[str]:
+    """
+    Resolve the head commit SHA of a branch with `git ls-remote`, without fetching any objects.
+    
+    Falls back to the same alternative branches as fetch_github_repo.
+    
+    Returns:
+        The commit SHA, or None if no matching branch could be resolved
+    """
+    for candidate in [branch] + [alt for alt in ALTERNATIVE_BRANCHES if alt != branch]:
+        result = _run_git(["ls-remote", repo_url, f"refs/heads/{candidate}"],
+                          github_token=github_token, check=False, timeout=60)
+        if result.returncode != 0:
+            # Repository unreachable, no point trying other branches
+            return None
+        
+        output = result.stdout.strip()
+        if output:
+            return output.split()[0]
+    
+    return None
+
+def _read_repository_files(git_dir: str, ref: str, github_token: Optional[str]) -> FileStore:
+    """
+    Read the files that pass the filtering rules straight from a repository's object store.
+    
+    Candidates are found by walking the commit's trees, the blobs the mirror does not have
+    yet are downloaded in one request, and contents are streamed through `git cat-file --batch`
+    processes, up to HARDGATES_READ_WORKERS of them in parallel.
+    """
+    files_data = FileStore()
+    local_objects = _local_objects(git_dir)
+    candidates = _list_files(git_dir, ref, local_objects, github_token)
+    if not candidates:
+        return files_data
+    
+    _fetch_missing_blobs(git_dir, {oid for _, oid in candidates}, local_objects, github_token)
+    
+    # Contiguous slices, so putting the store back in candidate order afterwards is cheap
+    workers = max(1, min(READ_WORKERS, len(candidates) // MIN_FILES_PER_READER))
+    slice_size = -(-len(candidates) // workers)
+    slices = [candidates[start:start + slice_size] for start in range(0, len(candidates), slice_size)]
+    
+    with ThreadPoolExecutor(max_workers=len(slices)) as executor:
+        binary_counts = list(executor.map(lambda entries: _store_files(git_dir, entries, files_data), slices))
+    
+    # Readers finish in any order; the result follows tree order regardless
+    files_data.reorder(path for path, _ in candidates)
+    
+    if sum(binary_counts):
+        print(f"Skipped {sum(binary_counts)} binary files")
+    return files_data
+
+def _store_files(git_dir: str, entries: List[Tuple[str, str]], files_data: FileStore) -> int:
+    """
+    Read, filter and store the contents of (path, blob ID) entries. Returns the number of binary files skipped.
+    """
+    binary_files = 0
+    for path, size, content in _read_blobs(git_dir, entries):
+        # Skip large files (> 500KB)
+        if content is None:
+            print(f"Skipping large file: {path} ({size} bytes)")
+            continue
+        
+        # Skip binary files before paying for decoding them
+        if b"\0" in content[:BINARY_SNIFF_BYTES]:
+            binary_files += 1
+            continue
+        
+        # Decode like a file opened in text mode, with universal newlines
+        text = content.decode('utf-8', errors='ignore').replace('\r\n', '\n').replace('\r', '\n')
+        
+        # Skip empty files or files with only whitespace
+        if text.strip():
+            files_data.add(path, text)
+    
+    return binary_files
+
+def _list_files(git_dir: str, ref: str, local_objects: set, github_token: Optional[str]) -> List[Tuple[str, str]]:
+    """
+    List the path and blob ID of every file in a commit that passes the path filter, without reading any file.
+    
+    Trees are read through one `git cat-file --batch` process, and excluded directories are
+    skipped without reading their trees. A .hardgates.yml at the root of the commit adjusts
+    the filter (see utils/path_filter.py).
+    """
+    # Never fetch an object lazily here, without the token that would fail or prompt
+    env = dict(os.environ, GIT_TERMINAL_PROMPT="0", GIT_NO_LAZY_FETCH="1")
+    process = subprocess.Popen(["git", "--git-dir", git_dir, "cat-file", "--batch"], stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, env=env)
+    
+    try:
+        root_oid, _, root = _read_object(process, f"{ref}^{{tree}}")
+        if root_oid is None:
+            raise ValueError(f"Could not read the tree of {ref}")
+        oid_length = len(root_oid) // 2
+        
+        path_filter = _repo_path_filter(git_dir, process, _tree_entries(root, oid_length), local_objects, github_token)
+        
+        files = []
+        pruned = 0
+        # Depth-first, in tree order, so the listing matches `git ls-tree -r`
+        stack = [("", _tree_entries(root, oid_length))]
+        while stack:
+            prefix, entries = stack[-1]
+            entry = next(entries, None)
+            if entry is None:
+                stack.pop()
+                continue
             
-            # Walk through the repository directory
-            repo_path = Path(clone_dir)
-            for file_path in repo_path.rglob('*'):
-                if not file_path.is_file():
-                    continue
-                
-                # Get relative path from repo root
-                relative_path = file_path.relative_to(repo_path)
-                relative_path_str = str(relative_path)
-                
-                # Skip excluded directories
-                if any(excluded_dir in relative_path.parts for excluded_dir in excluded_dirs):
-                    continue
-                
-                # Skip excluded files
-                if relative_path.name in excluded_files:
-                    continue
-                
-                # Check file extension or special files
-                file_ext = file_path.suffix.lower()
-                is_special_file = any(pattern in relative_path.name.lower() 
-                                    for pattern in ["dockerfile", "makefile", "cmakelists.txt", "readme"])
-                
-                if file_ext not in allowed_extensions and not is_special_file:
+            mode, name, oid = entry
+            path = prefix + name
+            if mode == b"40000":
+                if not path_filter.includes_directory(path):
+                    pruned += 1
                     continue
+                _, object_type, tree = _read_object(process, oid)
+                if object_type == "tree":
+                    stack.append((path + "/", _tree_entries(tree, oid_length)))
+            elif mode in (b"100644", b"100755") and path_filter.includes_file(path):
+                # Symlinks (120000) and submodules (160000) have no content of their own
+                files.append((path, oid))
+    finally:
+        process.stdin.close()
+        process.wait()
+    
+    if pruned:
+        print(f"Skipped {pruned} excluded directories")
+    return files
+
+def _repo_path_filter(git_dir: str, process: subprocess.Popen, root_entries: Iterator[Tuple[bytes, str, str]],
+                      local_objects: set, github_token: Optional[str]) -> PathFilter:
+    """
+    Build the path filter for a commit, applying the .hardgates.yml at its root if there is one.
+    """
+    config_oid = next((oid for mode, name, oid in root_entries if name == REPO_CONFIG_FILE and mode != b"40000"), None)
+    if config_oid is None:
+        return PathFilter()
+    
+    _fetch_missing_blobs(git_dir, {config_oid}, local_objects, github_token)
+    _, object_type, content = _read_object(process, config_oid)
+    config = load_repo_config(content.decode("utf-8", errors="replace")) if object_type == "blob" else None
+    if config is None:
+        return PathFilter()
+    
+    try:
+        path_filter = PathFilter.from_config(config)
+    except Exception as e:
+        print(f"Warning: Invalid {REPO_CONFIG_FILE}, using the default file filter: {str(e)}")
+        return PathFilter()
+    
+    print(f"Using file filter rules from {REPO_CONFIG_FILE}")
+    return path_filter
+
+def _read_object(process: subprocess.Popen, name: str) -> Tuple[Optional[str], Optional[str], bytes]:
+    """
+    Read one object through an interactive `git cat-file --batch` process.
+    
+    Returns (object ID, type, content), or (None, None, b"") if the object is missing.
+    """
+    process.stdin.write(f"{name}\n".encode())
+    process.stdin.flush()
+    
+    header = process.stdout.readline().split()
+    if len(header) != 3:
+        return None, None, b""
+    
+    # Content is followed by a newline
+    content = process.stdout.read(int(header[2]) + 1)[:-1]
+    return header[0].decode(), header[1].decode(), content
+
+def _tree_entries(tree: bytes, oid_length: int) -> Iterator[Tuple[bytes, str, str]]:
+    """
+    Parse a raw tree object into (mode, name, object ID) entries, in tree order.
+    """
+    position = 0
+    while position < len(tree):
+        space = tree.index(b" ", position)
+        nul = tree.index(b"\0", space)
+        name = tree[space + 1:nul].decode("utf-8", errors="replace")
+        oid = tree[nul + 1:nul + 1 + oid_length].hex()
+        yield tree[position:space], name, oid
+        position = nul + 1 + oid_length
+
+def _local_objects(git_dir: str) -> set:
+    """
+    Return the IDs of the objects a mirror has, read from its pack indexes without walking any tree.
+    
+    Looking up a missing object of a partial clone fails even with lazy fetching disabled, so
+    the objects that are there are listed instead of checking the ones that are needed.
+    """
+    result = _run_git(["cat-file", "--batch-all-objects", "--batch-check=%(objectname)", "--unordered"],
+                      git_dir=git_dir, env={"GIT_NO_LAZY_FETCH": "1"})
+    return set(result.stdout.split())
+
+def _fetch_missing_blobs(git_dir: str, oids: set, local_objects: set, github_token: Optional[str]):
+    """
+    Download the given blobs that a blobless mirror does not have yet (see _local_objects()),
+    in a single fetch, and add them to local_objects.
+    
+    Reading a missing blob would otherwise make git fetch it on its own, one request per file.
+    """
+    missing = sorted(oids - local_objects)
+    if not missing:
+        return
+    
+    print(f"Downloading {len(missing)} files")
+    # The same request git makes for a lazy fetch, the blobs are named so nothing needs negotiating
+    _run_git(
+        ["fetch", "--no-tags", "--no-write-fetch-head", "--recurse-submodules=no", "--filter=blob:none",
+         "--quiet", "--stdin", "origin"],
+        git_dir=git_dir,
+        github_token=github_token,
+        config={"fetch.negotiationAlgorithm": "noop"},
+        input="\n".join(missing) + "\n"
+    )
+    local_objects.update(missing)
+
+def _read_blobs(git_dir: str, entries: List[Tuple[str, str]]) -> Iterator[Tuple[str, int, Optional[bytes]]]:
+    """
+    Stream the contents of (path, blob ID) entries through one `git cat-file --batch` process.
+    
+    Yields (path, size, content) in entry order; content is None for blobs over MAX_FILE_SIZE.
+    """
+    # Never fetch a blob lazily here, without the token that would fail or prompt
+    env = dict(os.environ, GIT_TERMINAL_PROMPT="0", GIT_NO_LAZY_FETCH="1")
+    process = subprocess.Popen(["git", "--git-dir", git_dir, "cat-file", "--batch"], stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, env=env)
+    
+    def write_requests():
+        # Written from a thread so a full output pipe cannot block the requests
+        try:
+            for _, oid in entries:
+                process.stdin.write(f"{oid}\n".encode())
+            process.stdin.close()
+        except (BrokenPipeError, ValueError):
+            pass  # The reader stopped early
+    
+    writer = threading.Thread(target=write_requests, daemon=True)
+    writer.start()
+    
+    try:
+        for path, oid in entries:
+            header = process.stdout.readline().split()
+            if len(header) != 3:
+                # "<oid> missing"
+                print(f"Warning: Could not read {path}: object {oid} is missing")
+                continue
+            
+            size = int(header[2])
+            if size > MAX_FILE_SIZE:
+                _discard(process.stdout, size + 1)
+                yield path, size, None
+            else:
+                # Content is followed by a newline
+                yield path, size, process.stdout.read(size + 1)[:-1]
+    finally:
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+        writer.join()
+
+def _discard(stream, size: int):
+    """
+    Skip size bytes of a stream without holding them in memory.
+    """
+    while size > 0:
+        chunk = stream.read(min(size, 1024 * 1024))
+        if not chunk:
+            return
+        size -= len(chunk)
+
+@contextmanager
+def _repository_mirror(repo_url: str, branch: str, github_token: Optional[str]):
+    """
+    Update the mirror for a repository and yield it with the SHA of the fetched commit.
+    
+    The mirror stays locked while it is read, so it is not updated or evicted meanwhile.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if MIRROR_CACHE_ENABLED:
+            mirror_dir = _mirror_path(repo_url)
+        else:
+            mirror_dir = os.path.join(temp_dir, "mirror")
+        
+        try:
+            with _mirror_lock(mirror_dir):
+                fetched_branch = _update_mirror(mirror_dir, repo_url, branch, github_token)
+                commit_sha = _run_git(["rev-parse", "--verify", f"refs/heads/{fetched_branch}^{{commit}}"],
+                                      git_dir=mirror_dir).stdout.strip()
+                yield mirror_dir, commit_sha
+        finally:
+            if MIRROR_CACHE_ENABLED and os.path.isdir(mirror_dir):
+                # Record the size and access time for LRU eviction
+                _store_mirror_size(mirror_dir)
+                os.utime(mirror_dir, None)
+                _evict_mirrors(keep=mirror_dir)
+
+def _update_mirror(mirror_dir: str, repo_url: str, branch: str, github_token: Optional[str]) -> str:
+    """
+    Create the bare mirror if needed and fetch the requested branch (or the first alternative that exists).
+    
+    Returns the name of the branch that was fetched.
+    """
+    if not os.path.exists(os.path.join(mirror_dir, "HEAD")):
+        os.makedirs(mirror_dir, exist_ok=True)
+        _run_git(["init", "--bare", "--quiet", mirror_dir])
+        # The remote URL never contains the token; authentication is passed per command
+        _run_git(["remote", "add", "origin", repo_url], git_dir=mirror_dir)
+        print(f"Cloning repository: {repo_url} (branch: {branch})")
+    else:
+        print(f"Updating cached mirror: {repo_url} (branch: {branch})")
+    
+    result = _fetch_branch(mirror_dir, branch, github_token)
+    
+    if result.returncode != 0:
+        # Try alternative branch names if the specified branch fails
+        for alt_branch in ALTERNATIVE_BRANCHES:
+            if alt_branch != branch:
+                print(f"Trying alternative branch: {alt_branch}")
+                alt_result = _fetch_branch(mirror_dir, alt_branch, github_token)
+                if alt_result.returncode == 0:
+                    print(f"Successfully fetched using branch: {alt_branch}")
+                    return alt_branch
+        raise ValueError(f"Failed to clone repository. Error: {result.stderr}")
+    
+    return branch
+
+def _fetch_branch(mirror_dir: str, branch: str, github_token: Optional[str]) -> subprocess.CompletedProcess:
+    """
+    Fetch the head commit and trees of a single branch into the mirror, without file contents.
+    
+    Servers that do not support filters ignore --filter and send the blobs as well.
+    """
+    return _run_git(
+        ["fetch", "--depth", "1", "--filter=blob:none", "--no-tags", "--quiet", "origin",
+         f"+refs/heads/{branch}:refs/heads/{branch}"],
+        git_dir=mirror_dir,
+        github_token=github_token,
+        check=False
+    )
+
+def _run_git(args: List[str], git_dir: Optional[str] = None, github_token: Optional[str] = None,
+             check: bool = True, timeout: int = 300, input: Optional[str] = None,
+             config: Optional[Dict[str, str]] = None, env: Optional[Dict[str, str]] = None) -> subprocess.CompletedProcess:
+    """
+    Run a git command, optionally against a bare repository, with token authentication
+    and with extra configuration and environment variables.
+    """
+    cmd = ["git"]
+    for name, value in (config or {}).items():
+        cmd += ["-c", f"{name}={value}"]
+    if github_token:
+        # Send the token as a basic auth header so it is never written to the mirror config
+        credentials = base64.b64encode(f"x-access-token:{github_token}".encode()).decode()
+        cmd += ["-c", f"http.extraHeader=Authorization: Basic {credentials}"]
+    if git_dir:
+        cmd += ["--git-dir", git_dir]
+    cmd += args
+    
+    env = dict(os.environ, GIT_TERMINAL_PROMPT="0", **(env or {}))
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout, env=env, input=input)
+    
+    if check and result.returncode != 0:
+        raise ValueError(f"git {args[0]} failed: {result.stderr.strip()}")
+    return result
+
+def _mirror_path(repo_url: str) -> str:
+    """
+    Return the cache directory for a repository URL.
+    """
+    normalized_url = repo_url.rstrip('/').lower()
+    if normalized_url.endswith(".git"):
+        normalized_url = normalized_url[:-4]
+    
+    repo_name = normalized_url.split('/')[-1]
+    url_hash = hashlib.sha256(normalized_url.encode()).hexdigest()[:16]
+    return os.path.join(MIRROR_CACHE_DIR, f"{repo_name}-{url_hash}")
+
+@contextmanager
+def _mirror_lock(mirror_dir: str, blocking: bool = True):
+    """
+    Lock a mirror against concurrent use by other threads and processes.
+    
+    Yields False instead of waiting when blocking is disabled and the lock is held.
+    """
+    with _mirror_locks_guard:
+        thread_lock = _mirror_locks.setdefault(mirror_dir, threading.Lock())
+    
+    if not thread_lock.acquire(blocking):
+        yield False
+        return
+    
+    try:
+        if fcntl is None:
+            yield True
+            return
+        
+        os.makedirs(os.path.dirname(mirror_dir), exist_ok=True)
+        while True:
+            with open(mirror_dir + ".lock", "w") as lock_file:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    yield False
+                    return
                 
-                # Skip large files (> 500KB)
+                # Eviction deletes the lock file while holding it, lock the new one instead
                 try:
-                    if file_path.stat().st_size > 500000:
-                        print(f"Skipping large file: {relative_path_str} ({file_path.stat().st_size} bytes)")
-                        continue
-                except:
+                    current = os.stat(mirror_dir + ".lock")
+                except FileNotFoundError:
                     continue
-                
-                # Skip binary files and minified files
-                if any(pattern in relative_path_str.lower() for pattern in ['.min.', '.bundle.', '.chunk.']):
+                if not os.path.samestat(current, os.fstat(lock_file.fileno())):
                     continue
                 
-                # Read file content
                 try:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                        
-                    # Skip empty files or files with only whitespace
-                    if content.strip():
-                        files_data[relative_path_str] = content
-                        
-                except Exception as e:
-                    print(f"Warning: Could not read {relative_path_str}: {str(e)}")
-                    continue
-            
-            if not files_data:
-                raise ValueError("No valid files found in repository")
-            
-            print(f"Successfully fetched {len(files_data)} files")
-            return files_data
-            
-        except subprocess.TimeoutExpired:
-            raise ValueError("Repository clone timed out. Repository may be too large.")
-        except Exception as e:
-            if "does not exist" in str(e).lower():
-                raise ValueError(f"Repository or branch '{branch}' not found")
-            else:
-                raise ValueError(f"Failed to fetch repository: {str(e)}")
+                    yield True
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                return
+    finally:
+        thread_lock.release()
+
+def _evict_mirrors(keep: Optional[str] = None):
+    """
+    Remove least recently used mirrors until the cache fits in HARDGATES_MIRROR_CACHE_MAX_MB.
+    """
+    if not os.path.isdir(MIRROR_CACHE_DIR):
+        return
+    
+    mirrors = []
+    for entry in os.scandir(MIRROR_CACHE_DIR):
+        if entry.is_dir(follow_symlinks=False):
+            mirrors.append((entry.stat().st_mtime, _stored_mirror_size(entry.path), entry.path))
+    
+    total_size = sum(size for _, size, _ in mirrors)
+    
+    # Oldest access first
+    for _, size, path in sorted(mirrors):
+        if total_size <= MIRROR_CACHE_MAX_BYTES:
+            break
+        if path == keep:
+            continue
+        with _mirror_lock(path, blocking=False) as acquired:
+            if not acquired:
+                continue  # In use by another assessment
+            print(f"Evicting cached mirror: {os.path.basename(path)} ({size} bytes)")
+            shutil.rmtree(path, ignore_errors=True)
+            if fcntl is not None:
+                os.remove(path + ".lock")
+            total_size -= size
+
+def _store_mirror_size(mirror_dir: str):
+    """
+    Record the size of a mirror inside it, so eviction does not have to measure every mirror.
+    """
+    result = _run_git(["count-objects", "-v"], git_dir=mirror_dir, check=False)
+    counts = dict(line.split(": ", 1) for line in result.stdout.splitlines() if ": " in line)
+    if result.returncode == 0:
+        # Sizes are reported in KiB
+        size = sum(int(counts.get(name, 0)) for name in ("size", "size-pack", "size-garbage")) * 1024
+    else:
+        size = _directory_size(mirror_dir)
+    
+    try:
+        with open(os.path.join(mirror_dir, MIRROR_SIZE_FILE), "w") as f:
+            f.write(str(size))
+    except OSError as e:
+        print(f"Warning: Could not record the size of {os.path.basename(mirror_dir)}: {str(e)}")
+
+def _stored_mirror_size(mirror_dir: str) -> int:
+    """
+    Return the size recorded by _store_mirror_size(), measuring mirrors that have none.
+    """
+    try:
+        with open(os.path.join(mirror_dir, MIRROR_SIZE_FILE)) as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return _directory_size(mirror_dir)
+
+def _directory_size(path: str) -> int:
+    """
+    Return the total size in bytes of the files under a directory.
+    """
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                continue
+    return total
 
 def check_git_availability():
     """
@@ -177,20 +604,20 @@ if __name__ == "__main__":
     if not check_git_availability():
         print("Error: git is not available on this system")
         exit(1)
-        
+    
     test_repo = "https://github.com/octocat/Hello-World"
     try:
         files = fetch_github_repo(test_repo)
         print(f"Fetched {len(files)} files:")
         for path in list(files.keys())[:10]:  # Show first 10 files
             print(f"  - {path}")
-            
+        
         # Show some content
         if files:
             first_file = list(files.keys())[0]
             content = files[first_file]
             print(f"\nSample content from {first_file}:")
             print(content[:200] + "..." if len(content) > 200 else content)
-            
+    
     except Exception as e:
         print(f"Error: {e}") 
\ No newline at end of file
@@ -0,0 +1,378 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Any, List, Optional, Tuple
+from pathlib import Path
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:
+    Fernet = None  # cryptography not installed, jobs cannot carry a GitHub token
+
+# Queue location; sqlite:///path is the only built-in backend
+JOB_QUEUE_URL = os.getenv("HARDGATES_JOB_QUEUE_URL",
+                          "sqlite:///" + os.path.join(Path.home(), ".cache", "hardgates", "jobs.sqlite3"))
+
+# A claimed job is handed to another worker if its lease is not renewed in time
+JOB_LEASE_SECONDS = float(os.getenv("HARDGATES_JOB_LEASE_SECONDS", "60"))
+
+# Claims per job before it is failed (a worker crashing on it each time, for example)
+JOB_MAX_ATTEMPTS = int(os.getenv("HARDGATES_JOB_MAX_ATTEMPTS", "3"))
+
+# How long a writer waits for another process holding the database lock
+BUSY_TIMEOUT_SECONDS = 10
+
+# Key that encrypts job credentials at rest (a Fernet key, see generate_secret_key()). Workers
+# on other hosts need the same key; api.py generates one for its own workers if it is unset.
+JOB_SECRET_KEY_VARIABLE = "HARDGATES_JOB_SECRET_KEY"
+
+# Payload fields that are only stored encrypted, and only while the job is queued or running
+SECRET_FIELDS = ("github_token",)
+
+JOB_STATUSES = ("queued", "running", "completed", "failed")
+
+class JobQueue(ABC):
+    """
+    Durable queue of assessment jobs shared by the API and the worker processes.
+    
+    Workers claim a job with a lease and must renew it with heartbeat() while they run it;
+    a job whose lease runs out (the worker died) is queued again until it has been claimed
+    max_attempts times. Jobs are dictionaries with id, status, payload, result, error,
+    progress, attempts and created_at, started_at and completed_at timestamps. Credentials
+    in the payload (SECRET_FIELDS) must not be persisted in plain text and are dropped as
+    soon as the job finishes.
+    
+    Subclass this to add a backend (e.g. Redis) and register it in get_job_queue().
+    """
+    
+    @abstractmethod
+    def enqueue(self, payload: Dict[str, Any], job_id: Optional[str] = None) -> str:
+        ...
+    
+    @abstractmethod
+    def enqueue_unique(self, payload: Dict[str, Any], dedup_key: str) -> Tuple[str, bool]:
+        """
+        Enqueue a job unless a queued or running job has the same dedup_key.
+        
+        Returns the job ID and True if a new job was created, or the ID of the in-flight
+        job and False.
+        """
+    
+    @abstractmethod
+    def claim(self, worker_id: str, lease_seconds: float = JOB_LEASE_SECONDS) -> Optional[Dict[str, Any]]:
+        """
+        Claim the oldest queued job, or None if there is none.
+        """
+    
+    @abstractmethod
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float = JOB_LEASE_SECONDS) -> bool:
+        """
+        Extend a job's lease. Returns False if the worker no longer holds it.
+        """
+    
+    @abstractmethod
+    def update_progress(self, job_id: str, worker_id: str, progress: Dict[str, Any]):
+        ...
+    
+    @abstractmethod
+    def complete(self, job_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        ...
+    
+    @abstractmethod
+    def fail(self, job_id: str, worker_id: str, error: str) -> bool:
+        ...
+    
+    @abstractmethod
+    def get(self, job_id: str, include_payload: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Return a job, with its payload (credentials included) only if include_payload is set.
+        """
+    
+    @abstractmethod
+    def delete(self, job_id: str) -> bool:
+        ...
+    
+    @abstractmethod
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        """
+        Return all jobs without payloads or results, oldest first.
+        """
+    
+    @abstractmethod
+    def count(self, statuses: List[str]) -> int:
+        ...
+
+class SQLiteJobQueue(JobQueue):
+    """
+    Job queue in a SQLite database, safe for concurrent use by several processes.
+    
+    Claims run in an immediate transaction so two workers never get the same job.
+    """
+    
+    def __init__(self, path: str, max_attempts: int = JOB_MAX_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        
+        connection = self._connection()
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, status TEXT NOT NULL, payload TEXT NOT NULL, "
+            "result TEXT, error TEXT, progress TEXT, attempts INTEGER NOT NULL DEFAULT 0, "
+            "worker TEXT, lease_expires REAL, created_at REAL NOT NULL, started_at REAL, completed_at REAL, "
+            "dedup_key TEXT, secrets TEXT)"
+        )
+        # Queues created before deduplication and encrypted credentials were added
+        columns = [row["name"] for row in connection.execute("PRAGMA table_info(jobs)")]
+        if "dedup_key" not in columns:
+            connection.execute("ALTER TABLE jobs ADD COLUMN dedup_key TEXT")
+        if "secrets" not in columns:
+            connection.execute("ALTER TABLE jobs ADD COLUMN secrets TEXT")
+        self._encrypt_legacy_payloads(connection)
+        connection.execute("CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at)")
+        connection.execute("CREATE INDEX IF NOT EXISTS jobs_dedup_key ON jobs (dedup_key, status)")
+    
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Return this thread's connection, opening a new one in each thread and after fork().
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is not None and self._local.pid == os.getpid():
+            return connection
+        
+        # Autocommit mode, transactions are opened explicitly where reads and writes must be atomic
+        connection = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        
+        self._local.connection = connection
+        self._local.pid = os.getpid()
+        return connection
+    
+    def enqueue(self, payload: Dict[str, Any], job_id: Optional[str] = None) -> str:
+        job_id = job_id or str(uuid.uuid4())
+        self._insert(self._connection(), job_id, payload, None)
+        return job_id
+    
+    def enqueue_unique(self, payload: Dict[str, Any], dedup_key: str) -> Tuple[str, bool]:
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            # A running job whose lease expired still counts, it is about to be claimed again
+            row = connection.execute(
+                "SELECT id FROM jobs WHERE dedup_key = ? AND status IN ('queued', 'running') "
+                "ORDER BY created_at LIMIT 1",
+                (dedup_key,)
+            ).fetchone()
+            if row is not None:
+                connection.execute("COMMIT")
+                return row["id"], False
+            
+            job_id = str(uuid.uuid4())
+            self._insert(connection, job_id, payload, dedup_key)
+            connection.execute("COMMIT")
+            return job_id, True
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+    
+    def _insert(self, connection: sqlite3.Connection, job_id: str, payload: Dict[str, Any], dedup_key: Optional[str]):
+        payload, secrets = _split_secrets(payload)
+        connection.execute(
+            "INSERT INTO jobs (id, status, payload, secrets, created_at, dedup_key) VALUES (?, 'queued', ?, ?, ?, ?)",
+            (job_id, json.dumps(payload), _encrypt_secrets(secrets), time.time(), dedup_key)
+        )
+    
+    def _encrypt_legacy_payloads(self, connection: sqlite3.Connection):
+        """
+        Move tokens stored in plain text by older versions out of the payload column.
+        """
+        rows = connection.execute(
+            "SELECT id, status, payload FROM jobs WHERE json_extract(payload, '$.github_token') IS NOT NULL"
+        ).fetchall()
+        for row in rows:
+            payload, secrets = _split_secrets(json.loads(row["payload"]))
+            encrypted = None
+            if row["status"] in ("queued", "running"):
+                try:
+                    encrypted = _encrypt_secrets(secrets)
+                except RuntimeError as e:
+                    print(f"Warning: Dropping the GitHub token of job {row['id']}: {str(e)}")
+            connection.execute(
+                "UPDATE jobs SET payload = ?, secrets = ? WHERE id = ?",
+                (json.dumps(payload), encrypted, row["id"])
+            )
+    
+    def claim(self, worker_id: str, lease_seconds: float = JOB_LEASE_SECONDS) -> Optional[Dict[str, Any]]:
+        connection = self._connection()
+        now = time.time()
+        
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            # Jobs whose worker stopped renewing the lease are retried or, out of attempts, failed
+            connection.execute(
+                "UPDATE jobs SET status = 'failed', error = 'Worker lease expired too many times', "
+                "completed_at = ?, worker = NULL, lease_expires = NULL, secrets = NULL "
+                "WHERE status = 'running' AND lease_expires < ? AND attempts >= ?",
+                (now, now, self.max_attempts)
+            )
+            row = connection.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' OR (status = 'running' AND lease_expires < ?) "
+                "ORDER BY created_at LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is None:
+                connection.execute("COMMIT")
+                return None
+            
+            connection.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, lease_expires = ?, attempts = attempts + 1, "
+                "started_at = COALESCE(started_at, ?) WHERE id = ?",
+                (worker_id, now + lease_seconds, now, row["id"])
+            )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        
+        try:
+            return self.get(row["id"], include_payload=True)
+        except ValueError as e:
+            # Credentials encrypted with another key, no worker with this key can run the job
+            print(f"Warning: Failing job {row['id']}: {str(e)}")
+            self.fail(row["id"], worker_id, str(e))
+            return None
+    
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float = JOB_LEASE_SECONDS) -> bool:
+        cursor = self._connection().execute(
+            "UPDATE jobs SET lease_expires = ? WHERE id = ? AND worker = ? AND status = 'running'",
+            (time.time() + lease_seconds, job_id, worker_id)
+        )
+        return cursor.rowcount == 1
+    
+    def update_progress(self, job_id: str, worker_id: str, progress: Dict[str, Any]):
+        self._connection().execute(
+            "UPDATE jobs SET progress = ? WHERE id = ? AND worker = ? AND status = 'running'",
+            (json.dumps(progress), job_id, worker_id)
+        )
+    
+    def complete(self, job_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        return self._finish(job_id, worker_id, "completed", json.dumps(result), None)
+    
+    def fail(self, job_id: str, worker_id: str, error: str) -> bool:
+        return self._finish(job_id, worker_id, "failed", None, error)
+    
+    def _finish(self, job_id: str, worker_id: str, status: str, result: Optional[str], error: Optional[str]) -> bool:
+        """
+        Record the outcome if the worker still holds the job, dropping its credentials.
+        """
+        cursor = self._connection().execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, secrets = NULL, completed_at = ?, "
+            "worker = NULL, lease_expires = NULL WHERE id = ? AND worker = ? AND status = 'running'",
+            (status, result, error, time.time(), job_id, worker_id)
+        )
+        return cursor.rowcount == 1
+    
+    def get(self, job_id: str, include_payload: bool = False) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        
+        job = self._row_to_job(row)
+        if include_payload:
+            job["payload"] = {**json.loads(row["payload"]), **_decrypt_secrets(row["secrets"])}
+        return job
+    
+    def delete(self, job_id: str) -> bool:
+        cursor = self._connection().execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        return cursor.rowcount == 1
+    
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        rows = self._connection().execute(
+            "SELECT id, status, attempts, created_at, started_at, completed_at FROM jobs ORDER BY created_at"
+        ).fetchall()
+        return [{key: row[key] for key in row.keys()} for row in rows]
+    
+    def count(self, statuses: List[str]) -> int:
+        placeholders = ", ".join("?" for _ in statuses)
+        return self._connection().execute(
+            f"SELECT COUNT(*) FROM jobs WHERE status IN ({placeholders})", list(statuses)
+        ).fetchone()[0]
+    
+    def _row_to_job(self, row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "id": row["id"],
+            "status": row["status"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "progress": json.loads(row["progress"]) if row["progress"] else None,
+            "attempts": row["attempts"],
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "completed_at": row["completed_at"]
+        }
+
+def generate_secret_key() -> str:
+    """
+    Return a new key for HARDGATES_JOB_SECRET_KEY.
+    """
+    if Fernet is None:
+        raise RuntimeError("Encrypting job credentials requires the cryptography package")
+    return Fernet.generate_key().decode("ascii")
+
+def _cipher() -> "Fernet":
+    # Read on each use, api.py may set the key after this module is imported
+    key = os.getenv(JOB_SECRET_KEY_VARIABLE)
+    if Fernet is None:
+        raise RuntimeError("Queuing a job with a GitHub token requires the cryptography package")
+    if not key:
+        raise RuntimeError(f"Queuing a job with a GitHub token requires {JOB_SECRET_KEY_VARIABLE}")
+    return Fernet(key.encode("ascii"))
+
+def _split_secrets(payload: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Separate the credentials from a payload, leaving out empty ones.
+    """
+    payload = dict(payload)
+    secrets = {field: payload.pop(field) for field in SECRET_FIELDS if field in payload}
+    return payload, {field: value for field, value in secrets.items() if value}
+
+def _encrypt_secrets(secrets: Dict[str, Any]) -> Optional[str]:
+    if not secrets:
+        return None
+    return _cipher().encrypt(json.dumps(secrets).encode("utf-8")).decode("ascii")
+
+def _decrypt_secrets(token: Optional[str]) -> Dict[str, Any]:
+    if not token:
+        return {}
+    try:
+        return json.loads(_cipher().decrypt(token.encode("ascii")))
+    except RuntimeError as e:
+        raise ValueError(f"Could not decrypt the job's credentials: {str(e)}") from e
+    except InvalidToken as e:
+        raise ValueError(f"Could not decrypt the job's credentials, {JOB_SECRET_KEY_VARIABLE} does not match "
+                         "the key they were queued with") from e
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+def get_job_queue(url: Optional[str] = None) -> JobQueue:
+    """
+    Return the job queue for a URL (HARDGATES_JOB_QUEUE_URL by default), shared per process.
+    """
+    url = url or JOB_QUEUE_URL
+    with _queues_lock:
+        queue = _queues.get(url)
+        if queue is None:
+            if url.startswith("sqlite:///"):
+                queue = SQLiteJobQueue(os.path.expanduser(url[len("sqlite:///"):]))
+            else:
+                raise ValueError(f"Unsupported job queue URL: {url}")
+            _queues[url] = queue
+    return queue
@@ -0,0 +1,287 @@
+import re
+import json
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Characters that change the scanner state; everything else is skipped in bulk
+_SCAN_TOKENS = re.compile(r'[{}"\'\\]')
+
+_LITERALS = {"true": "true", "false": "false", "null": "null", "True": "true", "False": "false", "None": "null"}
+
+def iter_json_objects(text: str) -> Iterator[str]:
+    """
+    Yield every top-level {...} object in a text in a single pass.
+    
+    Braces inside strings are ignored. An object left open at the end of the text
+    (a truncated reply) is yielded as is, for repair_json() to close.
+    """
+    depth = 0
+    start = None
+    quote = None
+    escaped_position = -1
+    
+    for match in _SCAN_TOKENS.finditer(text):
+        char = match.group()
+        position = match.start()
+        
+        if quote:
+            if position == escaped_position:
+                continue
+            if char == "\\":
+                escaped_position = position + 1
+            elif char == quote:
+                quote = None
+            continue
+        
+        if char in "\"'":
+            # Quotes only start strings inside an object, prose may contain apostrophes
+            if depth:
+                quote = char
+        elif char == "{":
+            if depth == 0:
+                start = position
+            depth += 1
+        elif char == "}" and depth:
+            depth -= 1
+            if depth == 0:
+                yield text[start:position + 1]
+    
+    if depth:
+        yield text[start:]
+
+def repair_json(text: str) -> str:
+    """
+    Repair common LLM JSON mistakes in a single pass.
+    
+    Handles trailing commas, single-quoted strings, unquoted keys, Python literals,
+    // comments and truncation (unterminated strings and unclosed containers).
+    """
+    output = []
+    closers = []
+    i = 0
+    length = len(text)
+    
+    while i < length:
+        char = text[i]
+        
+        if char in "\"'":
+            # Copy a string, converting single quotes to double quotes
+            quote = char
+            i += 1
+            chars = ['"']
+            while i < length and text[i] != quote:
+                if text[i] == "\\" and i + 1 < length:
+                    # \' is not a valid JSON escape
+                    chars.append("'" if text[i + 1] == "'" else text[i:i + 2])
+                    i += 2
+                    continue
+                chars.append('\\"' if text[i] == '"' else text[i])
+                i += 1
+            chars.append('"')
+            output.append("".join(chars))
+            i += 1
+            continue
+        
+        if char == "/" and text.startswith("//", i):
+            newline = text.find("\n", i)
+            i = length if newline == -1 else newline
+            continue
+        
+        if char in "{[":
+            closers.append("}" if char == "{" else "]")
+        elif char in "}]":
+            _strip_trailing_comma(output)
+            if closers:
+                closers.pop()
+        elif char.isalpha() or char == "_":
+            end = i
+            while end < length and (text[end].isalnum() or text[end] in "_-$"):
+                end += 1
+            word = text[i:end]
+            rest = end
+            while rest < length and text[rest] in " \t\r\n":
+                rest += 1
+            if word in _LITERALS:
+                output.append(_LITERALS[word])
+            elif rest < length and text[rest] == ":":
+                # Unquoted object key
+                output.append(f'"{word}"')
+            else:
+                output.append(word)
+            i = end
+            continue
+        
+        output.append(char)
+        i += 1
+    
+    # Close whatever a truncated reply left open
+    _strip_trailing_comma(output)
+    if output and output[-1].rstrip().endswith(":"):
+        output.append(" null")
+    output.extend(reversed(closers))
+    return "".join(output)
+
+def _strip_trailing_comma(output: List[str]):
+    """
+    Remove a comma (and the whitespace after it) at the end of the output.
+    """
+    while output and not output[-1].strip():
+        output.pop()
+    if output and output[-1].rstrip().endswith(","):
+        output[-1] = output[-1].rstrip()[:-1]
+
+def loads_tolerant(text: str) -> Optional[Any]:
+    """
+    Parse JSON, repairing it if strict parsing fails. Returns None if it cannot be parsed.
+    """
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+    try:
+        return json.loads(repair_json(text))
+    except json.JSONDecodeError:
+        return None
+
+class GateStreamParser:
+    """
+    Incremental JSON scanner that emits primary_hard_gates entries as soon as they close.
+    
+    Text is fed in arbitrary pieces as it streams from the LLM. The scanner tracks strings,
+    object keys and nesting in one pass over each new character, so feeding a whole reply
+    costs the same as parsing it once. Prose or code fences before the JSON are skipped.
+    """
+    
+    def __init__(self, expected_gates: Optional[Iterable[str]] = None,
+                 on_gate: Optional[Callable[[str, Dict[str, Any]], None]] = None):
+        self.expected_gates = set(expected_gates or [])
+        self.on_gate = on_gate
+        self.gates = {}
+        
+        self.buffer = []
+        self.position = 0
+        self.document_start = None
+        self.document_end = None
+        
+        # One entry per open container: [kind, key in parent, expecting key, start offset]
+        self.stack = []
+        self.in_string = False
+        self.escaped = False
+        self.key_chars = None
+        self.pending_key = None
+        
+        # End offset and open container kinds after the last closed container,
+        # used to rebuild a valid document when the stream stops early
+        self.safe_end = None
+        self.safe_kinds = []
+    
+    @property
+    def complete(self) -> bool:
+        """
+        True once every expected gate has been emitted, or the JSON document has closed.
+        """
+        if self.document_end is not None:
+            return True
+        return bool(self.expected_gates) and self.expected_gates.issubset(self.gates)
+    
+    def feed(self, text: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Scan a piece of the reply and return the gates that closed in it.
+        """
+        self.buffer.append(text)
+        emitted = []
+        
+        for char in text:
+            position = self.position
+            self.position += 1
+            
+            if self.document_end is not None:
+                continue
+            
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+                    if self.key_chars is not None:
+                        self.pending_key = "".join(self.key_chars)
+                        self.key_chars = None
+                    continue
+                if self.key_chars is not None:
+                    self.key_chars.append(char)
+                continue
+            
+            if self.document_start is None:
+                if char == "{":
+                    self.document_start = position
+                    self.stack.append(["object", None, True, position])
+                continue
+            
+            if char == '"':
+                self.in_string = True
+                # Only object keys are collected
+                if self.stack[-1][0] == "object" and self.stack[-1][2]:
+                    self.key_chars = []
+            elif char in "{[":
+                key = self.pending_key if self.stack[-1][0] == "object" else None
+                self.stack.append(["object" if char == "{" else "array", key, char == "{", position])
+                self.pending_key = None
+            elif char in "}]":
+                kind, key, _, start = self.stack.pop()
+                if not self.stack:
+                    self.document_end = position + 1
+                    continue
+                self.safe_end = position + 1
+                self.safe_kinds = [entry[0] for entry in self.stack]
+                if char == "}" and self._is_gate_entry(key):
+                    gate = self._load(start, position + 1)
+                    if gate is not None:
+                        self.gates[key] = gate
+                        emitted.append((key, gate))
+                        if self.on_gate:
+                            self.on_gate(key, gate)
+            elif char == ":":
+                if self.stack[-1][0] == "object":
+                    self.stack[-1][2] = False
+            elif char == ",":
+                if self.stack[-1][0] == "object":
+                    self.stack[-1][2] = True
+                    self.pending_key = None
+        
+        return emitted
+    
+    def result(self) -> Optional[Dict[str, Any]]:
+        """
+        Return the parsed document, closing any containers left open by an early stop.
+        
+        Returns None if no JSON object was found or it cannot be parsed.
+        """
+        if self.document_start is None:
+            return None
+        
+        if self.document_end is not None:
+            text = self._slice(self.document_start, self.document_end)
+        elif self.safe_end is not None:
+            # Cut after the last closed container and close the ones still open
+            text = self._slice(self.document_start, self.safe_end)
+            text += "".join("}" if kind == "object" else "]" for kind in reversed(self.safe_kinds))
+        else:
+            return None
+        
+        document = loads_tolerant(text)
+        return document if isinstance(document, dict) else None
+    
+    def _is_gate_entry(self, key: Optional[str]) -> bool:
+        # A gate is an object directly inside the top-level primary_hard_gates object
+        return (key is not None and len(self.stack) == 2
+                and self.stack[-1][0] == "object" and self.stack[-1][1] == "primary_hard_gates")
+    
+    def _slice(self, start: int, end: int) -> str:
+        if len(self.buffer) > 1:
+            self.buffer = ["".join(self.buffer)]
+        return self.buffer[0][start:end]
+    
+    def _load(self, start: int, end: int) -> Optional[Dict[str, Any]]:
+        gate = loads_tolerant(self._slice(start, end))
+        return gate if isinstance(gate, dict) else None
@@ -0,0 +1,82 @@
+import re
+import bisect
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+class KeywordMatcher:
+    """
+    Find every occurrence of a set of literal keywords in a single pass over a text.
+    
+    Keywords are organised in named groups (a keyword may belong to several groups).
+    All keywords are compiled into one case-insensitive regex wrapped in a lookahead,
+    so the scan reports a match at every position, including overlapping keywords.
+    """
+    
+    def __init__(self, groups: Dict[str, Iterable[str]]):
+        self.groups_by_keyword = {}
+        for group, keywords in groups.items():
+            for keyword in keywords:
+                self.groups_by_keyword.setdefault(keyword.lower(), set()).add(group)
+        
+        if not self.groups_by_keyword:
+            raise ValueError("KeywordMatcher needs at least one keyword")
+        
+        # Longest keywords first so the regex reports the longest keyword at each position
+        keywords = sorted(self.groups_by_keyword, key=len, reverse=True)
+        self._pattern = re.compile("(?=(" + "|".join(re.escape(k) for k in keywords) + "))", re.IGNORECASE)
+        
+        # Any shorter keyword starting at the same position is a prefix of the longest one
+        self._prefixes = {k: [p for p in keywords if k.startswith(p)] for k in keywords}
+    
+    def finditer(self, text: str) -> Iterator[Tuple[int, str]]:
+        """
+        Yield (position, keyword) for every keyword occurrence in the text.
+        """
+        for match in self._pattern.finditer(text):
+            position = match.start()
+            for keyword in self._prefixes[match.group(1).lower()]:
+                yield position, keyword
+    
+    def find_all(self, text: str) -> Dict[str, List[int]]:
+        """
+        Return the positions of every keyword found in the text.
+        """
+        hits = {}
+        for position, keyword in self.finditer(text):
+            hits.setdefault(keyword, []).append(position)
+        return hits
+    
+    def match_groups(self, text: str) -> Dict[str, List[Tuple[int, str]]]:
+        """
+        Return (position, keyword) hits for every group with at least one match.
+        """
+        hits = {}
+        for position, keyword in self.finditer(text):
+            for group in self.groups_by_keyword[keyword]:
+                hits.setdefault(group, []).append((position, keyword))
+        return hits
+    
+    def groups_present(self, text: str) -> Set[str]:
+        """
+        Return the names of the groups with at least one keyword in the text.
+        """
+        found = set()
+        for _, keyword in self.finditer(text):
+            found |= self.groups_by_keyword[keyword]
+        return found
+
+def line_starts(text: str) -> List[int]:
+    """
+    Return the offsets at which each line of the text starts.
+    """
+    starts = [0]
+    position = text.find("\n")
+    while position != -1:
+        starts.append(position + 1)
+        position = text.find("\n", position + 1)
+    return starts
+
+def line_number(starts: List[int], position: int) -> int:
+    """
+    Convert a text offset into a 1-based line number using line_starts() output.
+    """
+    return bisect.bisect_right(starts, position)
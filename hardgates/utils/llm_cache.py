@@ -0,0 +1,171 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, Any, Optional
+from pathlib import Path
+
+# LLM response cache configuration (set HARDGATES_LLM_CACHE=0 to always call the provider)
+LLM_CACHE_ENABLED = os.getenv("HARDGATES_LLM_CACHE", "1").lower() not in ("0", "false", "no")
+LLM_CACHE_PATH = os.getenv("HARDGATES_LLM_CACHE_PATH", os.path.join(Path.home(), ".cache", "hardgates", "llm_cache.sqlite3"))
+LLM_CACHE_TTL = float(os.getenv("HARDGATES_LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_BYTES = int(float(os.getenv("HARDGATES_LLM_CACHE_MAX_MB", "256")) * 1024 * 1024)
+
+# Bump when the stored response format changes
+LLM_CACHE_VERSION = "2"
+
+# How long a writer waits for another process holding the database lock
+BUSY_TIMEOUT_SECONDS = 10
+
+_local = threading.local()
+_schema_lock = threading.Lock()
+_schema_ready = set()
+
+def llm_cache_key(model_name: str, prompt: str, system_prompt: Optional[str] = None,
+                  response_schema: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Build the content address of an LLM request.
+    
+    Args:
+        model_name: Provider and model, as returned by get_llm_model_name()
+        prompt: The user prompt
+        system_prompt: The system prompt, if any
+        response_schema: The structured output schema, if any
+    
+    Returns:
+        Hex digest identifying the request
+    """
+    key_data = json.dumps([LLM_CACHE_VERSION, model_name, system_prompt, prompt, response_schema], sort_keys=True)
+    return hashlib.sha256(key_data.encode()).hexdigest()
+
+def load_cached_response(cache_key: str) -> Optional[Dict[str, Any]]:
+    """
+    Load a stored LLM response, or None if there is no fresh entry for the key.
+    
+    A hit refreshes the entry's last access time for LRU eviction.
+    """
+    if not LLM_CACHE_ENABLED:
+        return None
+    
+    try:
+        connection = _connection()
+        now = time.time()
+        with connection:
+            row = connection.execute("SELECT value, created FROM responses WHERE key = ?", (cache_key,)).fetchone()
+            if row is None or now - row[1] > LLM_CACHE_TTL:
+                if row is not None:
+                    connection.execute("DELETE FROM responses WHERE key = ?", (cache_key,))
+                _count(connection, "misses")
+                return None
+            
+            connection.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, cache_key))
+            _count(connection, "hits")
+        return json.loads(row[0])
+    except Exception as e:
+        print(f"Warning: Could not read cached LLM response {cache_key[:12]}: {str(e)}")
+        return None
+
+def store_cached_response(cache_key: str, response: Dict[str, Any]):
+    """
+    Store an LLM response under its key, then drop expired entries and evict the least
+    recently used ones while the cache is over its size limit.
+    """
+    if not LLM_CACHE_ENABLED:
+        return
+    
+    try:
+        value = json.dumps(response)
+        connection = _connection()
+        now = time.time()
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (cache_key, value, len(value), now, now)
+            )
+            connection.execute("DELETE FROM responses WHERE created < ?", (now - LLM_CACHE_TTL,))
+            _evict(connection)
+    except Exception as e:
+        print(f"Warning: Could not store cached LLM response {cache_key[:12]}: {str(e)}")
+
+def get_llm_cache_stats() -> Dict[str, Any]:
+    """
+    Return hit and miss counts (shared by every process using the cache) and the cache size.
+    """
+    stats = {"enabled": LLM_CACHE_ENABLED, "hits": 0, "misses": 0, "entries": 0, "size_bytes": 0}
+    if not LLM_CACHE_ENABLED:
+        return stats
+    
+    try:
+        connection = _connection()
+        for name, count in connection.execute("SELECT name, count FROM counters"):
+            stats[name] = count
+        entries, size = connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        stats["entries"] = entries
+        stats["size_bytes"] = size
+    except Exception as e:
+        print(f"Warning: Could not read LLM cache statistics: {str(e)}")
+    return stats
+
+def _connection() -> sqlite3.Connection:
+    """
+    Return this thread's connection to the cache database, opening it on first use.
+    
+    SQLite connections cannot be shared between threads or across fork(), so each
+    thread of each process opens its own. WAL mode lets readers run while another
+    process writes.
+    """
+    connection = getattr(_local, "connection", None)
+    if connection is not None and _local.pid == os.getpid():
+        return connection
+    
+    os.makedirs(os.path.dirname(LLM_CACHE_PATH), exist_ok=True)
+    connection = sqlite3.connect(LLM_CACHE_PATH, timeout=BUSY_TIMEOUT_SECONDS)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    _ensure_schema(connection)
+    
+    _local.connection = connection
+    _local.pid = os.getpid()
+    return connection
+
+def _ensure_schema(connection: sqlite3.Connection):
+    """
+    Create the cache tables once per process.
+    """
+    with _schema_lock:
+        if LLM_CACHE_PATH in _schema_ready:
+            return
+        with connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+            connection.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, count INTEGER NOT NULL)")
+        _schema_ready.add(LLM_CACHE_PATH)
+
+def _count(connection: sqlite3.Connection, name: str):
+    connection.execute(
+        "INSERT INTO counters (name, count) VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET count = count + 1",
+        (name,)
+    )
+
+def _evict(connection: sqlite3.Connection):
+    """
+    Delete the least recently used entries until the cache fits its size limit.
+    """
+    total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+    if total <= LLM_CACHE_MAX_BYTES:
+        return
+    
+    evicted = []
+    for key, size in connection.execute("SELECT key, size FROM responses ORDER BY accessed"):
+        if total <= LLM_CACHE_MAX_BYTES:
+            break
+        evicted.append((key,))
+        total -= size
+    connection.executemany("DELETE FROM responses WHERE key = ?", evicted)
+    print(f"Evicted {len(evicted)} LLM responses from the cache")
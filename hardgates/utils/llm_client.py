@@ -1,9 +1,84 @@
 import os
-import json
 import re
-from typing import Dict, Any, List
+import json
+import time
+import asyncio
+import inspect
+import threading
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, List, Optional, Callable, Iterator, AsyncIterator
+from utils.keyword_matcher import KeywordMatcher
+from utils.json_stream import GateStreamParser, iter_json_objects, repair_json, loads_tolerant
+from utils.context_builder import estimate_tokens
+from utils.rate_limiter import get_rate_limiter
+from utils.llm_cache import llm_cache_key, load_cached_response, store_cached_response
+
+ANTHROPIC_MODEL = "claude-3-sonnet-20240229"
+GOOGLE_MODEL = "gemini-pro"
+
+# Connection pool and timeout settings for the pooled SDK clients
+LLM_MAX_CONNECTIONS = int(os.getenv("HARDGATES_LLM_MAX_CONNECTIONS", "20"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HARDGATES_LLM_KEEPALIVE_CONNECTIONS", "10"))
+LLM_TIMEOUT = float(os.getenv("HARDGATES_LLM_TIMEOUT", "300"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("HARDGATES_LLM_CONNECT_TIMEOUT", "10"))
+
+# Stream responses when the caller wants gates as they arrive (set to 0 for servers without streaming)
+LLM_STREAMING = os.getenv("HARDGATES_LLM_STREAMING", "1").lower() not in ("0", "false", "no")
+
+# Ask providers for schema-constrained JSON when the caller passes a response schema
+# (set to 0 to rely on prompt instructions and JSON parsing only)
+LLM_STRUCTURED_OUTPUT = os.getenv("HARDGATES_LLM_STRUCTURED_OUTPUT", "1").lower() not in ("0", "false", "no")
+STRUCTURED_OUTPUT_NAME = "hard_gate_assessment"
+
+# Model names whose servers rejected a response schema; they fall back to JSON parsing
+_structured_output_unsupported = set()
+
+# A 400/422 only counts as a schema rejection when the error names one of the structured
+# output parameters; anything else (context length, malformed request) is a real error
+SCHEMA_REJECTION_PATTERN = re.compile(r'response_format|json_schema|\btool_choice\b|\btools\b|response_schema')
 
-def call_llm(prompt: str) -> Dict[str, Any]:
+# Expected completion size, counted against tokens-per-minute limits before the call
+ESTIMATED_OUTPUT_TOKENS = 2000
+
+# Unparseable JSON from the LLM is kept in a bounded in-memory sink, and written to
+# HARDGATES_LLM_DEBUG_DIR (newest files only) when that is set
+LLM_DEBUG_DIR = os.getenv("HARDGATES_LLM_DEBUG_DIR")
+LLM_DEBUG_MAX_ENTRIES = int(os.getenv("HARDGATES_LLM_DEBUG_MAX_ENTRIES", "20"))
+_parse_failures = deque(maxlen=LLM_DEBUG_MAX_ENTRIES)
+_parse_failures_lock = threading.Lock()
+
+# Process-wide prompt cache usage reported by the providers (see get_prompt_cache_stats)
+_prompt_cache_stats = {"requests": 0, "input_tokens": 0, "cached_tokens": 0, "cache_write_tokens": 0}
+_prompt_cache_stats_lock = threading.Lock()
+
+# HTTP statuses worth retrying; other 4xx errors (bad request, auth, not found) will fail again
+RETRYABLE_STATUS_CODES = (408, 409, 429)
+
+# Lazily created SDK clients keyed by (provider, base_url, api_key).
+# Async clients are bound to the event loop that first uses them (the API server's loop).
+_clients = {}
+_clients_lock = threading.Lock()
+
+class LLMError(ValueError):
+    """
+    LLM provider error with hints for the node retry policy.
+    
+    retryable is False for errors that cannot succeed on retry (bad request, authentication,
+    missing SDK or API key); retry_after is the provider's requested wait in seconds, if any.
+    """
+    
+    def __init__(self, message: str, retryable: bool = True, retry_after: Optional[float] = None,
+                 status_code: Optional[int] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+        self.status_code = status_code
+
+def call_llm(prompt: str, on_gate: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+             expected_gates: Optional[List[str]] = None,
+             response_schema: Optional[Dict[str, Any]] = None,
+             system_prompt: Optional[str] = None, use_cache: bool = True) -> Dict[str, Any]:
     """
     Call LLM for code analysis.
     
@@ -16,101 +91,789 @@ def call_llm(prompt: str) -> Dict[str, Any]:
     - Optionally set OPENAI_MODEL to specify the model name
     
     Args:
-        prompt: The analysis prompt to send to the LLM
-        
+        prompt: The analysis prompt to send to the LLM (the variable part, e.g. code samples)
+        on_gate: Optional callback receiving (gate_key, verdict) for each primary_hard_gates
+            entry as soon as it arrives; the response is streamed when this is set
+        expected_gates: Gate keys the prompt asks for; streaming stops once all have arrived
+        response_schema: Optional JSON schema of the response, enforced with the provider's
+            structured output (OpenAI response_format, Anthropic tool use, Gemini response_schema)
+            where supported; other servers fall back to parsing JSON from the reply text
+        system_prompt: Optional instructions that are identical across calls; sent ahead of the
+            prompt so providers can cache the shared prefix (see get_prompt_cache_stats)
+        use_cache: Return a stored response for an identical request if there is one;
+            when False the provider is always called (the response is still stored)
+    
     Returns:
-        Dictionary containing the LLM response parsed as JSON
+        Dictionary containing the LLM response parsed as JSON. If the reply could not be
+        parsed, the verdicts are guessed and the result is marked (see is_fallback_result)
     """
     
     # Determine which LLM provider to use based on environment variables
     if os.getenv("OPENAI_API_KEY"):
-        return _call_openai(prompt)
+        provider_call, provider_stream = _call_openai, _stream_openai
     elif os.getenv("ANTHROPIC_API_KEY"):
-        return _call_anthropic(prompt)
+        provider_call, provider_stream = _call_anthropic, _stream_anthropic
     elif os.getenv("GOOGLE_API_KEY"):
-        return _call_google(prompt)
+        provider_call, provider_stream = _call_google, _stream_google
     else:
-        raise ValueError("No LLM API key found. Set OPENAI_API_KEY, ANTHROPIC_API_KEY, or GOOGLE_API_KEY environment variable.")
+        raise LLMError("No LLM API key found. Set OPENAI_API_KEY, ANTHROPIC_API_KEY, or GOOGLE_API_KEY environment variable.", retryable=False)
+    
+    # Identical requests (same model, prompts and schema) reuse the stored response
+    model_name = get_llm_model_name()
+    cache_key = llm_cache_key(model_name, prompt, system_prompt, response_schema)
+    result = load_cached_response(cache_key) if use_cache else None
+    if result is not None:
+        print(f"Using cached LLM response {cache_key[:12]}")
+    
+    streamed = False
+    if result is None:
+        # Share the provider's rate limits with every other caller in the process
+        with get_rate_limiter(model_name).limit(_estimate_request_tokens(prompt, system_prompt)):
+            streamed = bool(on_gate and LLM_STREAMING)
+            if streamed:
+                result = _collect_stream(provider_stream(prompt, response_schema, system_prompt), on_gate, expected_gates)
+            else:
+                result = provider_call(prompt, response_schema, system_prompt)
+        if _is_cacheable(result):
+            store_cached_response(cache_key, result)
+    
+    if on_gate and not streamed:
+        for gate_key, verdict in result.get("primary_hard_gates", {}).items():
+            on_gate(gate_key, verdict)
+    return result
 
-def _call_openai(prompt: str) -> Dict[str, Any]:
-    """Call OpenAI API or OpenAI-compatible local LLM"""
+async def acall_llm(prompt: str, on_gate: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                    expected_gates: Optional[List[str]] = None,
+                    response_schema: Optional[Dict[str, Any]] = None,
+                    system_prompt: Optional[str] = None, use_cache: bool = True) -> Dict[str, Any]:
+    """
+    Async version of call_llm using the providers' async SDKs.
+    
+    Uses the same provider selection as call_llm and the same process-wide
+    concurrency and rate limits, so blocking and async callers share one budget.
+    
+    Args:
+        prompt: The analysis prompt to send to the LLM (the variable part, e.g. code samples)
+        on_gate: Optional callback receiving (gate_key, verdict) for each gate as it arrives
+        expected_gates: Gate keys the prompt asks for; streaming stops once all have arrived
+        response_schema: Optional JSON schema of the response, enforced with the provider's
+            structured output (OpenAI response_format, Anthropic tool use, Gemini response_schema)
+            where supported; other servers fall back to parsing JSON from the reply text
+        system_prompt: Optional instructions that are identical across calls; sent ahead of the
+            prompt so providers can cache the shared prefix (see get_prompt_cache_stats)
+        use_cache: Return a stored response for an identical request if there is one;
+            when False the provider is always called (the response is still stored)
+    
+    Returns:
+        Dictionary containing the LLM response parsed as JSON. If the reply could not be
+        parsed, the verdicts are guessed and the result is marked (see is_fallback_result)
+    """
+    if os.getenv("OPENAI_API_KEY"):
+        provider_call, provider_stream = _acall_openai, _astream_openai
+    elif os.getenv("ANTHROPIC_API_KEY"):
+        provider_call, provider_stream = _acall_anthropic, _astream_anthropic
+    elif os.getenv("GOOGLE_API_KEY"):
+        provider_call, provider_stream = _acall_google, _astream_google
+    else:
+        raise LLMError("No LLM API key found. Set OPENAI_API_KEY, ANTHROPIC_API_KEY, or GOOGLE_API_KEY environment variable.", retryable=False)
+    
+    # The cache is SQLite, keep its I/O off the event loop
+    model_name = get_llm_model_name()
+    cache_key = llm_cache_key(model_name, prompt, system_prompt, response_schema)
+    result = await asyncio.to_thread(load_cached_response, cache_key) if use_cache else None
+    if result is not None:
+        print(f"Using cached LLM response {cache_key[:12]}")
+    
+    streamed = False
+    if result is None:
+        async with get_rate_limiter(model_name).limit_async(_estimate_request_tokens(prompt, system_prompt)):
+            streamed = bool(on_gate and LLM_STREAMING)
+            if streamed:
+                result = await _acollect_stream(provider_stream(prompt, response_schema, system_prompt), on_gate, expected_gates)
+            else:
+                result = await provider_call(prompt, response_schema, system_prompt)
+        if _is_cacheable(result):
+            await asyncio.to_thread(store_cached_response, cache_key, result)
+    
+    if on_gate and not streamed:
+        for gate_key, verdict in result.get("primary_hard_gates", {}).items():
+            on_gate(gate_key, verdict)
+    return result
+
+def _collect_stream(pieces: Iterator[str], on_gate, expected_gates) -> Dict[str, Any]:
+    """Feed a streamed reply to the incremental gate parser, stopping once every gate has arrived"""
+    parser = GateStreamParser(expected_gates, on_gate)
+    content = []
+    try:
+        for piece in pieces:
+            content.append(piece)
+            parser.feed(piece)
+            if parser.complete:
+                break
+    finally:
+        # Closing the stream early stops generation and frees the connection
+        pieces.close()
+    
+    return _stream_result(parser, "".join(content))
+
+async def _acollect_stream(pieces: AsyncIterator[str], on_gate, expected_gates) -> Dict[str, Any]:
+    """Async version of _collect_stream"""
+    parser = GateStreamParser(expected_gates, on_gate)
+    content = []
     try:
+        async for piece in pieces:
+            content.append(piece)
+            parser.feed(piece)
+            if parser.complete:
+                break
+    finally:
+        await pieces.aclose()
+    
+    return _stream_result(parser, "".join(content))
+
+def _stream_result(parser: GateStreamParser, content: str) -> Dict[str, Any]:
+    """Build the analysis result from a streamed reply"""
+    document = parser.result()
+    if document is None and not parser.gates:
+        return _parse_json_response(content)
+    
+    if parser.document_end is None:
+        print(f"Stopped streaming after {len(parser.gates)} primary hard gates")
+    
+    result = {
+        "technology_stack": {},
+        "findings": [],
+        "component_analysis": {},
+        "primary_hard_gates": {}
+    }
+    for key in result:
+        if document and key in document:
+            result[key] = document[key]
+    if not result["primary_hard_gates"]:
+        result["primary_hard_gates"] = dict(parser.gates)
+    return result
+
+def is_fallback_result(result: Dict[str, Any]) -> bool:
+    """True if the reply could not be parsed and the verdicts were guessed from its text or made up"""
+    return bool(result.get("fallback"))
+
+def _is_cacheable(result: Dict[str, Any]) -> bool:
+    """Only responses that parsed into gate verdicts are worth reusing"""
+    return "error" not in result and not is_fallback_result(result) and bool(result.get("primary_hard_gates"))
+
+def _estimate_request_tokens(prompt: str, system_prompt: Optional[str] = None) -> int:
+    """Estimate the tokens a request counts against a tokens-per-minute limit"""
+    return estimate_tokens(prompt) + estimate_tokens(system_prompt or "") + ESTIMATED_OUTPUT_TOKENS
+
+def get_prompt_cache_stats() -> Dict[str, Any]:
+    """
+    Return prompt cache usage across all LLM calls in this process.
+    
+    "cached_tokens" are input tokens served from the provider's prompt cache,
+    "cache_write_tokens" are tokens written to it (Anthropic only) and "hit_rate"
+    is the share of input tokens that were cached.
+    """
+    with _prompt_cache_stats_lock:
+        stats = dict(_prompt_cache_stats)
+    stats["hit_rate"] = round(stats["cached_tokens"] / stats["input_tokens"], 3) if stats["input_tokens"] else 0.0
+    return stats
+
+def _record_prompt_cache_usage(input_tokens: int, cached_tokens: int, cache_write_tokens: int = 0):
+    """Add one request's token usage to the prompt cache statistics"""
+    with _prompt_cache_stats_lock:
+        _prompt_cache_stats["requests"] += 1
+        _prompt_cache_stats["input_tokens"] += input_tokens
+        _prompt_cache_stats["cached_tokens"] += cached_tokens
+        _prompt_cache_stats["cache_write_tokens"] += cache_write_tokens
+    
+    if cached_tokens or cache_write_tokens:
+        print(f"Prompt cache: {cached_tokens} of {input_tokens} input tokens read from cache, {cache_write_tokens} written")
+
+def _record_openai_usage(response):
+    """Record usage from an OpenAI response or the final chunk of a stream"""
+    usage = getattr(response, "usage", None)
+    if not usage:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    _record_prompt_cache_usage(usage.prompt_tokens or 0, getattr(details, "cached_tokens", 0) or 0)
+
+def _record_anthropic_usage(usage):
+    """Record usage from an Anthropic message; input_tokens excludes cache reads and writes"""
+    cached_tokens = getattr(usage, "cache_read_input_tokens", 0) or 0
+    cache_write_tokens = getattr(usage, "cache_creation_input_tokens", 0) or 0
+    input_tokens = (usage.input_tokens or 0) + cached_tokens + cache_write_tokens
+    _record_prompt_cache_usage(input_tokens, cached_tokens, cache_write_tokens)
+
+def _record_google_usage(response):
+    """Record usage from a Gemini response"""
+    usage = getattr(response, "usage_metadata", None)
+    if not usage:
+        return
+    _record_prompt_cache_usage(usage.prompt_token_count or 0, getattr(usage, "cached_content_token_count", 0) or 0)
+
+def get_llm_model_name() -> str:
+    """
+    Return the provider and model that call_llm will use, e.g. "openai:gpt-4o".
+    
+    Uses the same provider precedence as call_llm. Local OpenAI-compatible servers
+    include the base URL so results from different servers are kept apart.
+    """
+    if os.getenv("OPENAI_API_KEY"):
+        model = os.getenv("OPENAI_MODEL", "gpt-4o")
+        base_url = os.getenv("OPENAI_BASE_URL")
+        return f"openai:{model}@{base_url}" if base_url else f"openai:{model}"
+    elif os.getenv("ANTHROPIC_API_KEY"):
+        return f"anthropic:{ANTHROPIC_MODEL}"
+    elif os.getenv("GOOGLE_API_KEY"):
+        return f"google:{GOOGLE_MODEL}"
+    else:
+        return "none"
+
+def get_llm_client(provider: str, api_key: str, base_url: Optional[str] = None):
+    """
+    Return the shared SDK client for a provider, base URL and API key, creating it on first use.
+    
+    Clients are thread-safe and keep their HTTP connection pool alive between calls,
+    so repeated calls reuse connections instead of paying a new TLS handshake each time.
+    """
+    client_key = (provider, base_url, api_key)
+    client = _clients.get(client_key)
+    if client is not None:
+        return client
+    
+    with _clients_lock:
+        client = _clients.get(client_key)
+        if client is None:
+            client = _create_client(provider, api_key, base_url)
+            _clients[client_key] = client
+    return client
+
+async def close_llm_clients():
+    """
+    Close all pooled clients and their connections.
+    """
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    
+    for client in clients:
+        close = getattr(client, "close", None)
+        if close:
+            result = close()
+            # Async SDK clients return a coroutine
+            if inspect.isawaitable(result):
+                await result
+
+def _create_client(provider: str, api_key: str, base_url: Optional[str]):
+    """
+    Create an SDK client with a pooled, keep-alive HTTP transport.
+    
+    The SDKs' own retries are disabled; nodes retry with their RetryPolicy instead,
+    so a failing call is not retried at two levels.
+    """
+    if provider == "openai":
+        import httpx
         from openai import OpenAI
         
-        # Support for local LLMs with custom base URL
-        base_url = os.getenv("OPENAI_BASE_URL")
-        api_key = os.getenv("OPENAI_API_KEY")
-        model = os.getenv("OPENAI_MODEL", "gpt-4o")  # Default to gpt-4o, but allow override
-        
-        # Create client with custom base URL if provided (for local LLMs)
-        if base_url:
-            client = OpenAI(
-                api_key=api_key or "local-llm",  # Local LLMs often don't need real API keys
-                base_url=base_url
-            )
-            print(f"Using local LLM at {base_url} with model: {model}")
-        else:
-            client = OpenAI(api_key=api_key)
-            print(f"Using OpenAI API with model: {model}")
-        
-        response = client.chat.completions.create(
-            model=model,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.1
+        return OpenAI(api_key=api_key, base_url=base_url, max_retries=0, http_client=_create_http_client(httpx))
+    
+    if provider == "openai_async":
+        import httpx
+        from openai import AsyncOpenAI
+        
+        return AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0, http_client=_create_http_client(httpx, async_client=True))
+    
+    if provider == "anthropic":
+        import httpx
+        from anthropic import Anthropic
+        
+        return Anthropic(api_key=api_key, max_retries=0, http_client=_create_http_client(httpx))
+    
+    if provider == "anthropic_async":
+        import httpx
+        from anthropic import AsyncAnthropic
+        
+        return AsyncAnthropic(api_key=api_key, max_retries=0, http_client=_create_http_client(httpx, async_client=True))
+    
+    if provider == "google":
+        import google.generativeai as genai
+        
+        # genai.configure is process-wide, so the configured model is created once and reused
+        genai.configure(api_key=api_key)
+        return genai.GenerativeModel(GOOGLE_MODEL)
+    
+    raise ValueError(f"Unsupported LLM provider: {provider}")
+
+def _create_http_client(httpx, async_client=False):
+    """Create an httpx client with the configured pool size and timeouts"""
+    client_class = httpx.AsyncClient if async_client else httpx.Client
+    return client_class(
+        limits=httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS
+        ),
+        timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+    )
+
+def _openai_client(provider: str):
+    """Return the pooled OpenAI client for the configured endpoint and the model name"""
+    # Support for local LLMs with custom base URL
+    base_url = os.getenv("OPENAI_BASE_URL")
+    api_key = os.getenv("OPENAI_API_KEY")
+    model = os.getenv("OPENAI_MODEL", "gpt-4o")  # Default to gpt-4o, but allow override
+    
+    # Reuse the pooled client for this endpoint (custom base URL for local LLMs)
+    if base_url:
+        client = get_llm_client(provider, api_key or "local-llm", base_url)  # Local LLMs often don't need real API keys
+        print(f"Using local LLM at {base_url} with model: {model}")
+    else:
+        client = get_llm_client(provider, api_key)
+        print(f"Using OpenAI API with model: {model}")
+    
+    return client, model
+
+def _structured_output_schema(response_schema: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Return the schema to request structured output with, or None to rely on JSON parsing"""
+    if not response_schema or not LLM_STRUCTURED_OUTPUT:
+        return None
+    if get_llm_model_name() in _structured_output_unsupported:
+        return None
+    return response_schema
+
+def _is_schema_rejection(exc: Exception) -> bool:
+    """True if the server rejected the structured output arguments (e.g. an unknown response_format)"""
+    status = getattr(exc, "status_code", None) or getattr(exc, "code", None)
+    if status not in (400, 422):
+        return False
+    
+    # SDK errors carry the response body separately from the message
+    details = f"{exc} {getattr(exc, 'body', None) or ''}"
+    return SCHEMA_REJECTION_PATTERN.search(details) is not None
+
+def _disable_structured_output(exc: Exception):
+    """Remember that the configured model does not support structured output"""
+    model_name = get_llm_model_name()
+    _structured_output_unsupported.add(model_name)
+    print(f"Structured output not supported by {model_name}, falling back to JSON parsing: {exc}")
+
+def _with_schema_fallback(create: Callable[..., Any], schema_kwargs: Optional[Dict[str, Any]]):
+    """Make a request with the structured output arguments, retrying without them if they are rejected"""
+    if schema_kwargs:
+        try:
+            return create(**schema_kwargs)
+        except Exception as e:
+            if not _is_schema_rejection(e):
+                raise
+            _disable_structured_output(e)
+    return create()
+
+async def _awith_schema_fallback(create: Callable[..., Any], schema_kwargs: Optional[Dict[str, Any]]):
+    """Async version of _with_schema_fallback"""
+    if schema_kwargs:
+        try:
+            return await create(**schema_kwargs)
+        except Exception as e:
+            if not _is_schema_rejection(e):
+                raise
+            _disable_structured_output(e)
+    return await create()
+
+def _openai_schema_kwargs(response_schema: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Request arguments for OpenAI JSON schema output"""
+    schema = _structured_output_schema(response_schema)
+    if not schema:
+        return None
+    return {"response_format": {"type": "json_schema", "json_schema": {"name": STRUCTURED_OUTPUT_NAME, "schema": schema}}}
+
+def _anthropic_request(prompt: str, response_schema: Optional[Dict[str, Any]], system_prompt: Optional[str]) -> Dict[str, Any]:
+    """Request arguments for Anthropic, forcing a tool call whose input is the structured response"""
+    request = {
+        "model": ANTHROPIC_MODEL,
+        "max_tokens": 4000,
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": 0.1
+    }
+    if system_prompt:
+        # The cache breakpoint covers the tool definition and the system prompt, which precede the messages
+        request["system"] = [{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}]
+    schema = _structured_output_schema(response_schema)
+    if schema:
+        request["tools"] = [{
+            "name": STRUCTURED_OUTPUT_NAME,
+            "description": "Record the hard gate assessment.",
+            "input_schema": schema
+        }]
+        request["tool_choice"] = {"type": "tool", "name": STRUCTURED_OUTPUT_NAME}
+    return request
+
+def _anthropic_content(response) -> str:
+    """Return the structured tool input as JSON, or the reply text if no tool was called"""
+    for block in response.content:
+        if block.type == "tool_use":
+            return json.dumps(block.input)
+    return response.content[0].text
+
+def _anthropic_delta(event) -> Optional[str]:
+    """Return the text or tool input JSON carried by a streaming event"""
+    if event.type != "content_block_delta":
+        return None
+    if event.delta.type == "text_delta":
+        return event.delta.text
+    if event.delta.type == "input_json_delta":
+        return event.delta.partial_json
+    return None
+
+def _google_schema_kwargs(response_schema: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Generation config arguments for Gemini JSON schema output"""
+    schema = _structured_output_schema(response_schema)
+    if not schema:
+        return None
+    return {"response_mime_type": "application/json", "response_schema": schema}
+
+def _provider_error(provider_label: str, exc: Exception) -> LLMError:
+    """Wrap an SDK exception, classifying it as retryable or fatal from its HTTP status"""
+    if isinstance(exc, LLMError):
+        return exc
+    
+    response = getattr(exc, "response", None)
+    status_code = getattr(exc, "status_code", None) or getattr(response, "status_code", None)
+    if status_code is None and isinstance(getattr(exc, "code", None), int):
+        # google.api_core exceptions carry the HTTP status as code
+        status_code = exc.code
+    
+    if status_code is None:
+        # Connection errors and timeouts have no status and are worth retrying, bugs are not
+        retryable = not isinstance(exc, (TypeError, AttributeError, NameError))
+    else:
+        retryable = status_code in RETRYABLE_STATUS_CODES or status_code >= 500
+    
+    return LLMError(f"{provider_label} API error: {str(exc)}", retryable=retryable,
+                    retry_after=_retry_after_seconds(response), status_code=status_code)
+
+def _retry_after_seconds(response) -> Optional[float]:
+    """Read the wait requested by a Retry-After (seconds or HTTP date) or retry-after-ms header"""
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def _openai_messages(prompt: str, system_prompt: Optional[str]) -> List[Dict[str, str]]:
+    """Chat messages with the stable system prompt first, so OpenAI's automatic prefix caching applies"""
+    messages = [{"role": "system", "content": system_prompt}] if system_prompt else []
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
+def _openai_stream_options() -> Dict[str, Any]:
+    """Ask for token usage at the end of a stream (OpenAI API only, local servers may reject it)"""
+    if os.getenv("OPENAI_BASE_URL"):
+        return {}
+    return {"stream_options": {"include_usage": True}}
+
+def _google_contents(prompt: str, system_prompt: Optional[str]) -> str:
+    """Gemini prompt with the stable instructions first, so implicit prefix caching applies"""
+    return f"{system_prompt}\n\n{prompt}" if system_prompt else prompt
+
+def _call_openai(prompt: str, response_schema: Optional[Dict[str, Any]] = None, system_prompt: Optional[str] = None) -> Dict[str, Any]:
+    """Call OpenAI API or OpenAI-compatible local LLM"""
+    try:
+        client, model = _openai_client("openai")
+        
+        response = _with_schema_fallback(
+            lambda **structured: client.chat.completions.create(
+                model=model,
+                messages=_openai_messages(prompt, system_prompt),
+                temperature=0.1,
+                **structured
+            ),
+            _openai_schema_kwargs(response_schema)
         )
         
+        _record_openai_usage(response)
+        
         content = response.choices[0].message.content
         return _parse_json_response(content)
-        
-    except ImportError:
-        raise ValueError("OpenAI library not installed. Run: pip install openai")
+    
+    except ImportError as e:
+        raise LLMError("OpenAI library not installed. Run: pip install openai", retryable=False) from e
     except Exception as e:
-        raise ValueError(f"OpenAI API error: {str(e)}")
+        raise _provider_error("OpenAI", e) from e
 
-def _call_anthropic(prompt: str) -> Dict[str, Any]:
+def _call_anthropic(prompt: str, response_schema: Optional[Dict[str, Any]] = None, system_prompt: Optional[str] = None) -> Dict[str, Any]:
     """Call Anthropic Claude API"""
     try:
-        from anthropic import Anthropic
+        client = get_llm_client("anthropic", os.getenv("ANTHROPIC_API_KEY"))
         
-        client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+        response = client.messages.create(**_anthropic_request(prompt, response_schema, system_prompt))
         
-        response = client.messages.create(
-            model="claude-3-sonnet-20240229",
-            max_tokens=4000,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.1
+        _record_anthropic_usage(response.usage)
+        
+        content = _anthropic_content(response)
+        return _parse_json_response(content)
+    
+    except ImportError as e:
+        raise LLMError("Anthropic library not installed. Run: pip install anthropic", retryable=False) from e
+    except Exception as e:
+        raise _provider_error("Anthropic", e) from e
+
+def _call_google(prompt: str, response_schema: Optional[Dict[str, Any]] = None, system_prompt: Optional[str] = None) -> Dict[str, Any]:
+    """Call Google Gemini API"""
+    try:
+        import google.generativeai as genai
+        
+        model = get_llm_client("google", os.getenv("GOOGLE_API_KEY"))
+        
+        response = _with_schema_fallback(
+            lambda **structured: model.generate_content(
+                _google_contents(prompt, system_prompt),
+                generation_config=genai.types.GenerationConfig(
+                    temperature=0.1,
+                    **structured
+                ),
+                request_options={"timeout": LLM_TIMEOUT}
+            ),
+            _google_schema_kwargs(response_schema)
+        )
+        
+        _record_google_usage(response)
+        
+        content = response.text
+        return _parse_json_response(content)
+    
+    except ImportError as e:
+        raise LLMError("Google generativeai library not installed. Run: pip install google-generativeai", retryable=False) from e
+    except Exception as e:
+        raise _provider_error("Google", e) from e
+
+async def _acall_openai(prompt: str, response_schema: Optional[Dict[str, Any]] = None, system_prompt: Optional[str] = None) -> Dict[str, Any]:
+    """Call OpenAI API or OpenAI-compatible local LLM with the async SDK"""
+    try:
+        client, model = _openai_client("openai_async")
+        
+        response = await _awith_schema_fallback(
+            lambda **structured: client.chat.completions.create(
+                model=model,
+                messages=_openai_messages(prompt, system_prompt),
+                temperature=0.1,
+                **structured
+            ),
+            _openai_schema_kwargs(response_schema)
         )
         
-        content = response.content[0].text
+        _record_openai_usage(response)
+        
+        content = response.choices[0].message.content
         return _parse_json_response(content)
+    
+    except ImportError as e:
+        raise LLMError("OpenAI library not installed. Run: pip install openai", retryable=False) from e
+    except Exception as e:
+        raise _provider_error("OpenAI", e) from e
+
+async def _acall_anthropic(prompt: str, response_schema: Optional[Dict[str, Any]] = None, system_prompt: Optional[str] = None) -> Dict[str, Any]:
+    """Call Anthropic Claude API with the async SDK"""
+    try:
+        client = get_llm_client("anthropic_async", os.getenv("ANTHROPIC_API_KEY"))
         
-    except ImportError:
-        raise ValueError("Anthropic library not installed. Run: pip install anthropic")
+        response = await client.messages.create(**_anthropic_request(prompt, response_schema, system_prompt))
+        
+        _record_anthropic_usage(response.usage)
+        
+        content = _anthropic_content(response)
+        return _parse_json_response(content)
+    
+    except ImportError as e:
+        raise LLMError("Anthropic library not installed. Run: pip install anthropic", retryable=False) from e
     except Exception as e:
-        raise ValueError(f"Anthropic API error: {str(e)}")
+        raise _provider_error("Anthropic", e) from e
 
-def _call_google(prompt: str) -> Dict[str, Any]:
-    """Call Google Gemini API"""
+async def _acall_google(prompt: str, response_schema: Optional[Dict[str, Any]] = None, system_prompt: Optional[str] = None) -> Dict[str, Any]:
+    """Call Google Gemini API with the async SDK"""
     try:
         import google.generativeai as genai
         
-        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-        model = genai.GenerativeModel('gemini-pro')
+        model = get_llm_client("google", os.getenv("GOOGLE_API_KEY"))
         
-        response = model.generate_content(
-            prompt,
-            generation_config=genai.types.GenerationConfig(
-                temperature=0.1
-            )
+        response = await _awith_schema_fallback(
+            lambda **structured: model.generate_content_async(
+                _google_contents(prompt, system_prompt),
+                generation_config=genai.types.GenerationConfig(
+                    temperature=0.1,
+                    **structured
+                ),
+                request_options={"timeout": LLM_TIMEOUT}
+            ),
+            _google_schema_kwargs(response_schema)
         )
         
+        _record_google_usage(response)
+        
         content = response.text
         return _parse_json_response(content)
+    
+    except ImportError as e:
+        raise LLMError("Google generativeai library not installed. Run: pip install google-generativeai", retryable=False) from e
+    except Exception as e:
+        raise _provider_error("Google", e) from e
+
+def _stream_openai(prompt: str, response_schema: Optional[Dict[str, Any]] = None, system_prompt: Optional[str] = None) -> Iterator[str]:
+    """Stream a completion from OpenAI API or OpenAI-compatible local LLM"""
+    try:
+        client, model = _openai_client("openai")
+        
+        stream = _with_schema_fallback(
+            lambda **structured: client.chat.completions.create(
+                model=model,
+                messages=_openai_messages(prompt, system_prompt),
+                temperature=0.1,
+                stream=True,
+                **_openai_stream_options(),
+                **structured
+            ),
+            _openai_schema_kwargs(response_schema)
+        )
+        try:
+            for chunk in stream:
+                _record_openai_usage(chunk)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            stream.close()
+    
+    except ImportError as e:
+        raise LLMError("OpenAI library not installed. Run: pip install openai", retryable=False) from e
+    except Exception as e:
+        raise _provider_error("OpenAI", e) from e
+
+def _stream_anthropic(prompt: str, response_schema: Optional[Dict[str, Any]] = None, system_prompt: Optional[str] = None) -> Iterator[str]:
+    """Stream a completion from Anthropic Claude API"""
+    try:
+        client = get_llm_client("anthropic", os.getenv("ANTHROPIC_API_KEY"))
+        
+        with client.messages.stream(**_anthropic_request(prompt, response_schema, system_prompt)) as stream:
+            for event in stream:
+                if event.type == "message_start":
+                    _record_anthropic_usage(event.message.usage)
+                delta = _anthropic_delta(event)
+                if delta:
+                    yield delta
+    
+    except ImportError as e:
+        raise LLMError("Anthropic library not installed. Run: pip install anthropic", retryable=False) from e
+    except Exception as e:
+        raise _provider_error("Anthropic", e) from e
+
+def _stream_google(prompt: str, response_schema: Optional[Dict[str, Any]] = None, system_prompt: Optional[str] = None) -> Iterator[str]:
+    """Stream a completion from Google Gemini API"""
+    try:
+        import google.generativeai as genai
+        
+        model = get_llm_client("google", os.getenv("GOOGLE_API_KEY"))
+        
+        response = _with_schema_fallback(
+            lambda **structured: model.generate_content(
+                _google_contents(prompt, system_prompt),
+                generation_config=genai.types.GenerationConfig(
+                    temperature=0.1,
+                    **structured
+                ),
+                request_options={"timeout": LLM_TIMEOUT},
+                stream=True
+            ),
+            _google_schema_kwargs(response_schema)
+        )
+        for chunk in response:
+            yield chunk.text
+    
+    except ImportError as e:
+        raise LLMError("Google generativeai library not installed. Run: pip install google-generativeai", retryable=False) from e
+    except Exception as e:
+        raise _provider_error("Google", e) from e
+
+async def _astream_openai(prompt: str, response_schema: Optional[Dict[str, Any]] = None, system_prompt: Optional[str] = None) -> AsyncIterator[str]:
+    """Stream a completion from OpenAI API or OpenAI-compatible local LLM with the async SDK"""
+    try:
+        client, model = _openai_client("openai_async")
+        
+        stream = await _awith_schema_fallback(
+            lambda **structured: client.chat.completions.create(
+                model=model,
+                messages=_openai_messages(prompt, system_prompt),
+                temperature=0.1,
+                stream=True,
+                **_openai_stream_options(),
+                **structured
+            ),
+            _openai_schema_kwargs(response_schema)
+        )
+        try:
+            async for chunk in stream:
+                _record_openai_usage(chunk)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            await stream.close()
+    
+    except ImportError as e:
+        raise LLMError("OpenAI library not installed. Run: pip install openai", retryable=False) from e
+    except Exception as e:
+        raise _provider_error("OpenAI", e) from e
+
+async def _astream_anthropic(prompt: str, response_schema: Optional[Dict[str, Any]] = None, system_prompt: Optional[str] = None) -> AsyncIterator[str]:
+    """Stream a completion from Anthropic Claude API with the async SDK"""
+    try:
+        client = get_llm_client("anthropic_async", os.getenv("ANTHROPIC_API_KEY"))
         
-    except ImportError:
-        raise ValueError("Google generativeai library not installed. Run: pip install google-generativeai")
+        async with client.messages.stream(**_anthropic_request(prompt, response_schema, system_prompt)) as stream:
+            async for event in stream:
+                if event.type == "message_start":
+                    _record_anthropic_usage(event.message.usage)
+                delta = _anthropic_delta(event)
+                if delta:
+                    yield delta
+    
+    except ImportError as e:
+        raise LLMError("Anthropic library not installed. Run: pip install anthropic", retryable=False) from e
+    except Exception as e:
+        raise _provider_error("Anthropic", e) from e
+
+async def _astream_google(prompt: str, response_schema: Optional[Dict[str, Any]] = None, system_prompt: Optional[str] = None) -> AsyncIterator[str]:
+    """Stream a completion from Google Gemini API with the async SDK"""
+    try:
+        import google.generativeai as genai
+        
+        model = get_llm_client("google", os.getenv("GOOGLE_API_KEY"))
+        
+        response = await _awith_schema_fallback(
+            lambda **structured: model.generate_content_async(
+                _google_contents(prompt, system_prompt),
+                generation_config=genai.types.GenerationConfig(
+                    temperature=0.1,
+                    **structured
+                ),
+                request_options={"timeout": LLM_TIMEOUT},
+                stream=True
+            ),
+            _google_schema_kwargs(response_schema)
+        )
+        async for chunk in response:
+            yield chunk.text
+    
+    except ImportError as e:
+        raise LLMError("Google generativeai library not installed. Run: pip install google-generativeai", retryable=False) from e
     except Exception as e:
-        raise ValueError(f"Google API error: {str(e)}")
+        raise _provider_error("Google", e) from e
 
 def _parse_json_response(content: str) -> Dict[str, Any]:
     """
@@ -125,98 +888,53 @@ def _parse_json_response(content: str) -> Dict[str, Any]:
             "primary_hard_gates": {}
         }
         
-        # Extract all JSON code blocks from the response
-        json_blocks = re.findall(r'```json\s*\n(.*?)\n```', content, re.DOTALL | re.IGNORECASE)
+        # Find every top-level JSON object in one pass, inside or outside code blocks
+        json_blocks = list(iter_json_objects(content))
         
         if json_blocks:
-            print(f"Found {len(json_blocks)} JSON blocks in response")
-            
-            for i, block in enumerate(json_blocks):
-                try:
-                    # Clean up the JSON block - remove common issues
-                    cleaned_block = block.strip()
-                    
-                    # Remove trailing commas before } or ]
-                    cleaned_block = re.sub(r',(\s*[}\]])', r'\1', cleaned_block)
-                    
-                    # Fix common quote issues
-                    cleaned_block = re.sub(r"'([^']*)':", r'"\1":', cleaned_block)  # Single quotes to double quotes for keys
-                    
-                    # Try to parse the cleaned JSON
-                    block_data = json.loads(cleaned_block)
-                    print(f"Successfully parsed JSON block {i+1}")
-                    
-                    # Merge the block data into the result
-                    if isinstance(block_data, dict):
-                        for key in ["technology_stack", "findings", "component_analysis", "primary_hard_gates"]:
-                            if key in block_data:
-                                if key == "findings" and isinstance(block_data[key], list):
-                                    result[key].extend(block_data[key])
-                                elif isinstance(block_data[key], dict):
-                                    result[key].update(block_data[key])
-                                else:
-                                    result[key] = block_data[key]
-                                
-                except json.JSONDecodeError as e:
-                    print(f"Failed to parse JSON block {i+1}: {e}")
-                    # Save the problematic block for debugging
-                    with open(f"debug_json_block_{i+1}.txt", "w") as debug_file:
-                        debug_file.write(f"Original block:\n{block}\n\nCleaned block:\n{cleaned_block if 'cleaned_block' in locals() else 'N/A'}\n\nError: {e}")
-                    continue
-                except Exception as e:
-                    print(f"Unexpected error parsing JSON block {i+1}: {e}")
-                    continue
-        
-        # Try to extract JSON without code blocks if no valid blocks found
-        if not any(result.values()) or not result["primary_hard_gates"]:
-            print("No valid JSON blocks found, trying to extract JSON from text directly")
-            
-            # Look for JSON-like structures in the text
-            json_patterns = [
-                r'\{[^{}]*"primary_hard_gates"[^{}]*\{.*?\}[^{}]*\}',  # Look for primary_hard_gates structure
-                r'\{.*?"technology_stack".*?\}',  # Look for technology_stack
-                r'\{.*?"findings".*?\}'  # Look for findings
-            ]
+            print(f"Found {len(json_blocks)} JSON objects in response")
+        
+        for i, block in enumerate(json_blocks):
+            # Strict parse first, then repair trailing commas, quotes and truncation
+            block_data = loads_tolerant(block)
+            if block_data is None:
+                print(f"Failed to parse JSON object {i+1}")
+                _record_parse_failure(block, repair_json(block))
+                continue
             
-            for pattern in json_patterns:
-                matches = re.findall(pattern, content, re.DOTALL | re.IGNORECASE)
-                for match in matches:
-                    try:
-                        # Clean and parse the match
-                        cleaned_match = re.sub(r',(\s*[}\]])', r'\1', match.strip())
-                        parsed_data = json.loads(cleaned_match)
-                        if isinstance(parsed_data, dict):
-                            for key in ["technology_stack", "findings", "component_analysis", "primary_hard_gates"]:
-                                if key in parsed_data:
-                                    if key == "findings" and isinstance(parsed_data[key], list):
-                                        result[key].extend(parsed_data[key])
-                                    elif isinstance(parsed_data[key], dict):
-                                        result[key].update(parsed_data[key])
-                                    else:
-                                        result[key] = parsed_data[key]
-                            print(f"Successfully extracted JSON structure from text")
-                            break
-                    except:
-                        continue
+            # Merge the block data into the result
+            if isinstance(block_data, dict):
+                for key in ["technology_stack", "findings", "component_analysis", "primary_hard_gates"]:
+                    if key in block_data:
+                        if key == "findings" and isinstance(block_data[key], list):
+                            result[key].extend(block_data[key])
+                        elif isinstance(block_data[key], dict):
+                            result[key].update(block_data[key])
+                        else:
+                            result[key] = block_data[key]
         
         # If still no valid data, use text extraction
         if not any(result.values()) or not result["primary_hard_gates"]:
             print("No valid JSON found, extracting from text analysis")
             result = _extract_primary_gates_from_text(content)
+            # Keyword guesses, not verdicts: callers must not cache or merge them as answers
+            result["fallback"] = True
         
         # Validate that we have meaningful data
         if not result["primary_hard_gates"]:
             print("Warning: No primary_hard_gates found, using fallback structure")
             result["primary_hard_gates"] = _create_fallback_primary_gates()
+            result["fallback"] = True
         
         print(f"Final result has {len(result['primary_hard_gates'])} primary hard gates")
         return result
-        
+    
     except Exception as e:
         print(f"Error during JSON parsing: {e}")
         # Return a structured error response with some basic analysis
         return {
             "error": "Failed to parse LLM response",
+            "fallback": True,
             "raw_response": content,
             "parse_error": str(e),
             "technology_stack": _extract_basic_tech_stack(content),
@@ -225,6 +943,61 @@ def _parse_json_response(content: str) -> Dict[str, Any]:
             "primary_hard_gates": _create_fallback_primary_gates()
         }
 
+def get_recent_parse_failures() -> List[Dict[str, Any]]:
+    """
+    Return the most recent unparseable JSON objects, oldest first.
+    """
+    with _parse_failures_lock:
+        return list(_parse_failures)
+
+def _record_parse_failure(block: str, repaired: str):
+    """
+    Keep an unparseable JSON object in the bounded debug sink.
+    
+    Failures are always kept in memory (the last LLM_DEBUG_MAX_ENTRIES). They are only
+    written to disk when HARDGATES_LLM_DEBUG_DIR is set, keeping the newest files there.
+    """
+    entry = {"time": time.time(), "original": block, "repaired": repaired}
+    with _parse_failures_lock:
+        _parse_failures.append(entry)
+        
+        if not LLM_DEBUG_DIR:
+            return
+        
+        try:
+            os.makedirs(LLM_DEBUG_DIR, exist_ok=True)
+            file_name = f"debug_json_{int(entry['time'] * 1000)}_{os.getpid()}_{threading.get_ident()}.txt"
+            with open(os.path.join(LLM_DEBUG_DIR, file_name), "w") as debug_file:
+                debug_file.write(f"Original block:\n{block}\n\nRepaired block:\n{repaired}\n")
+            
+            debug_files = sorted(name for name in os.listdir(LLM_DEBUG_DIR) if name.startswith("debug_json_"))
+            for name in debug_files[:-LLM_DEBUG_MAX_ENTRIES]:
+                os.remove(os.path.join(LLM_DEBUG_DIR, name))
+        except OSError as e:
+            print(f"Warning: Could not write JSON debug file: {e}")
+
+# Keyword groups used to infer gate verdicts from free-text responses
+_TEXT_SIGNAL_MATCHER = KeywordMatcher({
+    "java": ["java", ".java", "spring", "maven", "gradle"],
+    "spring": ["spring"],
+    "javascript": ["javascript", ".js", "node", "npm", "package.json"],
+    "python": ["python", ".py", "flask", "django", "requirements.txt"],
+    "database": ["mysql", "postgresql", "h2", "database"],
+    "logging": ["log", "logger", "slf4j", "logback", "log4j", "logging"],
+    "structured_logging": ["json", "structured", "elastic", "logstash"],
+    "audit": ["audit", "trail", "event"],
+    "correlation": ["correlation", "trace", "request-id", "tracking"],
+    "rest": ["rest", "controller", "@restcontroller", "api", "endpoint"],
+    "retry": ["retry", "resilience4j", "tenacity", "@retryable"],
+    "timeout": ["timeout", "read-timeout", "connection-timeout"],
+    "circuit_breaker": ["circuit", "breaker", "hystrix", "@circuitbreaker"],
+    "rate_limit": ["rate", "limit", "throttle", "ratelimit"],
+    "exception_handling": ["try", "catch", "exception", "error"],
+    "http_codes": ["httpstatus", "response.status", "status code"],
+    "tests": ["test", "junit", "mockito", "testng", "spec", "cucumber"],
+    "automation": ["ci", "jenkins", "github actions", "pipeline", "automated"]
+})
+
 def _extract_primary_gates_from_text(content: str) -> Dict[str, Any]:
     """
     Extract the 15 primary hard gates from text response when JSON parsing fails
@@ -236,26 +1009,26 @@ def _extract_primary_gates_from_text(content: str) -> Dict[str, Any]:
         "primary_hard_gates": {}
     }
     
-    # Extract technology stack based on content analysis
-    content_lower = content.lower()
+    # Find every keyword group in a single pass over the response
+    found = _TEXT_SIGNAL_MATCHER.groups_present(content)
     
     # Technology detection
     languages = []
     frameworks = []
     databases = []
     
-    if any(word in content_lower for word in ["java", ".java", "spring", "maven", "gradle"]):
+    if "java" in found:
         languages.append({"name": "Java", "version": "8+", "purpose": "main application"})
-        if "spring" in content_lower:
+        if "spring" in found:
             frameworks.append({"name": "Spring Framework", "version": "5.x", "purpose": "web framework"})
     
-    if any(word in content_lower for word in ["javascript", ".js", "node", "npm", "package.json"]):
+    if "javascript" in found:
         languages.append({"name": "JavaScript", "version": "ES6+", "purpose": "client/server side"})
     
-    if any(word in content_lower for word in ["python", ".py", "flask", "django", "requirements.txt"]):
+    if "python" in found:
         languages.append({"name": "Python", "version": "3.x", "purpose": "application development"})
     
-    if any(word in content_lower for word in ["mysql", "postgresql", "h2", "database"]):
+    if "database" in found:
         databases.append({"name": "Database", "version": "N/A", "purpose": "data storage"})
     
     result["technology_stack"] = {
@@ -268,8 +1041,8 @@ def _extract_primary_gates_from_text(content: str) -> Dict[str, Any]:
     primary_gates = {}
     
     # Logging-related gates
-    has_logging = any(word in content_lower for word in ["log", "logger", "slf4j", "logback", "log4j", "logging"])
-    has_structured_logging = any(word in content_lower for word in ["json", "structured", "elastic", "logstash"])
+    has_logging = "logging" in found
+    has_structured_logging = "structured_logging" in found
     
     primary_gates["logs_searchable_available"] = {
         "implemented": "yes" if has_structured_logging else ("partial" if has_logging else "no"),
@@ -284,19 +1057,19 @@ def _extract_primary_gates_from_text(content: str) -> Dict[str, Any]:
     }
     
     primary_gates["create_audit_trail_logs"] = {
-        "implemented": "yes" if any(word in content_lower for word in ["audit", "trail", "event"]) else "no",
-        "evidence": "Audit logging patterns detected" if any(word in content_lower for word in ["audit", "trail", "event"]) else "No audit logging patterns found",
+        "implemented": "yes" if "audit" in found else "no",
+        "evidence": "Audit logging patterns detected" if "audit" in found else "No audit logging patterns found",
         "recommendation": "Implement audit trail logging for important business operations"
     }
     
     primary_gates["tracking_id_for_log_messages"] = {
-        "implemented": "yes" if any(word in content_lower for word in ["correlation", "trace", "request-id", "tracking"]) else "no",
-        "evidence": "Correlation/tracking ID patterns found" if any(word in content_lower for word in ["correlation", "trace", "request-id", "tracking"]) else "No correlation ID patterns found",
+        "implemented": "yes" if "correlation" in found else "no",
+        "evidence": "Correlation/tracking ID patterns found" if "correlation" in found else "No correlation ID patterns found",
         "recommendation": "Add tracking/correlation IDs to log messages for request tracing"
     }
     
     # API-related gates
-    has_rest = any(word in content_lower for word in ["rest", "controller", "@restcontroller", "api", "endpoint"])
+    has_rest = "rest" in found
     
     primary_gates["log_rest_api_calls"] = {
         "implemented": "partial" if has_rest and has_logging else "no",
@@ -317,10 +1090,10 @@ def _extract_primary_gates_from_text(content: str) -> Dict[str, Any]:
     }
     
     # Resilience gates
-    has_retry = any(word in content_lower for word in ["retry", "resilience4j", "tenacity", "@retryable"])
-    has_timeout = any(word in content_lower for word in ["timeout", "read-timeout", "connection-timeout"])
-    has_circuit_breaker = any(word in content_lower for word in ["circuit", "breaker", "hystrix", "@circuitbreaker"])
-    has_rate_limit = any(word in content_lower for word in ["rate", "limit", "throttle", "ratelimit"])
+    has_retry = "retry" in found
+    has_timeout = "timeout" in found
+    has_circuit_breaker = "circuit_breaker" in found
+    has_rate_limit = "rate_limit" in found
     
     primary_gates["retry_logic"] = {
         "implemented": "yes" if has_retry else "no",
@@ -347,8 +1120,8 @@ def _extract_primary_gates_from_text(content: str) -> Dict[str, Any]:
     }
     
     # Error handling gates
-    has_exception_handling = any(word in content_lower for word in ["try", "catch", "exception", "error"])
-    has_http_codes = any(word in content_lower for word in ["httpstatus", "response.status", "status code"])
+    has_exception_handling = "exception_handling" in found
+    has_http_codes = "http_codes" in found
     
     primary_gates["log_system_errors"] = {
         "implemented": "yes" if has_exception_handling and has_logging else ("partial" if has_exception_handling else "no"),
@@ -369,8 +1142,8 @@ def _extract_primary_gates_from_text(content: str) -> Dict[str, Any]:
     }
     
     # Testing gate
-    has_tests = any(word in content_lower for word in ["test", "junit", "mockito", "testng", "spec", "cucumber"])
-    has_automation = any(word in content_lower for word in ["ci", "jenkins", "github actions", "pipeline", "automated"])
+    has_tests = "tests" in found
+    has_automation = "automation" in found
     
     primary_gates["automated_regression_testing"] = {
         "implemented": "yes" if has_tests and has_automation else ("partial" if has_tests else "no"),
@@ -496,7 +1269,7 @@ def _extract_basic_tech_stack(content: str) -> Dict[str, Any]:
         tech_stack["frameworks"].append({"name": "Spring", "version": "5.x", "purpose": "web framework"})
     if "h2" in content.lower():
         tech_stack["databases"].append({"name": "H2", "version": "1.4+", "purpose": "in-memory database"})
-        
+    
     return tech_stack
 
 def _extract_basic_findings(content: str) -> List[Dict[str, Any]]:
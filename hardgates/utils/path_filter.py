@@ -0,0 +1,190 @@
+import re
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+try:
+    import yaml
+except ImportError:
+    yaml = None  # PyYAML not installed, per-repository configuration is ignored
+
+# Per-repository configuration file, read from the root of the assessed commit
+REPO_CONFIG_FILE = ".hardgates.yml"
+
+# File filtering configuration
+ALLOWED_EXTENSIONS = {
+    '.py', '.js', '.ts', '.java', '.go', '.rb', '.php', '.cpp', '.h', '.hpp',
+    '.c', '.cs', '.swift', '.yaml', '.yml', '.json', '.xml', '.html', '.css',
+    '.md', '.rst', '.txt', '.dockerfile', '.sh', '.bash', '.sql', '.scala',
+    '.kt', '.dart', '.rs', '.lua', '.r', '.m', '.mm', '.gradle', '.maven'
+}
+
+EXCLUDED_DIRS = {
+    '.git', '.github', '.vscode', '.idea', '__pycache__', 'node_modules',
+    'dist', 'build', 'target', 'bin', 'obj', '.next', '.nuxt', 'vendor',
+    'env', '.env', '.venv', 'venv', 'logs', 'tmp', 'temp', '.cache'
+}
+
+EXCLUDED_FILES = {
+    '.gitignore', '.gitmodules', '.DS_Store', 'Thumbs.db', '.dockerignore',
+    'package-lock.json', 'yarn.lock', 'composer.lock', 'Gemfile.lock'
+}
+
+SPECIAL_FILE_PATTERNS = ["dockerfile", "makefile", "cmakelists.txt", "readme"]
+
+MINIFIED_PATTERNS = ['.min.', '.bundle.', '.chunk.']
+
+def default_include_patterns() -> List[str]:
+    """
+    Globs for the file types assessed by default: known extensions and special files.
+    """
+    return [f"*{ext}" for ext in sorted(ALLOWED_EXTENSIONS)] + [f"*{name}*" for name in SPECIAL_FILE_PATTERNS]
+
+def default_exclude_patterns() -> List[str]:
+    """
+    Globs for the directories and files skipped by default.
+    """
+    return ([f"{directory}/" for directory in sorted(EXCLUDED_DIRS)] + sorted(EXCLUDED_FILES)
+            + [f"*{pattern}*" for pattern in MINIFIED_PATTERNS])
+
+class PathFilter:
+    """
+    Compiled include/exclude rules for repository paths, with .gitignore semantics.
+    
+    Exclude patterns work like .gitignore lines: a pattern without a slash matches a name
+    at any depth, one with a slash is anchored at the repository root, a trailing slash
+    matches directories only, `**` matches across directories and a leading `!` re-includes
+    what an earlier pattern excluded. The last matching pattern wins, and nothing below an
+    excluded directory can be re-included, so callers prune excluded directories instead
+    of descending into them. A file must also match one of the include patterns.
+    Matching ignores case.
+    """
+    
+    def __init__(self, include: Optional[Iterable[str]] = None, exclude: Optional[Iterable[str]] = None):
+        include = default_include_patterns() if include is None else list(include)
+        exclude = default_exclude_patterns() if exclude is None else list(exclude)
+        
+        # Includes never negate, so one alternation answers them all
+        self._include = re.compile("|".join(f"(?:{_glob_to_regex(pattern)[0]})" for pattern in include) or "(?!)",
+                                   re.IGNORECASE)
+        
+        # (regex, negated, directories only), newest first so the first match is the last matching line
+        self._exclude = []
+        for pattern in reversed(exclude):
+            negated = pattern.startswith("!")
+            regex, directory_only = _glob_to_regex(pattern[1:] if negated else pattern)
+            self._exclude.append((re.compile(regex, re.IGNORECASE), negated, directory_only))
+    
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "PathFilter":
+        """
+        Build a filter from a per-repository configuration.
+        
+        `include` and `exclude` patterns are added after the defaults, so excludes can
+        re-include default exclusions with `!`; `defaults: false` drops the defaults.
+        """
+        use_defaults = config.get("defaults", True)
+        include = _pattern_list(config, "include")
+        exclude = _pattern_list(config, "exclude")
+        if use_defaults:
+            include = default_include_patterns() + include
+            exclude = default_exclude_patterns() + exclude
+        return cls(include, exclude)
+    
+    def includes_directory(self, path: str) -> bool:
+        """
+        Return whether to descend into a directory (path relative to the root, "/"-separated).
+        """
+        return not self._is_excluded(path, True)
+    
+    def includes_file(self, path: str) -> bool:
+        """
+        Return whether a file passes the rules, assuming its directories were not excluded.
+        """
+        return not self._is_excluded(path, False) and self._include.match(path) is not None
+    
+    def _is_excluded(self, path: str, is_directory: bool) -> bool:
+        for regex, negated, directory_only in self._exclude:
+            if directory_only and not is_directory:
+                continue
+            if regex.match(path):
+                return not negated
+        return False
+
+def load_repo_config(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse the contents of a .hardgates.yml file.
+    
+    Returns None (and prints why) if PyYAML is missing or the file is not a mapping.
+    """
+    if yaml is None:
+        print(f"Warning: PyYAML is not installed, ignoring {REPO_CONFIG_FILE}")
+        return None
+    
+    try:
+        config = yaml.safe_load(text)
+    except yaml.YAMLError as e:
+        print(f"Warning: Could not parse {REPO_CONFIG_FILE}: {str(e)}")
+        return None
+    
+    if config is None:
+        return {}
+    if not isinstance(config, dict):
+        print(f"Warning: {REPO_CONFIG_FILE} must be a mapping, ignoring it")
+        return None
+    return config
+
+def _pattern_list(config: Dict[str, Any], key: str) -> List[str]:
+    patterns = config.get(key) or []
+    if isinstance(patterns, str):
+        patterns = [patterns]
+    return [str(pattern) for pattern in patterns]
+
+def _glob_to_regex(pattern: str) -> Tuple[str, bool]:
+    """
+    Translate a .gitignore-style glob into a regex for "/"-separated paths.
+    
+    Returns the regex and whether the pattern only matches directories.
+    """
+    directory_only = pattern.endswith("/")
+    pattern = pattern.rstrip("/")
+    
+    # Patterns with a slash (other than a trailing one) are anchored at the root
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+    
+    regex = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            regex.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("/**", i) and i + 3 == len(pattern):
+            regex.append("/.*")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            regex.append(".*")
+            i += 2
+            continue
+        
+        if char == "*":
+            regex.append("[^/]*")
+        elif char == "?":
+            regex.append("[^/]")
+        elif char == "[":
+            end = pattern.find("]", i + 2)
+            if end == -1:
+                regex.append(re.escape(char))
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                regex.append(f"[{body}]")
+                i = end
+        else:
+            regex.append(re.escape(char))
+        i += 1
+    
+    prefix = "" if anchored else "(?:.*/)?"
+    return f"{prefix}{''.join(regex)}$", directory_only
@@ -0,0 +1,404 @@
+import os
+import json
+import time
+import uuid
+import socket
+import asyncio
+import sqlite3
+import threading
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager
+from typing import Dict, Any, Optional
+from pathlib import Path
+
+# Defaults for every provider and model (0 disables a limit)
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("HARDGATES_LLM_MAX_CONCURRENCY", "16"))
+DEFAULT_RPM = int(os.getenv("HARDGATES_LLM_RPM", "0"))
+DEFAULT_TPM = int(os.getenv("HARDGATES_LLM_TPM", "0"))
+
+# Per provider or model overrides, e.g.
+# {"openai:gpt-4o": {"rpm": 500, "tpm": 30000}, "anthropic": {"max_concurrency": 4}}
+RATE_LIMITS = json.loads(os.getenv("HARDGATES_LLM_RATE_LIMITS", "{}"))
+
+# Database through which every process on the host (API server, workers) shares one budget
+# per provider and model. Set to an empty string to apply the limits to each process separately.
+RATE_LIMIT_PATH = os.getenv("HARDGATES_LLM_RATE_LIMIT_PATH",
+                            os.path.join(Path.home(), ".cache", "hardgates", "rate_limits.sqlite3"))
+
+# How long a writer waits for another process holding the database lock
+BUSY_TIMEOUT_SECONDS = 10
+
+# How often a caller checks for a concurrency slot released by another process
+LEASE_POLL_SECONDS = 0.1
+
+# A concurrency lease held this long is assumed leaked and reclaimed (far beyond any LLM call)
+LEASE_EXPIRY_SECONDS = 3600
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+_local = threading.local()
+
+class ConcurrencyLimiter:
+    """
+    First-come, first-served counting semaphore shared by threads and coroutines.
+    
+    Waiters are queued in arrival order, so concurrent assessments get slots fairly
+    whether they call the LLM from worker threads or from the event loop.
+    """
+    
+    def __init__(self, max_concurrency: int):
+        self.available = max_concurrency
+        self.waiters = deque()
+        self.lock = threading.Lock()
+    
+    def acquire(self) -> None:
+        with self.lock:
+            if self.available > 0 and not self.waiters:
+                self.available -= 1
+                return
+            event = threading.Event()
+            self.waiters.append(("thread", event))
+        # The slot is handed over directly by release()
+        event.wait()
+    
+    async def acquire_async(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self.lock:
+            if self.available > 0 and not self.waiters:
+                self.available -= 1
+                return
+            future = loop.create_future()
+            waiter = ("async", (loop, future))
+            self.waiters.append(waiter)
+        
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self.lock:
+                if waiter in self.waiters:
+                    self.waiters.remove(waiter)
+                    raise
+            # The slot was handed over while we were being cancelled, pass it on
+            self.release()
+            raise
+    
+    def release(self, lease=None):
+        with self.lock:
+            if not self.waiters:
+                self.available += 1
+                return
+            kind, waiter = self.waiters.popleft()
+        
+        if kind == "thread":
+            waiter.set()
+        else:
+            loop, future = waiter
+            loop.call_soon_threadsafe(_resolve, future)
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+class SharedConcurrencyLimiter:
+    """
+    Concurrency limit shared by every process using the rate limit database.
+    
+    Callers first queue for one of this process's slots, so waiting stays first-come,
+    first-served within the process, then lease a slot in the database, polling while
+    other processes hold them all. Leases left by processes that died are reclaimed.
+    If the database cannot be used, only the process's own limit applies.
+    """
+    
+    def __init__(self, name: str, max_concurrency: int):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.local = ConcurrencyLimiter(max_concurrency)
+    
+    def acquire(self) -> Optional[str]:
+        self.local.acquire()
+        try:
+            while True:
+                lease = self._lease()
+                if lease != "":
+                    return lease
+                time.sleep(LEASE_POLL_SECONDS)
+        except BaseException:
+            self.local.release()
+            raise
+    
+    async def acquire_async(self) -> Optional[str]:
+        await self.local.acquire_async()
+        try:
+            while True:
+                lease = await self._lease_async()
+                if lease != "":
+                    return lease
+                await asyncio.sleep(LEASE_POLL_SECONDS)
+        except BaseException:
+            self.local.release()
+            raise
+    
+    def release(self, lease: Optional[str] = None):
+        try:
+            self._drop(lease)
+        finally:
+            self.local.release()
+    
+    async def _lease_async(self) -> Optional[str]:
+        future = asyncio.ensure_future(asyncio.to_thread(self._lease))
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # The thread may still take a lease, give it back once it has
+            loop = asyncio.get_running_loop()
+            future.add_done_callback(
+                lambda done: done.cancelled() or done.exception() or loop.run_in_executor(None, self._drop, done.result())
+            )
+            raise
+    
+    def _drop(self, lease: Optional[str]):
+        if not lease:
+            return
+        try:
+            _connection().execute("DELETE FROM leases WHERE id = ?", (lease,))
+        except sqlite3.Error as e:
+            print(f"Warning: Could not release rate limit lease for {self.name}: {str(e)}")
+    
+    def _lease(self) -> Optional[str]:
+        """
+        Take a slot in the database and return its lease id, "" if every slot is held,
+        or None if the database cannot be used.
+        """
+        try:
+            connection = _connection()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                host = socket.gethostname()
+                now = time.time()
+                held = connection.execute("SELECT id, host, pid, acquired FROM leases WHERE name = ?", (self.name,)).fetchall()
+                dead = [(lease,) for lease, lease_host, pid, acquired in held
+                        if now - acquired > LEASE_EXPIRY_SECONDS or (lease_host == host and not _process_alive(pid))]
+                connection.executemany("DELETE FROM leases WHERE id = ?", dead)
+                
+                lease = ""
+                if len(held) - len(dead) < self.max_concurrency:
+                    lease = uuid.uuid4().hex
+                    connection.execute(
+                        "INSERT INTO leases (id, name, host, pid, acquired) VALUES (?, ?, ?, ?, ?)",
+                        (lease, self.name, host, os.getpid(), now)
+                    )
+                connection.execute("COMMIT")
+                return lease
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            print(f"Warning: Could not lease a shared rate limit slot for {self.name}: {str(e)}")
+            return None
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # Exists, owned by another user
+    return True
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously up to one minute's allowance.
+    
+    Callers reserve their amount up front and are told how long to wait, so requests
+    are served in arrival order and a large request cannot be starved by small ones.
+    """
+    
+    def __init__(self, per_minute: int):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def reserve(self, amount: int) -> float:
+        """
+        Reserve tokens and return the number of seconds to wait before using them.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            
+            # A single request larger than the bucket waits for a full bucket
+            self.tokens -= min(amount, self.capacity)
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+class SharedTokenBucket:
+    """
+    Token bucket kept in the rate limit database, so every process draws on one allowance.
+    
+    Falls back to a bucket of its own if the database cannot be used.
+    """
+    
+    def __init__(self, name: str, per_minute: int):
+        self.name = name
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.fallback = TokenBucket(per_minute)
+    
+    def reserve(self, amount: int) -> float:
+        """
+        Reserve tokens and return the number of seconds to wait before using them.
+        """
+        try:
+            connection = _connection()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                # Wall clock time, monotonic clocks are not comparable between processes
+                now = time.time()
+                row = connection.execute("SELECT tokens, updated FROM buckets WHERE name = ?", (self.name,)).fetchone()
+                tokens, updated = row if row is not None else (self.capacity, now)
+                tokens = min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+                tokens -= min(amount, self.capacity)
+                connection.execute(
+                    "INSERT OR REPLACE INTO buckets (name, tokens, updated) VALUES (?, ?, ?)",
+                    (self.name, tokens, now)
+                )
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            print(f"Warning: Could not reserve shared rate limit for {self.name}: {str(e)}")
+            return self.fallback.reserve(amount)
+        
+        if tokens >= 0:
+            return 0.0
+        return -tokens / self.rate
+
+class RateLimiter:
+    """
+    Concurrency, requests-per-minute and tokens-per-minute limits for one provider and model.
+    """
+    
+    def __init__(self, max_concurrency: int = 0, rpm: int = 0, tpm: int = 0, shared_name: Optional[str] = None):
+        """
+        Args:
+            max_concurrency: Requests in flight (0 for no limit)
+            rpm: Requests per minute (0 for no limit)
+            tpm: Estimated tokens per minute (0 for no limit)
+            shared_name: Name under which the limits are shared with other processes through
+                the rate limit database, or None to keep them to this process
+        """
+        self.shared = bool(shared_name)
+        if shared_name:
+            self.concurrency = SharedConcurrencyLimiter(shared_name, max_concurrency) if max_concurrency > 0 else None
+            self.requests = SharedTokenBucket(f"{shared_name}:rpm", rpm) if rpm > 0 else None
+            self.tokens = SharedTokenBucket(f"{shared_name}:tpm", tpm) if tpm > 0 else None
+        else:
+            self.concurrency = ConcurrencyLimiter(max_concurrency) if max_concurrency > 0 else None
+            self.requests = TokenBucket(rpm) if rpm > 0 else None
+            self.tokens = TokenBucket(tpm) if tpm > 0 else None
+    
+    def _delay(self, tokens: int) -> float:
+        delays = [0.0]
+        if self.requests:
+            delays.append(self.requests.reserve(1))
+        if self.tokens:
+            delays.append(self.tokens.reserve(tokens))
+        return max(delays)
+    
+    @contextmanager
+    def limit(self, tokens: int):
+        """
+        Hold a request slot for a blocking call of about `tokens` tokens.
+        """
+        delay = self._delay(tokens)
+        if delay > 0:
+            time.sleep(delay)
+        
+        lease = self.concurrency.acquire() if self.concurrency else None
+        try:
+            yield
+        finally:
+            if self.concurrency:
+                self.concurrency.release(lease)
+    
+    @asynccontextmanager
+    async def limit_async(self, tokens: int):
+        """
+        Hold a request slot for an async call of about `tokens` tokens.
+        """
+        # Shared limits read the database, keep that off the event loop
+        delay = await asyncio.to_thread(self._delay, tokens) if self.shared else self._delay(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        
+        lease = await self.concurrency.acquire_async() if self.concurrency else None
+        try:
+            yield
+        finally:
+            if self.concurrency:
+                if self.shared:
+                    await asyncio.to_thread(self.concurrency.release, lease)
+                else:
+                    self.concurrency.release(lease)
+
+def get_rate_limiter(model_name: str) -> RateLimiter:
+    """
+    Return the rate limiter for a model name such as "openai:gpt-4o".
+    
+    Limits come from HARDGATES_LLM_RATE_LIMITS, matched on the full model name first and
+    then on the provider, with HARDGATES_LLM_MAX_CONCURRENCY, HARDGATES_LLM_RPM and
+    HARDGATES_LLM_TPM as defaults. They are shared by every process using RATE_LIMIT_PATH.
+    """
+    limiter = _limiters.get(model_name)
+    if limiter is not None:
+        return limiter
+    
+    with _limiters_lock:
+        limiter = _limiters.get(model_name)
+        if limiter is None:
+            config = _limit_config(model_name)
+            limiter = RateLimiter(config["max_concurrency"], config["rpm"], config["tpm"],
+                                  shared_name=model_name if RATE_LIMIT_PATH else None)
+            _limiters[model_name] = limiter
+    return limiter
+
+def _limit_config(model_name: str) -> Dict[str, Any]:
+    """
+    Resolve the configured limits for a model name.
+    """
+    provider = model_name.split(":", 1)[0]
+    config = {"max_concurrency": DEFAULT_MAX_CONCURRENCY, "rpm": DEFAULT_RPM, "tpm": DEFAULT_TPM}
+    config.update(RATE_LIMITS.get(provider, {}))
+    config.update(RATE_LIMITS.get(model_name, {}))
+    return config
+
+def _connection() -> sqlite3.Connection:
+    """
+    Return this thread's connection to the rate limit database, opening it on first use,
+    in each thread and after fork().
+    """
+    connection = getattr(_local, "connection", None)
+    if connection is not None and _local.pid == os.getpid() and _local.path == RATE_LIMIT_PATH:
+        return connection
+    
+    os.makedirs(os.path.dirname(RATE_LIMIT_PATH) or ".", exist_ok=True)
+    # Autocommit mode, transactions are opened explicitly where reads and writes must be atomic
+    connection = sqlite3.connect(RATE_LIMIT_PATH, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.execute("CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)")
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS leases ("
+        "id TEXT PRIMARY KEY, name TEXT NOT NULL, host TEXT NOT NULL, pid INTEGER NOT NULL, acquired REAL NOT NULL)"
+    )
+    connection.execute("CREATE INDEX IF NOT EXISTS leases_name ON leases (name)")
+    
+    _local.connection = connection
+    _local.pid = os.getpid()
+    _local.path = RATE_LIMIT_PATH
+    return connection
@@ -0,0 +1,75 @@
+import os
+import json
+import hashlib
+import tempfile
+from typing import Dict, Any, Optional
+from pathlib import Path
+
+# Result cache configuration (set HARDGATES_RESULT_CACHE=0 to always re-run the analysis)
+RESULT_CACHE_ENABLED = os.getenv("HARDGATES_RESULT_CACHE", "1").lower() not in ("0", "false", "no")
+RESULT_CACHE_DIR = os.getenv("HARDGATES_RESULT_CACHE_DIR", os.path.join(Path.home(), ".cache", "hardgates", "results"))
+
+def result_cache_key(repo_url: str, commit_sha: str, prompt_version: str, model_name: str) -> str:
+    """
+    Build the content address for an assessment of a repository at a specific commit.
+    
+    Args:
+        repo_url: Repository URL
+        commit_sha: Resolved commit SHA of the analyzed branch
+        prompt_version: Version of the analysis prompt
+        model_name: Provider and model used for the analysis
+        
+    Returns:
+        Hex digest identifying the assessment result
+    """
+    normalized_url = repo_url.rstrip('/').lower()
+    if normalized_url.endswith(".git"):
+        normalized_url = normalized_url[:-4]
+    
+    key_data = json.dumps([normalized_url, commit_sha, prompt_version, model_name])
+    return hashlib.sha256(key_data.encode()).hexdigest()
+
+def load_cached_result(cache_key: str) -> Optional[Dict[str, Any]]:
+    """
+    Load a stored assessment result, or None if there is no entry for the key.
+    """
+    if not RESULT_CACHE_ENABLED:
+        return None
+    
+    try:
+        with open(_entry_path(cache_key), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Warning: Could not read cached result {cache_key[:12]}: {str(e)}")
+        return None
+
+def store_cached_result(cache_key: str, entry: Dict[str, Any]):
+    """
+    Store an assessment result under its key.
+    
+    The entry is written to a temporary file and renamed into place so concurrent
+    readers never see a partial file.
+    """
+    if not RESULT_CACHE_ENABLED:
+        return
+    
+    entry_path = _entry_path(cache_key)
+    os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+    
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(entry_path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(temp_path, entry_path)
+    except Exception as e:
+        print(f"Warning: Could not store cached result {cache_key[:12]}: {str(e)}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def _entry_path(cache_key: str) -> str:
+    """
+    Return the file path for a cache key, sharded by the first two hex characters.
+    """
+    return os.path.join(RESULT_CACHE_DIR, cache_key[:2], f"{cache_key}.json")
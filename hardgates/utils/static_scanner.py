@@ -0,0 +1,161 @@
+import os
+import re
+from functools import lru_cache
+from typing import Dict, Any, List, Mapping
+
+from utils.gates import GATES_BY_KEY
+from utils.keyword_matcher import KeywordMatcher, line_starts, line_number
+
+# Dependency manifests and build files, matched on the file name
+MANIFEST_FILES = re.compile(
+    r'^(pom\.xml|build\.gradle(\.kts)?|settings\.gradle|package\.json|requirements[\w.-]*\.txt|'
+    r'pyproject\.toml|setup\.py|setup\.cfg|pipfile|go\.mod|gemfile|composer\.json|[\w.-]+\.csproj)$',
+    re.IGNORECASE
+)
+
+# Application source files, matched on the extension. Usage rules only count here, so a
+# keyword in documentation or build configuration does not resolve a gate on its own.
+SOURCE_EXTENSIONS = {
+    '.py', '.js', '.jsx', '.ts', '.tsx', '.mjs', '.cjs', '.java', '.kt', '.scala', '.groovy',
+    '.go', '.rb', '.php', '.cs', '.swift', '.rs', '.dart', '.c', '.cpp', '.h', '.hpp'
+}
+
+# Deterministic detection rules. Only unambiguous signals are used here, and a gate is only
+# resolved as implemented once all of its GATE_REQUIREMENTS are met.
+# scope "manifest" only matches dependency manifests, "source" application source outside
+# the tests and "code" every file. Library patterns are qualified coordinates so that
+# unrelated artifacts sharing a name (maven-failsafe-plugin) do not match.
+STATIC_RULES = [
+    # Retry logic
+    {"gate": "retry_logic", "kind": "library", "scope": "manifest", "label": "Spring Retry dependency", "patterns": ["spring-retry"]},
+    {"gate": "retry_logic", "kind": "library", "scope": "manifest", "label": "Resilience4j retry dependency", "patterns": ["resilience4j-retry"]},
+    {"gate": "retry_logic", "kind": "library", "scope": "manifest", "label": "Retry library dependency", "patterns": ["tenacity", "axios-retry", "async-retry", "p-retry", "dev.failsafe", "net.jodah:failsafe", "<artifactid>failsafe</artifactid>", "<packagereference include=\"polly\"", "github.com/avast/retry-go", "github.com/cenkalti/backoff"]},
+    {"gate": "retry_logic", "kind": "usage", "scope": "source", "label": "Retry annotation or policy", "patterns": ["@retryable", "retrytemplate", "retry.of(", "retryconfig", "@retry(", "retrypolicy", "backoff.on_exception", "failsafe.with(", "policy.handle<", "axiosretry("]},
+    # Circuit breakers
+    {"gate": "circuit_breakers_outgoing_requests", "kind": "library", "scope": "manifest", "label": "Circuit breaker dependency", "patterns": ["resilience4j-circuitbreaker", "spring-cloud-starter-circuitbreaker", "hystrix", "opossum", "pybreaker", "github.com/sony/gobreaker"]},
+    {"gate": "circuit_breakers_outgoing_requests", "kind": "usage", "scope": "source", "label": "Circuit breaker annotation or instance", "patterns": ["@circuitbreaker", "@hystrixcommand", "circuitbreaker.of(", "circuitbreakerregistry", "circuitbreakerfactory", "new circuitbreaker(", "pybreaker.circuitbreaker", "gobreaker.newcircuitbreaker("]},
+    # Timeouts
+    {"gate": "set_timeouts_io_operations", "kind": "config", "scope": "code", "label": "Timeout configuration", "patterns": ["connect-timeout", "read-timeout", "connection-timeout", "request-timeout", "socket-timeout"]},
+    {"gate": "set_timeouts_io_operations", "kind": "usage", "scope": "source", "label": "Timeout set on a client", "patterns": ["setconnecttimeout(", "setreadtimeout(", "setsockettimeout(", "setconnectionrequesttimeout(", ".connecttimeout(", ".readtimeout(", ".responsetimeout(", "timelimiter.of(", "@timelimiter", "httpx.timeout(", "aiohttp.clienttimeout(", "socket.setdefaulttimeout("]},
+    # Throttling
+    {"gate": "throttling_drop_request", "kind": "library", "scope": "manifest", "label": "Rate limiting dependency", "patterns": ["bucket4j", "resilience4j-ratelimiter", "express-rate-limit", "rate-limiter-flexible", "slowapi", "django-ratelimit", "flask-limiter"]},
+    {"gate": "throttling_drop_request", "kind": "usage", "scope": "source", "label": "Rate limiter usage", "patterns": ["@ratelimiter", "ratelimiter.create(", "ratelimiter.of(", "@limiter.limit", "ratelimit(", "bucket4j.builder(", "bucket.builder("]},
+    # Tracking IDs
+    {"gate": "tracking_id_for_log_messages", "kind": "usage", "scope": "source", "label": "Correlation ID propagation", "patterns": ["mdc.put(", "threadcontext.put(", "correlationid", "traceid"]},
+    {"gate": "tracking_id_for_log_messages", "kind": "config", "scope": "code", "label": "Correlation ID header", "patterns": ["x-correlation-id", "x-request-id"]},
+    {"gate": "tracking_id_for_log_messages", "kind": "library", "scope": "manifest", "label": "Distributed tracing dependency", "patterns": ["spring-cloud-starter-sleuth", "micrometer-tracing", "opentelemetry"]},
+    # Searchable logs
+    {"gate": "logs_searchable_available", "kind": "library", "scope": "manifest", "label": "Structured logging dependency", "patterns": ["logstash-logback-encoder", "co.elastic.logging", "python-json-logger", "ecs-logging", "winston-elasticsearch"]},
+    {"gate": "logs_searchable_available", "kind": "config", "scope": "code", "label": "Structured log encoder configuration", "patterns": ["logstashencoder", "ecsencoder", "jsonlogger.jsonformatter", "ecs_logging.stdlibformatter"]},
+    {"gate": "logs_searchable_available", "kind": "usage", "scope": "source", "label": "Structured log shipping", "patterns": ["new logstashencoder(", "structuredarguments.", "pythonjsonlogger", "ecs_logging.", "elasticsearchtransport"]},
+    # Client error tracking
+    {"gate": "include_client_error_tracking", "kind": "library", "scope": "manifest", "label": "Error tracking SDK", "patterns": ["@sentry/", "sentry-sdk", "io.sentry", "@bugsnag/", "bugsnag", "rollbar"]},
+    {"gate": "include_client_error_tracking", "kind": "usage", "scope": "source", "label": "Error tracking initialisation", "patterns": ["sentry.init(", "sentry_sdk.init(", "sentryandroid.init(", "bugsnag.start(", "bugsnag.configure(", "rollbar.init(", "new rollbar("]},
+    # Automated regression testing
+    {"gate": "automated_regression_testing", "kind": "library", "scope": "manifest", "label": "Test framework dependency", "patterns": ["junit", "testng", "spring-boot-starter-test", "pytest", "jest", "mocha", "vitest", "cypress", "rspec", "phpunit"]},
+]
+
+# Evidence each gate needs before it is resolved without the LLM: every set in the
+# list must be satisfied by at least one of its kinds. A dependency or a configuration
+# key alone is never enough, the gate also needs usage in source (or test files).
+GATE_REQUIREMENTS = {
+    "retry_logic": [{"usage"}],
+    "circuit_breakers_outgoing_requests": [{"usage"}],
+    "set_timeouts_io_operations": [{"usage"}],
+    "throttling_drop_request": [{"usage"}],
+    "tracking_id_for_log_messages": [{"usage"}],
+    "logs_searchable_available": [{"usage"}],
+    "include_client_error_tracking": [{"usage"}],
+    "automated_regression_testing": [{"library"}, {"test_files"}],
+}
+
+# Test source locations, matched on the repository path
+TEST_FILE_PATTERN = re.compile(
+    r'(^|/)(src/test/|tests?/|__tests__/|spec/)|(^|/)test_[^/]+\.py$|_test\.(py|go)$|\.(test|spec)\.(js|ts|jsx|tsx)$|Tests?\.(java|kt|cs)$'
+)
+
+MAX_LOCATIONS = 5
+MAX_RECORDED_MATCHES = 20
+
+def scan_repository(files_data: Mapping[str, str]) -> Dict[str, Any]:
+    """
+    Scan repository files for deterministic hard gate evidence.
+    
+    Args:
+        files_data: Mapping of file paths to file contents (a dict or FileStore)
+    
+    Returns:
+        Dictionary with "resolved_gates" (verdicts for gates decided without the LLM, in the
+        primary_hard_gates format) and "evidence" (file:line locations per gate, including
+        gates that were not resolved)
+    """
+    manifest_matcher = _compile_rules("manifest")
+    source_matcher = _compile_rules("source")
+    code_matcher = _compile_rules("code")
+    
+    # gate -> kind -> list of (label, location)
+    matches = {}
+    
+    for file_path, content in files_data.items():
+        normalized_path = file_path.replace(os.sep, "/")
+        file_name = normalized_path.rsplit("/", 1)[-1]
+        
+        is_test = TEST_FILE_PATTERN.search(normalized_path) is not None
+        if is_test:
+            _record_match(matches, "automated_regression_testing", "test_files", "Test source", f"{file_path}:1")
+        
+        matchers = [code_matcher]
+        if MANIFEST_FILES.match(file_name):
+            matchers.append(manifest_matcher)
+        elif not is_test and os.path.splitext(file_name)[1].lower() in SOURCE_EXTENSIONS:
+            matchers.append(source_matcher)
+        
+        starts = None
+        for matcher in matchers:
+            for rule_index, hits in matcher.match_groups(content).items():
+                if starts is None:
+                    starts = line_starts(content)
+                rule = STATIC_RULES[rule_index]
+                for position, _ in hits:
+                    _record_match(matches, rule["gate"], rule["kind"], rule["label"],
+                                  f"{file_path}:{line_number(starts, position)}")
+    
+    resolved_gates = {}
+    evidence = {}
+    for gate_key, kinds in matches.items():
+        locations = [f"{label} ({location})" for found in kinds.values() for label, location in found]
+        evidence[gate_key] = locations
+        
+        requirements = GATE_REQUIREMENTS.get(gate_key, [])
+        # Each requirement is a set of alternative kinds, at least one of which must be present
+        if requirements and all(any(kind in kinds for kind in alternatives) for alternatives in requirements):
+            shown = "; ".join(_unique(locations)[:MAX_LOCATIONS])
+            resolved_gates[gate_key] = {
+                "implemented": "yes",
+                "evidence": f"Detected by static analysis: {shown}",
+                "recommendation": f"Confirm this is applied consistently: {GATES_BY_KEY[gate_key]['recommendation'].lower()}",
+                "source": "static_analysis"
+            }
+    
+    return {"resolved_gates": resolved_gates, "evidence": evidence}
+
+@lru_cache(maxsize=None)
+def _compile_rules(scope: str) -> KeywordMatcher:
+    """
+    Build a single-pass matcher for the rules of a scope, grouped by rule index.
+    """
+    return KeywordMatcher({i: rule["patterns"] for i, rule in enumerate(STATIC_RULES) if rule["scope"] == scope})
+
+def _record_match(matches, gate_key, kind, label, location):
+    """
+    Record a piece of evidence, keeping at most MAX_RECORDED_MATCHES per gate and kind.
+    """
+    found = matches.setdefault(gate_key, {}).setdefault(kind, [])
+    if len(found) < MAX_RECORDED_MATCHES:
+        found.append((label, location))
+
+def _unique(items: List[str]) -> List[str]:
+    """
+    Remove duplicates while keeping the original order.
+    """
+    return list(dict.fromkeys(items))
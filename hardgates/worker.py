@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Hard Gate Assessment Worker
+
+Runs queued API assessments in a pool of worker processes, separate from the web server.
+"""
+
+import os
+import sys
+import time
+import socket
+import asyncio
+import argparse
+import threading
+import multiprocessing
+from typing import Dict, Any, Optional
+
+# Load environment variables from .env file if it exists
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass  # python-dotenv not installed, skip
+
+from core.flow import AsyncFlow, ExponentialBackoff
+from nodes.resolve_commit import ResolveCommit
+from nodes.fetch_repo import FetchRepo
+from nodes.static_scan import StaticScan
+from nodes.analyze_gates import create_analysis_node
+from nodes.format_output import FormatOutput
+from utils.llm_client import close_llm_clients
+from utils.job_queue import get_job_queue, JobQueue, JOB_LEASE_SECONDS, JOB_SECRET_KEY_VARIABLE
+
+# Worker processes started by `python worker.py` (and by api.py, see HARDGATES_API_WORKERS)
+WORKER_CONCURRENCY = int(os.getenv("HARDGATES_WORKER_CONCURRENCY", "2"))
+
+# How often an idle worker checks the queue for new jobs
+WORKER_POLL_SECONDS = float(os.getenv("HARDGATES_WORKER_POLL_SECONDS", "1"))
+
+def create_assessment_flow(analysis_mode="monolithic", executor=None):
+    """
+    Create and return the hard gate assessment flow.
+    
+    Blocking nodes run on executor (None uses the event loop's default thread pool).
+    """
+    # Create nodes with shorter retry times for API responsiveness
+    resolve_commit = ResolveCommit()
+    fetch_repo = FetchRepo(max_retries=2, wait=3)
+    static_scan = StaticScan()
+    analyze_code = create_analysis_node(
+        analysis_mode, ExponentialBackoff(max_retries=3, base_delay=1, max_delay=15, deadline=300)
+    )
+    format_output = FormatOutput()
+    
+    # Connect nodes in sequence
+    resolve_commit >> fetch_repo >> static_scan >> analyze_code >> format_output
+    
+    # Unchanged commits skip straight to the output with the cached assessment
+    resolve_commit - "cached" >> format_output
+    
+    # Create the flow (blocking nodes run on a thread pool so the event loop stays free)
+    return AsyncFlow(start=resolve_commit, executor=executor)
+
+async def run_assessment(payload: Dict[str, Any], progress_callback=None) -> Dict[str, Any]:
+    """
+    Run the assessment flow for a job payload and return the formatted JSON output.
+    """
+    analysis_mode = payload.get("analysis_mode", "monolithic")
+    shared = {
+        "repo_url": payload["repo_url"],
+        "branch": payload.get("branch", "main"),
+        "github_token": payload.get("github_token"),
+        "output_format": "json",
+        "use_result_cache": payload.get("use_cache", True),
+        "analysis_mode": analysis_mode,
+        "progress_callback": progress_callback
+    }
+    
+    assessment_flow = create_assessment_flow(analysis_mode)
+    await assessment_flow.run_async(shared)
+    
+    formatted_output = shared.get("formatted_output")
+    if not formatted_output or not isinstance(formatted_output, dict):
+        raise ValueError("No valid assessment results generated")
+    return formatted_output
+
+def process_job(queue: JobQueue, job: Dict[str, Any], worker_id: str, loop: asyncio.AbstractEventLoop):
+    """
+    Run one claimed job on the worker's event loop, renewing its lease until it finishes,
+    and record the outcome.
+    """
+    job_id = job["id"]
+    finished = threading.Event()
+    
+    def renew_lease():
+        # Renew well before the lease runs out; stop once another worker has taken the job over
+        while not finished.wait(JOB_LEASE_SECONDS / 3):
+            try:
+                if not queue.heartbeat(job_id, worker_id):
+                    print(f"Worker {worker_id} lost the lease on job {job_id}")
+                    return
+            except Exception as e:
+                print(f"Warning: Could not renew lease on job {job_id}: {str(e)}")
+    
+    def record_progress(progress: Dict[str, Any]):
+        try:
+            queue.update_progress(job_id, worker_id, progress)
+        except Exception as e:
+            print(f"Warning: Could not record progress of job {job_id}: {str(e)}")
+    
+    heartbeat = threading.Thread(target=renew_lease, name=f"lease-{job_id}", daemon=True)
+    heartbeat.start()
+    
+    print(f"Worker {worker_id} started job {job_id} (attempt {job['attempts']}) for {job['payload']['repo_url']}")
+    try:
+        result = loop.run_until_complete(run_assessment(job["payload"], record_progress))
+    except Exception as e:
+        finished.set()
+        print(f"Worker {worker_id} failed job {job_id}: {str(e)}")
+        try:
+            queue.fail(job_id, worker_id, str(e))
+        except Exception as record_error:
+            # The lease runs out and the job is retried
+            print(f"Warning: Could not record failure of job {job_id}: {str(record_error)}")
+        return
+    
+    finished.set()
+    try:
+        recorded = queue.complete(job_id, worker_id, result)
+    except Exception as e:
+        # The lease runs out and the job is run again
+        print(f"Warning: Could not record result of job {job_id}: {str(e)}")
+        return
+    
+    if recorded:
+        print(f"Worker {worker_id} completed job {job_id}")
+    else:
+        print(f"Worker {worker_id} finished job {job_id} after losing it, result discarded")
+
+def run_worker(worker_id: Optional[str] = None, queue_url: Optional[str] = None,
+               stop_event: Optional[threading.Event] = None):
+    """
+    Claim and run jobs one at a time until stop_event is set (or forever).
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    queue = get_job_queue(queue_url)
+    print(f"Worker {worker_id} waiting for jobs")
+    
+    # One loop for the worker's lifetime, pooled async LLM clients are bound to it
+    loop = asyncio.new_event_loop()
+    try:
+        while stop_event is None or not stop_event.is_set():
+            try:
+                job = queue.claim(worker_id)
+            except Exception as e:
+                print(f"Warning: Worker {worker_id} could not claim a job: {str(e)}")
+                job = None
+            
+            if job is None:
+                time.sleep(WORKER_POLL_SECONDS)
+                continue
+            process_job(queue, job, worker_id, loop)
+    finally:
+        loop.run_until_complete(close_llm_clients())
+        loop.close()
+
+def start_workers(concurrency: int = WORKER_CONCURRENCY, queue_url: Optional[str] = None):
+    """
+    Start worker processes and return them.
+    
+    Processes are spawned rather than forked so they do not inherit the caller's event
+    loop, threads or open connections.
+    """
+    context = multiprocessing.get_context("spawn")
+    processes = []
+    for index in range(concurrency):
+        worker_id = f"{socket.gethostname()}-{os.getpid()}-{index}"
+        process = context.Process(target=run_worker, args=(worker_id, queue_url), name=f"hardgates-worker-{index}",
+                                  daemon=True)
+        process.start()
+        processes.append(process)
+    return processes
+
+def stop_workers(processes):
+    """
+    Stop worker processes. Jobs they were running are picked up again once their lease expires.
+    """
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.join(timeout=10)
+
+def main():
+    parser = argparse.ArgumentParser(description="Hard Gate Assessment worker - run queued API assessments")
+    parser.add_argument("--concurrency", type=int, default=WORKER_CONCURRENCY,
+                        help=f"Worker processes, each running one assessment at a time (default: {WORKER_CONCURRENCY})")
+    parser.add_argument("--queue-url",
+                        help="Job queue URL (default: HARDGATES_JOB_QUEUE_URL or the SQLite queue in ~/.cache/hardgates)")
+    args = parser.parse_args()
+    
+    if args.concurrency < 1:
+        print("Error: --concurrency must be at least 1")
+        sys.exit(1)
+    
+    if not os.getenv(JOB_SECRET_KEY_VARIABLE):
+        print(f"Warning: {JOB_SECRET_KEY_VARIABLE} is not set, jobs queued with a GitHub token will fail")
+    
+    if args.concurrency == 1:
+        run_worker(queue_url=args.queue_url)
+        return
+    
+    processes = start_workers(args.concurrency, args.queue_url)
+    print(f"Started {len(processes)} worker processes")
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        print("Stopping workers")
+        stop_workers(processes)
+
+if __name__ == "__main__":
+    main()